@@ -0,0 +1,1170 @@
+#!/usr/bin/env python3
+"""
+GRIT Archive Full-Text Search
+Builds a positional inverted index over the OCR text of the GRIT issues and
+answers ranked (BM25) term and phrase queries with optional year ranges.
+
+OCR text is normalized before indexing: words split across line breaks
+("pro- vide") are rejoined, accents and case are folded, and possessives
+are dropped, so "Tramway's" finds "tramway".
+
+Fuzzy search tolerates OCR errors ("Trarnway" for "Tramway"): each segment
+also indexes the character trigrams of its terms, so query words are
+expanded to dictionary terms within 1-2 edits by intersecting trigram
+postings instead of scanning the whole dictionary. Words split by OCR
+("Tram way") are matched as two-word phrases.
+
+The index is a directory of immutable segment files plus manifest.json.
+Segments are opened with mmap: only a small JSON header (the issue list) is
+parsed at startup, and the term dictionary and postings are read straight
+from the mapped file as queries touch them.
+
+The manifest records each OCR file's MD5, size and mtime and where it is
+indexed. 'update' indexes only new and changed files into a new small
+segment and marks replaced or deleted issues as deleted in their old
+segment. Once there are more than MAX_SEGMENTS segments, a background
+process merges them into one, dropping deleted issues.
+
+Segment file layout (all integers little-endian):
+    magic (8 bytes) | header length (u32) | JSON header | padding to 4 bytes
+    term offsets      u32 x (terms + 1)   start of each term in the term blob
+    doc offsets       u32 x (terms + 1)   start of each term's doc postings
+    position offsets  u32 x (terms + 1)   start of each term's positions
+    doc freqs         u32 x terms
+    gram offsets      u32 x (grams + 1)   start of each trigram in the gram blob
+    gram term offsets u32 x (grams + 1)   start of each trigram's term ids
+    term blob         UTF-8 terms, sorted by bytes
+    doc postings      varints per doc: doc id gap, term freq, bytes of positions
+    positions         varints per doc: position gaps
+    gram blob         UTF-8 trigrams of '$term$', sorted by bytes
+    gram term ids     varints per trigram: term id gaps
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import subprocess
+import sys
+import time
+import unicodedata
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_TEXT_DIR = os.path.join(HERE, 'data', 'GRIT_archive_OCRtext')
+DEFAULT_INDEX = os.path.join(HERE, 'data', 'GRIT_search_index')
+
+MAGIC = b'GRITIDX1'
+FORMAT_VERSION = 2
+MANIFEST_NAME = 'manifest.json'
+LOCK_NAME = 'update.lock'
+MERGE_LOCK_NAME = 'merge.lock'
+
+# Merge all segments once an update leaves more than this many
+MAX_SEGMENTS = 8
+
+# Wait this long for another update to finish; locks older than the stale
+# limit are assumed to be left over from a crashed process
+LOCK_TIMEOUT = 60
+LOCK_STALE_SECONDS = 600
+
+# BM25 parameters (the usual defaults)
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# OCR noise produces long junk "words"; they would only bloat the dictionary
+MAX_TOKEN_LEN = 40
+
+# Fuzzy matches score this much less per edit than exact matches
+FUZZY_PENALTY = 0.7
+
+# Words of context on each side of a highlighted match, and matches per snippet
+SNIPPET_WORDS = 12
+SNIPPET_FRAGMENTS = 2
+
+# A word broken across a line ("pro- vide", "Direc- tory"): letter, hyphen,
+# spaces, then a lowercase letter. " - " between words is left alone.
+HYPHEN_BREAK_RE = re.compile(r'(?<=[A-Za-z])- +(?=[a-z])')
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z0-9]+)*")
+QUERY_RE = re.compile(r'"([^"]*)"|(\S+)')
+# A word in the raw OCR text, including one broken across a line
+RAW_WORD_RE = re.compile(r"\w+(?:['’]\w+)*(?:- +[a-z]\w*)?")
+ISSUE_RE = re.compile(r'SHHA-GRIT-(\d{4})_(\d{2})')
+
+
+def normalize_text(text: str) -> str:
+    """Rejoin hyphenated line breaks, fold accents and case, and unify apostrophes."""
+    text = HYPHEN_BREAK_RE.sub('', text)
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return text.lower().replace('’', "'").replace('‘', "'")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into index terms.
+
+    Args:
+        text: Raw OCR or query text
+
+    Returns:
+        Normalized terms in order (positions are list indexes)
+    """
+    tokens = []
+    for token in TOKEN_RE.findall(normalize_text(text)):
+        if token.endswith("'s"):
+            token = token[:-2]
+        token = token.replace("'", '')
+        if token and len(token) <= MAX_TOKEN_LEN:
+            tokens.append(token)
+    return tokens
+
+
+def parse_issue_name(filename: str) -> Tuple[Optional[int], Optional[int]]:
+    """Year and month from an issue file name like SHHA-GRIT-1985_03.txt."""
+    match = ISSUE_RE.search(filename)
+    if not match:
+        return None, None
+    return int(match.group(1)), int(match.group(2))
+
+
+def find_text_files(text_dir: str) -> List[str]:
+    """All .txt files under the OCR text directory, in path order."""
+    paths = []
+    for dirpath, dirnames, filenames in os.walk(text_dir):
+        dirnames.sort()
+        for name in filenames:
+            if name.endswith('.txt'):
+                paths.append(os.path.join(dirpath, name))
+    return sorted(paths)
+
+
+def trigrams(term: str) -> List[str]:
+    """Character trigrams of a term padded with '$', e.g. tram -> $tr, tra, ram, am$."""
+    padded = f'${term}$'
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    Levenshtein distance between two strings, giving up early past a limit.
+
+    Returns:
+        The distance, or limit + 1 if it is larger than limit
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return min(previous[-1], limit + 1)
+
+
+def default_max_edits(term: str) -> int:
+    """Edits to allow for a query word: none for very short words, then 1, then 2."""
+    if len(term) <= 3:
+        return 0
+    return 1 if len(term) <= 5 else 2
+
+
+def thumbnail_name(doc: Dict) -> Optional[str]:
+    """Thumbnail file for an issue, named like thumbnail_generator.py names them."""
+    if doc.get('year') is None or doc.get('month') is None:
+        return None
+    return f"SHHA-GRIT-{doc['year']}_{doc['month']:02d}.png"
+
+
+def make_snippet(text: str, terms: set, mark: Tuple[str, str] = ('**', '**'),
+                 words: int = SNIPPET_WORDS, fragments: int = SNIPPET_FRAGMENTS) -> str:
+    """
+    Excerpts of raw OCR text around words that normalize to one of the terms.
+
+    Args:
+        text: Raw OCR text of the issue
+        terms: Normalized terms to highlight
+        mark: Strings to put before and after each highlighted word
+        words: Words of context on each side
+        fragments: Maximum number of excerpts
+
+    Returns:
+        Excerpts joined with ' … ' (empty if no word matches)
+    """
+    spans = [m.span() for m in RAW_WORD_RE.finditer(text)]
+    hits = [i for i, (start, end) in enumerate(spans) if set(tokenize(text[start:end])) & terms]
+    parts = []
+    last_end = -1
+    for hit in hits:
+        if len(parts) >= fragments:
+            break
+        if hit <= last_end:
+            continue
+        first, last = max(0, hit - words), min(len(spans) - 1, hit + words)
+        pieces = []
+        for i in range(max(first, last_end + 1), last + 1):
+            word = text[spans[i][0]:spans[i][1]]
+            pieces.append(f"{mark[0]}{word}{mark[1]}" if i in hits else word)
+        parts.append(' '.join(' '.join(pieces).split()))
+        last_end = last
+    return ' … '.join(parts)
+
+
+def encode_varints(values, out: bytearray):
+    """Append unsigned LEB128 varints to out."""
+    for value in values:
+        while value >= 0x80:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        out.append(value)
+
+
+def decode_varints(buf, start: int, end: int) -> List[int]:
+    """Decode unsigned LEB128 varints from buf[start:end]."""
+    values = []
+    value = shift = 0
+    for byte in buf[start:end]:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            values.append(value)
+            value = shift = 0
+    return values
+
+
+def _u32_array(values) -> bytes:
+    """Pack integers as little-endian u32."""
+    arr = array('I', values)
+    if sys.byteorder != 'little':
+        arr.byteswap()
+    return arr.tobytes()
+
+
+class IndexBuilder:
+    """Accumulate documents in memory and write them as a segment file."""
+
+    def __init__(self):
+        """Initialize an empty index."""
+        self.docs: List[Dict] = []
+        # term -> list of (doc id, positions)
+        self.postings: Dict[str, List[Tuple[int, List[int]]]] = {}
+        self.total_tokens = 0
+
+    def add(self, name: str, text: str, year: Optional[int] = None, month: Optional[int] = None,
+            path: str = '') -> int:
+        """
+        Add one issue.
+
+        Args:
+            name: Issue name (file name without .txt)
+            text: OCR text
+            year, month: Issue date, for year filters and display
+            path: Source file, relative to the text directory
+
+        Returns:
+            Doc id
+        """
+        tokens = tokenize(text)
+        doc_id = self.add_doc({'name': name, 'path': path, 'year': year, 'month': month, 'length': len(tokens)})
+
+        positions: Dict[str, List[int]] = {}
+        for pos, token in enumerate(tokens):
+            positions.setdefault(token, []).append(pos)
+        for token, token_positions in positions.items():
+            self.postings.setdefault(token, []).append((doc_id, token_positions))
+        return doc_id
+
+    def add_doc(self, doc: Dict) -> int:
+        """Add a doc's metadata without postings (callers add them); returns its id."""
+        self.docs.append(doc)
+        self.total_tokens += doc['length']
+        return len(self.docs) - 1
+
+    def write(self, index_path: str):
+        """Write the segment file (atomically, so open readers keep their old copy)."""
+        terms = sorted(self.postings, key=lambda t: t.encode('utf-8'))
+        term_blob = bytearray()
+        doc_blob = bytearray()
+        pos_blob = bytearray()
+        term_offsets, doc_offsets, pos_offsets, doc_freqs = [0], [0], [0], []
+
+        for term in terms:
+            term_blob += term.encode('utf-8')
+            postings = self.postings[term]
+            prev_doc = 0
+            for doc_id, positions in postings:
+                pos_bytes = bytearray()
+                prev_pos = 0
+                for pos in positions:
+                    encode_varints((pos - prev_pos,), pos_bytes)
+                    prev_pos = pos
+                encode_varints((doc_id - prev_doc, len(positions), len(pos_bytes)), doc_blob)
+                pos_blob += pos_bytes
+                prev_doc = doc_id
+            term_offsets.append(len(term_blob))
+            doc_offsets.append(len(doc_blob))
+            pos_offsets.append(len(pos_blob))
+            doc_freqs.append(len(postings))
+
+        gram_terms: Dict[str, List[int]] = {}
+        for term_id, term in enumerate(terms):
+            for gram in dict.fromkeys(trigrams(term)):
+                gram_terms.setdefault(gram, []).append(term_id)
+        grams = sorted(gram_terms, key=lambda g: g.encode('utf-8'))
+        gram_blob = bytearray()
+        gram_ids_blob = bytearray()
+        gram_offsets, gram_ids_offsets = [0], [0]
+        for gram in grams:
+            gram_blob += gram.encode('utf-8')
+            prev = 0
+            for term_id in gram_terms[gram]:
+                encode_varints((term_id - prev,), gram_ids_blob)
+                prev = term_id
+            gram_offsets.append(len(gram_blob))
+            gram_ids_offsets.append(len(gram_ids_blob))
+
+        header = json.dumps({
+            'version': FORMAT_VERSION,
+            'docs': self.docs,
+            'terms': len(terms),
+            'grams': len(grams),
+            'total_tokens': self.total_tokens,
+            'sizes': {'terms': len(term_blob), 'doc_postings': len(doc_blob), 'positions': len(pos_blob),
+                      'grams': len(gram_blob), 'gram_terms': len(gram_ids_blob)},
+        }).encode('utf-8')
+        preamble = MAGIC + struct.pack('<I', len(header)) + header
+        preamble += b'\0' * (-len(preamble) % 4)
+
+        tmp_path = index_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(preamble)
+            for values in (term_offsets, doc_offsets, pos_offsets, doc_freqs, gram_offsets, gram_ids_offsets):
+                f.write(_u32_array(values))
+            f.write(term_blob)
+            f.write(doc_blob)
+            f.write(pos_blob)
+            f.write(gram_blob)
+            f.write(gram_ids_blob)
+        os.replace(tmp_path, index_path)
+
+
+def file_md5(path: str) -> str:
+    """MD5 of a file's contents."""
+    with open(path, 'rb') as f:
+        return hashlib.md5(f.read()).hexdigest()
+
+
+def empty_manifest() -> Dict:
+    """Manifest of an index with no segments."""
+    return {'version': FORMAT_VERSION, 'next_segment': 1, 'segments': [], 'files': {}}
+
+
+def load_manifest(index_dir: str) -> Dict:
+    """Read an index manifest (an empty one if the index doesn't exist yet)."""
+    path = os.path.join(index_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return empty_manifest()
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_manifest(index_dir: str, manifest: Dict):
+    """Replace the manifest atomically, so readers see either the old or the new index."""
+    path = os.path.join(index_dir, MANIFEST_NAME)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    os.replace(path + '.tmp', path)
+
+
+class IndexLock:
+    """Exclusive lock file, so only one process changes the manifest at a time."""
+
+    def __init__(self, index_dir: str, name: str = LOCK_NAME, timeout: float = LOCK_TIMEOUT):
+        """
+        Args:
+            index_dir: Index directory
+            name: Lock file name
+            timeout: Seconds to wait for the lock (0 fails immediately)
+        """
+        self.path = os.path.join(index_dir, name)
+        self.timeout = timeout
+
+    def acquire(self) -> bool:
+        """Take the lock; returns False if it is still held after the timeout."""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.write(fd, str(os.getpid()).encode())
+                os.close(fd)
+                return True
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(self.path) > LOCK_STALE_SECONDS:
+                        os.remove(self.path)
+                        continue
+                except OSError:
+                    continue
+                if time.monotonic() >= deadline:
+                    return False
+                time.sleep(0.05)
+
+    def release(self):
+        """Drop the lock."""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        if not self.acquire():
+            raise TimeoutError(f"Index is locked by another process: {self.path}")
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def _remove_segment_files(index_dir: str, names: List[str]):
+    """Delete segment files that are no longer in the manifest."""
+    for name in names:
+        try:
+            os.remove(os.path.join(index_dir, name))
+        except OSError:
+            pass
+
+
+def update_index(text_dir: str = DEFAULT_TEXT_DIR, index_dir: str = DEFAULT_INDEX,
+                 rebuild: bool = False) -> Dict:
+    """
+    Bring the index in line with the OCR text directory.
+
+    Files whose size and mtime are unchanged are skipped without reading
+    them. Changed files are re-hashed; if the content really differs, the old
+    doc is marked deleted and the new text goes into a new segment with any
+    added files. Files that disappeared are marked deleted.
+
+    Args:
+        text_dir: Directory of <year>/SHHA-GRIT-YYYY_MM.txt files
+        index_dir: Index directory (created if missing)
+        rebuild: Ignore the existing index and index every file into one segment
+
+    Returns:
+        Summary dictionary (added, replaced, deleted, unchanged, docs,
+        segments, seconds)
+    """
+    start = time.perf_counter()
+    os.makedirs(index_dir, exist_ok=True)
+    with IndexLock(index_dir):
+        manifest = load_manifest(index_dir)
+        old_segments = [seg['name'] for seg in manifest['segments']]
+        # Segments in an older format can't be mixed with new ones
+        if rebuild or manifest.get('version') != FORMAT_VERSION:
+            manifest = dict(empty_manifest(), next_segment=manifest['next_segment'])
+        manifest['text_dir'] = os.path.abspath(text_dir)
+        segments = {seg['name']: seg for seg in manifest['segments']}
+        files = manifest['files']
+        stats = {'added': 0, 'replaced': 0, 'deleted': 0, 'unchanged': 0}
+
+        builder = IndexBuilder()
+        new_name = f"seg_{manifest['next_segment']:06d}.bin"
+        seen = set()
+        for path in find_text_files(text_dir):
+            rel = os.path.relpath(path, text_dir).replace(os.sep, '/')
+            seen.add(rel)
+            st = os.stat(path)
+            entry = files.get(rel)
+            if entry and entry['size'] == st.st_size and entry['mtime'] == st.st_mtime:
+                stats['unchanged'] += 1
+                continue
+
+            md5 = file_md5(path)
+            if entry and entry['md5'] == md5:
+                entry.update(size=st.st_size, mtime=st.st_mtime)
+                stats['unchanged'] += 1
+                continue
+
+            if entry:
+                segments[entry['segment']]['deleted'].append(entry['doc'])
+                stats['replaced'] += 1
+            else:
+                stats['added'] += 1
+            name = os.path.splitext(os.path.basename(path))[0]
+            year, month = parse_issue_name(name)
+            with open(path, encoding='utf-8', errors='replace') as f:
+                doc_id = builder.add(name, f.read(), year=year, month=month, path=rel)
+            files[rel] = {'md5': md5, 'size': st.st_size, 'mtime': st.st_mtime,
+                          'segment': new_name, 'doc': doc_id}
+
+        for rel in [rel for rel in files if rel not in seen]:
+            entry = files.pop(rel)
+            segments[entry['segment']]['deleted'].append(entry['doc'])
+            stats['deleted'] += 1
+
+        if builder.docs:
+            builder.write(os.path.join(index_dir, new_name))
+            manifest['segments'].append({'name': new_name, 'docs': len(builder.docs), 'deleted': []})
+            manifest['next_segment'] += 1
+
+        # Segments with nothing left to search can go right away
+        manifest['segments'] = [seg for seg in manifest['segments'] if len(seg['deleted']) < seg['docs']]
+        save_manifest(index_dir, manifest)
+
+    live = {seg['name'] for seg in manifest['segments']}
+    _remove_segment_files(index_dir, [name for name in old_segments if name not in live])
+    stats.update(docs=len(files), segments=len(manifest['segments']), seconds=time.perf_counter() - start)
+    return stats
+
+
+def build_index(text_dir: str = DEFAULT_TEXT_DIR, index_dir: str = DEFAULT_INDEX) -> Dict:
+    """Index every issue from scratch into a single segment (see update_index)."""
+    return update_index(text_dir, index_dir, rebuild=True)
+
+
+def merge_index(index_dir: str = DEFAULT_INDEX) -> Optional[Dict]:
+    """
+    Merge all segments into one, dropping deleted docs.
+
+    Postings are decoded from the segments, not re-read from the text, and
+    the merged segment is built without holding the update lock, so updates
+    can run meanwhile. Docs deleted during the merge are carried over to the
+    merged segment when it is committed.
+
+    Args:
+        index_dir: Index directory
+
+    Returns:
+        Summary dictionary (segments, docs, seconds), or None if another
+        merge is already running or there is nothing to merge
+    """
+    start = time.perf_counter()
+    merge_lock = IndexLock(index_dir, MERGE_LOCK_NAME, timeout=0)
+    if not merge_lock.acquire():
+        return None
+    try:
+        with IndexLock(index_dir):
+            manifest = load_manifest(index_dir)
+            snapshot = [dict(seg, deleted=list(seg['deleted'])) for seg in manifest['segments']]
+            merged_name = f"seg_{manifest['next_segment']:06d}.bin"
+            manifest['next_segment'] += 1
+            save_manifest(index_dir, manifest)
+        if len(snapshot) < 2 and not any(seg['deleted'] for seg in snapshot):
+            return None
+
+        builder = IndexBuilder()
+        # (segment name, old doc id) -> doc id in the merged segment
+        remap: Dict[Tuple[str, int], int] = {}
+        for seg in snapshot:
+            deleted = set(seg['deleted'])
+            try:
+                segment = Segment(os.path.join(index_dir, seg['name']))
+            except FileNotFoundError:
+                # An update dropped it meanwhile because all its docs were deleted
+                continue
+            try:
+                local = {}
+                for doc_id, doc in enumerate(segment.docs):
+                    if doc_id not in deleted:
+                        local[doc_id] = remap[(seg['name'], doc_id)] = builder.add_doc(doc)
+                for term_id in range(segment.n_terms):
+                    postings = [(local[doc_id], segment.positions(pos_start, pos_end))
+                                for doc_id, _, pos_start, pos_end in segment.postings(term_id)
+                                if doc_id in local]
+                    if postings:
+                        builder.postings.setdefault(segment.term(term_id), []).extend(postings)
+            finally:
+                segment.close()
+        builder.write(os.path.join(index_dir, merged_name))
+
+        with IndexLock(index_dir):
+            manifest = load_manifest(index_dir)
+            current = {seg['name']: seg for seg in manifest['segments']}
+            deleted = []
+            for seg in snapshot:
+                # A segment dropped since the snapshot had all its docs deleted
+                now_deleted = set(current[seg['name']]['deleted']) if seg['name'] in current \
+                    else set(range(seg['docs']))
+                for doc_id in now_deleted - set(seg['deleted']):
+                    if (seg['name'], doc_id) in remap:
+                        deleted.append(remap[(seg['name'], doc_id)])
+            for entry in manifest['files'].values():
+                key = (entry['segment'], entry['doc'])
+                if key in remap:
+                    entry.update(segment=merged_name, doc=remap[key])
+
+            merged_names = {seg['name'] for seg in snapshot}
+            manifest['segments'] = [{'name': merged_name, 'docs': len(builder.docs), 'deleted': sorted(deleted)}] + \
+                [seg for seg in manifest['segments'] if seg['name'] not in merged_names]
+            save_manifest(index_dir, manifest)
+        _remove_segment_files(index_dir, sorted(merged_names))
+    finally:
+        merge_lock.release()
+
+    return {'segments': len(snapshot), 'docs': len(builder.docs), 'seconds': time.perf_counter() - start}
+
+
+def start_background_merge(index_dir: str = DEFAULT_INDEX):
+    """Run 'grit_search.py merge' in a detached process and return immediately."""
+    subprocess.Popen([sys.executable, os.path.abspath(__file__), '--index', index_dir, 'merge'],
+                     stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                     start_new_session=True)
+
+
+def parse_query(query: str) -> Tuple[List[str], List[List[str]]]:
+    """
+    Split a query into single terms and "quoted phrases".
+
+    Returns:
+        (terms, phrases as lists of terms); one-word phrases count as terms
+    """
+    terms, phrases = [], []
+    for phrase, word in QUERY_RE.findall(query):
+        tokens = tokenize(phrase if phrase else word)
+        if phrase and len(tokens) > 1:
+            phrases.append(tokens)
+        else:
+            terms.extend(tokens)
+    return terms, phrases
+
+
+class Segment:
+    """Read-only, memory-mapped view of one segment file."""
+
+    def __init__(self, index_path: str):
+        """
+        Open a segment file.
+
+        Args:
+            index_path: File written by IndexBuilder.write()
+        """
+        self.index_path = index_path
+        self._file = open(index_path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:8] != MAGIC:
+            self.close()
+            raise ValueError(f"Not a GRIT search index: {index_path}")
+
+        header_len = struct.unpack_from('<I', self._mm, 8)[0]
+        header = json.loads(self._mm[12:12 + header_len])
+        if header.get('version') != FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"Index format is out of date: {index_path} (run 'grit_search.py build')")
+        self.docs: List[Dict] = header['docs']
+        self.n_terms: int = header['terms']
+        self.n_grams: int = header['grams']
+
+        offset = 12 + header_len
+        offset += -offset % 4
+        view = memoryview(self._mm)
+        arrays = []
+        for count in (self.n_terms + 1, self.n_terms + 1, self.n_terms + 1, self.n_terms,
+                      self.n_grams + 1, self.n_grams + 1):
+            arrays.append(self._u32_view(view, offset, count))
+            offset += 4 * count
+        (self._term_offsets, self._doc_offsets, self._pos_offsets, self.doc_freqs,
+         self._gram_offsets, self._gram_ids_offsets) = arrays
+
+        sizes = header['sizes']
+        self._terms_start = offset
+        self._docs_start = self._terms_start + sizes['terms']
+        self._pos_start = self._docs_start + sizes['doc_postings']
+        self._grams_start = self._pos_start + sizes['positions']
+        self._gram_ids_start = self._grams_start + sizes['grams']
+
+    @staticmethod
+    def _u32_view(view: memoryview, offset: int, count: int):
+        """u32 array at offset, zero-copy when the machine is little-endian."""
+        chunk = view[offset:offset + 4 * count]
+        if sys.byteorder == 'little':
+            return chunk.cast('I')
+        arr = array('I', chunk)
+        arr.byteswap()
+        return arr
+
+    def close(self):
+        """Unmap and close the segment file."""
+        for attr in ('_term_offsets', '_doc_offsets', '_pos_offsets', 'doc_freqs',
+                     '_gram_offsets', '_gram_ids_offsets'):
+            if isinstance(getattr(self, attr, None), memoryview):
+                getattr(self, attr).release()
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def term(self, term_id: int) -> str:
+        """Term text for a term id."""
+        start = self._terms_start + self._term_offsets[term_id]
+        end = self._terms_start + self._term_offsets[term_id + 1]
+        return self._mm[start:end].decode('utf-8')
+
+    def lookup(self, term: str) -> int:
+        """
+        Find a term by binary search over the sorted term dictionary.
+
+        Returns:
+            Term id, or -1 if the term isn't in the index
+        """
+        return self._find(term, self._term_offsets, self._terms_start, self.n_terms)
+
+    def _find(self, text: str, offsets, base: int, count: int) -> int:
+        """Binary search for text in a sorted blob; returns its index or -1."""
+        key = text.encode('utf-8')
+        lo, hi = 0, count
+        mm = self._mm
+        while lo < hi:
+            mid = (lo + hi) // 2
+            probe = mm[base + offsets[mid]:base + offsets[mid + 1]]
+            if probe < key:
+                lo = mid + 1
+            elif probe > key:
+                hi = mid
+            else:
+                return mid
+        return -1
+
+    def postings(self, term_id: int) -> List[Tuple[int, int, int, int]]:
+        """
+        Doc postings for a term.
+
+        Returns:
+            List of (doc id, term freq, positions start, positions end);
+            pass the offsets to positions() to decode them
+        """
+        values = decode_varints(self._mm, self._docs_start + self._doc_offsets[term_id],
+                                self._docs_start + self._doc_offsets[term_id + 1])
+        result = []
+        doc_id = 0
+        pos = self._pos_start + self._pos_offsets[term_id]
+        for i in range(0, len(values), 3):
+            doc_id += values[i]
+            result.append((doc_id, values[i + 1], pos, pos + values[i + 2]))
+            pos += values[i + 2]
+        return result
+
+    def gram_terms(self, gram: str) -> List[int]:
+        """Ids of the terms containing a trigram (see trigrams())."""
+        gram_id = self._find(gram, self._gram_offsets, self._grams_start, self.n_grams)
+        if gram_id < 0:
+            return []
+        ids = decode_varints(self._mm, self._gram_ids_start + self._gram_ids_offsets[gram_id],
+                             self._gram_ids_start + self._gram_ids_offsets[gram_id + 1])
+        for i in range(1, len(ids)):
+            ids[i] += ids[i - 1]
+        return ids
+
+    def similar_terms(self, term: str, max_edits: int) -> Dict[str, int]:
+        """
+        Terms within max_edits edits of a term.
+
+        Each edit changes at most three trigrams, so candidates must share at
+        least len(trigrams) - 3 * max_edits trigrams with the term; only those
+        are checked with edit_distance().
+
+        Returns:
+            term -> edit distance
+        """
+        grams = list(dict.fromkeys(trigrams(term)))
+        shared: Dict[int, int] = {}
+        for gram in grams:
+            for term_id in self.gram_terms(gram):
+                shared[term_id] = shared.get(term_id, 0) + 1
+        needed = max(1, len(grams) - 3 * max_edits)
+
+        matches = {}
+        for term_id, count in shared.items():
+            if count < needed:
+                continue
+            candidate = self.term(term_id)
+            distance = edit_distance(term, candidate, max_edits)
+            if distance <= max_edits:
+                matches[candidate] = distance
+        return matches
+
+    def positions(self, start: int, end: int) -> List[int]:
+        """Decode one doc's positions for a term."""
+        positions = decode_varints(self._mm, start, end)
+        for i in range(1, len(positions)):
+            positions[i] += positions[i - 1]
+        return positions
+
+    def phrase_postings(self, tokens: List[str]) -> Dict[int, int]:
+        """
+        Docs containing the tokens as consecutive words.
+
+        Returns:
+            doc id -> number of phrase occurrences
+        """
+        term_ids = [self.lookup(t) for t in tokens]
+        if any(t < 0 for t in term_ids):
+            return {}
+        # Intersect starting from the rarest term
+        lists = [{p[0]: p for p in self.postings(t)} for t in term_ids]
+        candidates = set(min(lists, key=len))
+        for postings in lists:
+            candidates &= postings.keys()
+
+        matches = {}
+        for doc_id in candidates:
+            starts = None
+            for i, postings in enumerate(lists):
+                _, _, start, end = postings[doc_id]
+                shifted = {p - i for p in self.positions(start, end)}
+                starts = shifted if starts is None else starts & shifted
+                if not starts:
+                    break
+            if starts:
+                matches[doc_id] = len(starts)
+        return matches
+
+
+class GritIndex:
+    """Searchable view of an index directory: every segment, minus deleted docs."""
+
+    def __init__(self, index_path: str = DEFAULT_INDEX):
+        """
+        Open an index.
+
+        Args:
+            index_path: Index directory written by build_index()/update_index(),
+                or a single segment file
+        """
+        self.index_path = index_path
+        self.segments: List[Segment] = []
+        self.deleted: List[set] = []
+        self.text_dir = DEFAULT_TEXT_DIR
+        if os.path.isfile(index_path):
+            self.segments.append(Segment(index_path))
+            self.deleted.append(set())
+        else:
+            self._open_segments()
+
+        lengths = [doc['length'] for _, doc in self.live_docs()]
+        self.n_docs = len(lengths)
+        self.avg_length = sum(lengths) / max(1, len(lengths))
+
+    def _open_segments(self, attempts: int = 3):
+        """Open the segments listed in the manifest, retrying if a merge replaces them meanwhile."""
+        for attempt in range(attempts):
+            manifest = load_manifest(self.index_path)
+            self.text_dir = manifest.get('text_dir', DEFAULT_TEXT_DIR)
+            try:
+                for seg in manifest['segments']:
+                    self.segments.append(Segment(os.path.join(self.index_path, seg['name'])))
+                    self.deleted.append(set(seg['deleted']))
+                return
+            except FileNotFoundError:
+                self.close()
+                self.segments, self.deleted = [], []
+                if attempt == attempts - 1:
+                    raise
+
+    def close(self):
+        """Close every segment."""
+        for segment in self.segments:
+            segment.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def live_docs(self):
+        """Yield ((segment number, doc id), doc) for every doc that isn't deleted."""
+        for seg_no, segment in enumerate(self.segments):
+            deleted = self.deleted[seg_no]
+            for doc_id, doc in enumerate(segment.docs):
+                if doc_id not in deleted:
+                    yield (seg_no, doc_id), doc
+
+    def doc(self, key: Tuple[int, int]) -> Dict:
+        """Doc metadata for a (segment number, doc id) key."""
+        return self.segments[key[0]].docs[key[1]]
+
+    def term_hits(self, term: str) -> Dict[Tuple[int, int], int]:
+        """Live docs containing a term: (segment number, doc id) -> term freq."""
+        hits = {}
+        for seg_no, segment in enumerate(self.segments):
+            term_id = segment.lookup(term)
+            if term_id < 0:
+                continue
+            deleted = self.deleted[seg_no]
+            for doc_id, tf, _, _ in segment.postings(term_id):
+                if doc_id not in deleted:
+                    hits[(seg_no, doc_id)] = tf
+        return hits
+
+    def phrase_hits(self, tokens: List[str]) -> Dict[Tuple[int, int], int]:
+        """Live docs containing a phrase: (segment number, doc id) -> occurrences."""
+        hits = {}
+        for seg_no, segment in enumerate(self.segments):
+            deleted = self.deleted[seg_no]
+            for doc_id, tf in segment.phrase_postings(tokens).items():
+                if doc_id not in deleted:
+                    hits[(seg_no, doc_id)] = tf
+        return hits
+
+    def expand_term(self, term: str, max_edits: Optional[int] = None) -> Dict[str, int]:
+        """
+        Dictionary terms within a few edits of a query word, from every segment.
+
+        Args:
+            term: Normalized query word
+            max_edits: Edits to allow (default: default_max_edits(term))
+
+        Returns:
+            term -> edit distance (the word itself is included if indexed)
+        """
+        if max_edits is None:
+            max_edits = default_max_edits(term)
+        if max_edits <= 0:
+            return {term: 0}
+        variants: Dict[str, int] = {}
+        for segment in self.segments:
+            for variant, distance in segment.similar_terms(term, max_edits).items():
+                variants[variant] = min(distance, variants.get(variant, distance))
+        return variants
+
+    def split_hits(self, term: str) -> Tuple[Dict[Tuple[int, int], int], List[str]]:
+        """
+        Docs where OCR split a word in two ("tram way" for "tramway").
+
+        Returns:
+            ((segment number, doc id) -> occurrences, the parts that matched)
+        """
+        hits: Dict[Tuple[int, int], int] = {}
+        parts = []
+        for i in range(2, len(term) - 1):
+            pair = [term[:i], term[i:]]
+            pair_hits = self.phrase_hits(pair)
+            if pair_hits:
+                parts.extend(pair)
+                for key, tf in pair_hits.items():
+                    hits[key] = hits.get(key, 0) + tf
+        return hits, parts
+
+    def _bm25(self, tf: float, df: int, key: Tuple[int, int]) -> float:
+        """BM25 weight of one query term in one doc."""
+        idf = math.log(1 + (self.n_docs - df + 0.5) / (df + 0.5))
+        norm = 1 - BM25_B + BM25_B * self.doc(key)['length'] / self.avg_length
+        return idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * norm)
+
+    def allowed_docs(self, year_from: Optional[int] = None, year_to: Optional[int] = None) -> Optional[set]:
+        """Doc keys within a year range (None when there's no filter)."""
+        if year_from is None and year_to is None:
+            return None
+        lo = year_from if year_from is not None else -math.inf
+        hi = year_to if year_to is not None else math.inf
+        return {key for key, doc in self.live_docs() if doc['year'] is not None and lo <= doc['year'] <= hi}
+
+    def search(self, query: str, year_from: Optional[int] = None, year_to: Optional[int] = None,
+               limit: int = 10, require_all: bool = False, fuzzy: bool = False,
+               max_edits: Optional[int] = None, snippets: bool = False,
+               mark: Tuple[str, str] = ('**', '**')) -> List[Dict]:
+        """
+        Rank issues for a query with BM25.
+
+        Every "quoted phrase" must appear in a matching issue; single terms add
+        to the score, and with require_all they must all appear too. In fuzzy
+        mode each single term also matches dictionary terms within max_edits
+        edits and OCR-split forms of the word, scored FUZZY_PENALTY lower per
+        edit; phrases still match exactly.
+
+        Args:
+            query: Words and "quoted phrases"
+            year_from, year_to: Inclusive year range
+            limit: Maximum number of results
+            require_all: Only return issues containing every term
+            fuzzy: Tolerate OCR errors in single terms
+            max_edits: Edits allowed in fuzzy mode (default: 1-2 depending on word length)
+            snippets: Add highlighted excerpts from the OCR text
+            mark: Strings put around highlighted words in snippets
+
+        Returns:
+            Result dictionaries (doc fields plus 'score', 'thumbnail', 'matched'
+            terms and optionally 'snippet'), best first
+        """
+        terms, phrases = parse_query(query)
+        allowed = self.allowed_docs(year_from, year_to)
+        scores: Dict[Tuple[int, int], float] = {}
+        matched: Dict[Tuple[int, int], set] = {}
+        required = []
+
+        for tokens in phrases:
+            hits = self.phrase_hits(tokens)
+            required.append(set(hits))
+            for key, tf in hits.items():
+                scores[key] = scores.get(key, 0.0) + self._bm25(tf, len(hits), key)
+                matched.setdefault(key, set()).update(tokens)
+
+        for term in dict.fromkeys(terms):
+            # All variants of a word score as one term: occurrences are weighted
+            # down per edit, and the doc frequency is that of any variant, so
+            # rare OCR misspellings don't outrank the real word through idf
+            weighted_tf: Dict[Tuple[int, int], float] = {}
+            variants = self.expand_term(term, max_edits) if fuzzy else {term: 0}
+            for variant, distance in variants.items():
+                for key, tf in self.term_hits(variant).items():
+                    weighted_tf[key] = weighted_tf.get(key, 0.0) + tf * FUZZY_PENALTY ** distance
+                    matched.setdefault(key, set()).add(variant)
+            if fuzzy and len(term) >= 4:
+                hits, parts = self.split_hits(term)
+                for key, tf in hits.items():
+                    weighted_tf[key] = weighted_tf.get(key, 0.0) + tf * FUZZY_PENALTY
+                    matched.setdefault(key, set()).update(parts)
+            if require_all:
+                required.append(set(weighted_tf))
+            for key, tf in weighted_tf.items():
+                scores[key] = scores.get(key, 0.0) + self._bm25(tf, len(weighted_tf), key)
+
+        candidates = set(scores)
+        for docs in required:
+            candidates &= docs
+        if allowed is not None:
+            candidates &= allowed
+
+        ranked = sorted(candidates, key=lambda k: (-scores[k], self.doc(k)['name']))[:limit]
+        results = []
+        for key in ranked:
+            doc = self.doc(key)
+            result = dict(doc, score=scores[key], thumbnail=thumbnail_name(doc), matched=sorted(matched[key]))
+            if snippets:
+                result['snippet'] = self.snippet(doc, matched[key], mark=mark)
+            results.append(result)
+        return results
+
+    def snippet(self, doc: Dict, terms: set, mark: Tuple[str, str] = ('**', '**')) -> str:
+        """Highlighted excerpt of an issue's OCR text (empty if the text file is gone)."""
+        try:
+            with open(os.path.join(self.text_dir, doc['path']), encoding='utf-8', errors='replace') as f:
+                return make_snippet(f.read(), terms, mark=mark)
+        except OSError:
+            return ''
+
+
+def index_size(index_path: str) -> int:
+    """Bytes used by an index's segment files."""
+    return sum(os.path.getsize(os.path.join(index_path, seg['name']))
+               for seg in load_manifest(index_path)['segments'])
+
+
+def parse_args():
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description="Full-text search over the GRIT archive OCR text.")
+    parser.add_argument('--index', default=DEFAULT_INDEX, help=f"Index directory (default: {DEFAULT_INDEX})")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    for command, help_text in (('build', "Index all the OCR text from scratch"),
+                               ('update', "Index new, changed and deleted OCR files only")):
+        cmd = sub.add_parser(command, help=help_text)
+        cmd.add_argument('--text-dir', default=DEFAULT_TEXT_DIR,
+                         help=f"OCR text directory (default: {DEFAULT_TEXT_DIR})")
+        if command == 'update':
+            cmd.add_argument('--merge', choices=['background', 'now', 'never'], default='background',
+                             help=f"Merge segments when there are more than {MAX_SEGMENTS} "
+                                  f"(default: in a background process)")
+
+    sub.add_parser('merge', help="Merge all segments into one, dropping deleted issues")
+
+    search = sub.add_parser('search', help="Search the index")
+    search.add_argument('query', help='Words and "quoted phrases"')
+    search.add_argument('--from', dest='year_from', type=int, metavar='YEAR', help="First year to include")
+    search.add_argument('--to', dest='year_to', type=int, metavar='YEAR', help="Last year to include")
+    search.add_argument('--limit', type=int, default=10, help="Number of results (default: 10)")
+    search.add_argument('--all', dest='require_all', action='store_true',
+                        help="Only show issues containing every word")
+    search.add_argument('--fuzzy', action='store_true',
+                        help="Tolerate OCR errors and split words in single words")
+    search.add_argument('--max-edits', type=int, metavar='N',
+                        help="Edits allowed per word with --fuzzy (default: 1 for 4-5 letters, 2 for longer)")
+    search.add_argument('--thumbnail-url', default='', metavar='URL',
+                        help="Base URL to put in front of thumbnail names")
+    search.add_argument('--no-snippets', dest='snippets', action='store_false',
+                        help="Don't show excerpts of the matching text")
+    search.add_argument('--json', action='store_true', help="Print results as JSON")
+    return parser.parse_args()
+
+
+def main():
+    """Main execution function."""
+    args = parse_args()
+
+    if args.command in ('build', 'update'):
+        if not os.path.isdir(args.text_dir):
+            print(f"✗ OCR text directory not found: {args.text_dir}")
+            return
+        if args.command == 'build':
+            stats = build_index(args.text_dir, args.index)
+            print(f"✓ Indexed {stats['docs']} issues in {stats['seconds']:.1f}s")
+        else:
+            stats = update_index(args.text_dir, args.index)
+            print(f"✓ {stats['added']} added, {stats['replaced']} replaced, {stats['deleted']} deleted, "
+                  f"{stats['unchanged']} unchanged in {stats['seconds'] * 1000:.0f} ms")
+            if stats['segments'] > MAX_SEGMENTS and args.merge == 'background':
+                start_background_merge(args.index)
+                print(f"Merging {stats['segments']} segments in the background")
+            elif stats['segments'] > MAX_SEGMENTS and args.merge == 'now':
+                merge_index(args.index)
+        print(f"✓ Index saved to: {args.index} ({len(load_manifest(args.index)['segments'])} segment(s), "
+              f"{index_size(args.index) / 1024 / 1024:.1f} MB)")
+        return
+
+    if not os.path.exists(args.index):
+        print(f"✗ Index not found: {args.index} (run 'grit_search.py build' first)")
+        return
+
+    if args.command == 'merge':
+        stats = merge_index(args.index)
+        if stats:
+            print(f"✓ Merged {stats['segments']} segments ({stats['docs']} issues) in {stats['seconds']:.1f}s")
+        else:
+            print("Nothing to merge (or another merge is running)")
+        return
+
+    # Bold highlights on a terminal, Markdown-style ones when piped
+    mark = ('\033[1m', '\033[0m') if sys.stdout.isatty() and not args.json else ('**', '**')
+    start = time.perf_counter()
+    with GritIndex(args.index) as index:
+        results = index.search(args.query, year_from=args.year_from, year_to=args.year_to,
+                               limit=args.limit, require_all=args.require_all, fuzzy=args.fuzzy,
+                               max_edits=args.max_edits, snippets=args.snippets, mark=mark)
+    elapsed = (time.perf_counter() - start) * 1000
+    for result in results:
+        if result['thumbnail'] and args.thumbnail_url:
+            result['thumbnail'] = args.thumbnail_url.rstrip('/') + '/' + result['thumbnail']
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    if not results:
+        print(f"No matches ({elapsed:.1f} ms)")
+        return
+    print(f"{len(results)} results ({elapsed:.1f} ms)\n")
+    for rank, result in enumerate(results, 1):
+        date = f"{result['year']}-{result['month']:02d}" if result['year'] else '?'
+        print(f"{rank:>3}. {result['name']}  ({date})  score {result['score']:.2f}")
+        if args.fuzzy:
+            print(f"     matched: {', '.join(result['matched'])}")
+        if result['thumbnail']:
+            print(f"     thumbnail: {result['thumbnail']}")
+        if result.get('snippet'):
+            print(f"     {result['snippet']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Macro Ordering Check
+Runs directory_printer.py on a small fixture export and compares its output
+with what directory_formatter_macro.bas produces for the same rows. The
+expected rows were worked out from the macro's Excel sort keys.
+
+The fixture covers:
+- Name Sort Order overrides
+- case-insensitive names and units ("north 2" is grouped with "North 2")
+- apostrophes ignored when sorting names
+- street numbers sorting as numbers and before "725-20"
+- blanks sorting last
+- Resident rows
+- hidden phones
+- skipped rows with no address
+- pure-number and missing units sorting after named units
+- "Ann & Bob" names with two phones
+
+    python check_macro_ordering.py
+    python check_macro_ordering.py -o /tmp/fixture   # also write the XLSX/PDF to look at
+"""
+
+import argparse
+import os
+from typing import List
+
+import pandas as pd
+
+from directory_printer import (DEFAULT_SETTINGS, OUT_BY_UNIT_TOC, build_directory, build_printable_directory,
+                               layout_directory, unit_sections)
+
+
+FIXTURE_HEADERS = ['First Name', 'Last Name', 'Street Number', 'Street Name', 'Street Unit', 'HOA Unit',
+                   'Phone', 'Is Member', 'List Name in Directory', 'List Phone in Directory', 'Name Sort Order']
+FIXTURE_ROWS = [
+    ['Ann', 'Oakes', '725', 'Tramway Vista Dr NE', '', 'North 10', '505-555-0101', '1', '1', '1', ''],
+    ['Sean', "O'Brien", '99', 'Live Oak Rd NE', '', 'North 2', '505-555-0102', '0', '1', '1', ''],
+    ['Kim', 'oakes', '1000', 'Pino Ct NE', '', 'north 2', '505-555-0103', '1', '1', '0', ''],
+    ['Zed', 'Adams', '12', 'Cedar Hill Rd NE', '', 'South Unit 1', '', '1', '1', '1', '1'],
+    ['Pat', 'Lee', '725', 'Tramway Vista Dr NE', '20', 'North 10', '505-555-0105', '1', '0', '1', ''],
+    ['Ann & Bob', 'Smith-Jones', '40', 'Rockridge Dr NE', '', '12', '505-555-0106\n505-555-0107', '1', '1', '1', ''],
+    ['Lou', 'Young', '5', 'Big Horn Ridge Cir NE', '', '', '505-555-0108', '0', '1', '1', ''],
+    ['Nobody', 'Here', '', '', '', 'North 2', '', '0', '1', '1', ''],
+    ['Max', 'Abbott', '', 'Pino Ct NE', '', 'North 2', '', '1', '1', '1', ''],
+]
+
+# PRINT-BY-NAME: Last Name, First Name, Phone #, Street number, Street Name, Member?
+EXPECTED_BY_NAME = [
+    ('Adams', 'Zed', '', '12', 'Cedar Hill Rd NE', 'Yes'),
+    ('Abbott', 'Max', '', '', 'Pino Ct NE', 'Yes'),
+    ('Oakes', 'Ann', '505-555-0101', '725', 'Tramway Vista Dr NE', 'Yes'),
+    ('oakes', 'Kim', '', '1000', 'Pino Ct NE', 'Yes'),
+    ("O'Brien", 'Sean', '505-555-0102', '99', 'Live Oak Rd NE', 'No'),
+    ('Smith-Jones', 'Ann', '505-555-0106', '40', 'Rockridge Dr NE', 'Yes'),
+    ('Smith-Jones', 'Bob', '505-555-0107', '40', 'Rockridge Dr NE', 'Yes'),
+    ('Young', 'Lou', '505-555-0108', '5', 'Big Horn Ridge Cir NE', 'No'),
+]
+
+# PRINT-BY-UNIT: unit header, then Number, Street Name, Last Name, First Name, Phone, Member?
+EXPECTED_BY_UNIT = [
+    ('North 2', [
+        ('99', 'Live Oak Rd NE', "O'Brien", 'Sean', '505-555-0102', 'No'),
+        ('1000', 'Pino Ct NE', 'oakes', 'Kim', '', 'Yes'),
+        ('', 'Pino Ct NE', 'Abbott', 'Max', '', 'Yes'),
+    ]),
+    ('North 10', [
+        ('725', 'Tramway Vista Dr NE', 'Oakes', 'Ann', '505-555-0101', 'Yes'),
+        ('725-20', 'Tramway Vista Dr NE', '', 'Resident', '', 'Yes'),
+    ]),
+    ('South Unit 1', [
+        ('12', 'Cedar Hill Rd NE', 'Adams', 'Zed', '', 'Yes'),
+    ]),
+    ('12', [
+        ('40', 'Rockridge Dr NE', 'Smith-Jones', 'Ann', '505-555-0106', 'Yes'),
+        ('40', 'Rockridge Dr NE', 'Smith-Jones', 'Bob', '505-555-0107', 'Yes'),
+    ]),
+    ('(No Unit)', [
+        ('5', 'Big Horn Ridge Cir NE', 'Young', 'Lou', '505-555-0108', 'No'),
+    ]),
+]
+
+# PRINT-BY-UNIT-TOC with each unit on a new page
+EXPECTED_TOC = [('North 2', 'B-1'), ('North 10', 'B-2'), ('South Unit 1', 'B-3'), ('12', 'B-4'), ('(No Unit)', 'B-5')]
+
+
+def fixture_export() -> pd.DataFrame:
+    """The fixture rows as an export DataFrame."""
+    return pd.DataFrame(FIXTURE_ROWS, columns=FIXTURE_HEADERS)
+
+
+def _compare(label: str, actual: list, expected: list) -> List[str]:
+    """Row-by-row differences between two lists."""
+    problems = []
+    for i in range(max(len(actual), len(expected))):
+        got = actual[i] if i < len(actual) else None
+        want = expected[i] if i < len(expected) else None
+        if got != want:
+            problems.append(f"{label} row {i + 1}: got {got}, expected {want}")
+    return problems
+
+
+def check_macro_ordering() -> List[str]:
+    """
+    Build the fixture directory and compare it with the macro's output.
+
+    Returns:
+        Differences found (empty when the output matches)
+    """
+    by_name, by_unit = build_directory(fixture_export())
+    problems = _compare('PRINT-BY-NAME', list(by_name.iloc[:, :6].itertuples(index=False, name=None)),
+                        EXPECTED_BY_NAME)
+    sections = [(label, list(rows.iloc[:, 1:].itertuples(index=False, name=None)))
+                for label, rows in unit_sections(by_unit)]
+    problems += _compare('PRINT-BY-UNIT', sections, EXPECTED_BY_UNIT)
+    sheets = layout_directory(by_name, by_unit, dict(DEFAULT_SETTINGS))
+    problems += _compare(OUT_BY_UNIT_TOC, [cells for _, cells in sheets[OUT_BY_UNIT_TOC]['rows']], EXPECTED_TOC)
+    return problems
+
+
+def parse_args():
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description="Check directory_printer.py against the macro's ordering.")
+    parser.add_argument('-o', '--output', help="Also write the fixture directory to this path (without extension)")
+    return parser.parse_args()
+
+
+def main():
+    """Main execution function."""
+    args = parse_args()
+    problems = check_macro_ordering()
+    if problems:
+        print(f"✗ {len(problems)} difference(s) from the macro's ordering:")
+        for problem in problems:
+            print(f"  {problem}")
+        raise SystemExit(1)
+    print(f"✓ By-name, by-unit and TOC order match the macro ({len(FIXTURE_ROWS)} fixture rows)")
+    if args.output:
+        out_dir = os.path.dirname(args.output)
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+        for fmt, path in build_printable_directory(fixture_export(), args.output).items():
+            print(f"✓ {fmt.upper()} saved to: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,738 @@
+#!/usr/bin/env python3
+"""
+Directory Printer
+Builds the printable homeowner directory from the website's Address Users
+export without Excel. It applies the same rules as directory_formatter_macro.bas:
+
+- PRINT-BY-NAME lists people who chose to list their name. Rows are sorted by
+  Name Sort Order, last name, first name, street number and street.
+- PRINT-BY-UNIT lists everyone. People who did not list their name show as
+  "Resident". Rows are grouped under a shaded header per unit (HOA Unit,
+  falling back to District) and sorted by the unit's text, then its number,
+  then street number, street and name.
+- PRINT-BY-UNIT-TOC lists the units in order.
+
+Sorting follows Excel's: case-insensitive, numbers before text, blanks last.
+Because the pages are laid out here rather than by Excel, the TOC gets real
+page numbers.
+
+Names in the "First1 & First2" / newline-separated form are expanded to one
+row per person. Newline-separated phones are matched to those people in order.
+
+The input can be an export CSV or the workbook itself (its PASTE-HERE sheet
+and Instructions settings). One run writes the XLSX with all three sheets and
+a single PDF with the A- and B- numbered sections:
+
+    python directory_printer.py export.csv -o directory/2026
+"""
+
+import argparse
+import importlib.util
+import os
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import fitz  # PyMuPDF
+import pandas as pd
+
+
+INPUT_SHEET = 'PASTE-HERE'
+OUT_BY_NAME = 'PRINT-BY-NAME'
+OUT_BY_UNIT = 'PRINT-BY-UNIT'
+OUT_BY_UNIT_TOC = 'PRINT-BY-UNIT-TOC'
+OUTPUT_STEM = 'directory'
+FORMATS = ['xlsx', 'pdf']
+
+# Instructions sheet cells read by the macro, and its defaults
+SETTINGS_SHEET = 'Instructions'
+SETTINGS_CELLS = {
+    'font_size': 'C30',
+    'unit_page_breaks': 'C31',
+    'zebra': 'C32',
+    'prefix_by_name': 'C33',
+    'prefix_by_unit': 'C34',
+}
+DEFAULT_SETTINGS = {
+    'font_size': 10.0,
+    'unit_page_breaks': True,
+    'zebra': False,
+    'prefix_by_name': 'A',
+    'prefix_by_unit': 'B',
+}
+
+REQUIRED_HEADERS = ['First Name', 'Last Name', 'Street Number', 'Street Name', 'Is Member',
+                    'List Name in Directory', 'List Phone in Directory']
+OPTIONAL_HEADERS = ['Street Unit', 'HOA Unit', 'District', 'Phone', 'Name Sort Order']
+
+NAME_COLUMNS = ['Last Name', 'First Name', 'Phone #', 'Street number', 'Street Name', 'Member?']
+UNIT_COLUMNS = ['Number', 'Street Name', 'Last Name', 'First Name', 'Phone', 'Member?']
+TOC_COLUMNS = ['Unit', 'Page']
+# Horizontal alignment per printed column, as set by the macro
+NAME_ALIGN = ['left', 'left', 'center', 'center', 'left', 'center']
+UNIT_ALIGN = ['center', 'left', 'left', 'left', 'center', 'center']
+TOC_ALIGN = ['center', 'center']
+
+MISSING_SORT = 999999
+NO_UNIT = '(No Unit)'
+RESIDENT = 'Resident'
+
+# Page layout (US Letter, points). Rows are font size + 4 high, headers use
+# font size + 1, and wide tables are scaled down to fit one page across
+# (Excel's "fit to 1 page wide").
+PAGE_SIZE = (612, 792)
+MARGIN = 36
+FOOTER_HEIGHT = 18
+CELL_PADDING = 4
+FONT = 'helv'
+FONT_BOLD = 'hebo'
+UNIT_FILL = (235 / 255,) * 3
+ZEBRA_FILL = (245 / 255,) * 3
+# Excel column width unit (one '0' in the default font), in points
+EXCEL_WIDTH_UNIT = 5.25
+
+# Cell text cleanup: drop quotes and control characters, tabs and nbsp to spaces
+_CLEAN_TABLE = {0x22: None, 0xA0: ' ', 0x09: ' ', **{i: None for i in range(32) if i != 9}}
+_CLEAN_LF_TABLE = {k: v for k, v in _CLEAN_TABLE.items() if k not in (0x0A, 0x0D)}
+_NUMBER_RE = re.compile(r'^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$')
+_VAL_RE = re.compile(r'^\s*([+-]?(\d+\.?\d*|\.\d+))')
+_DIGITS_RE = re.compile(r'\d+')
+
+
+def clean_text(value: str) -> str:
+    """Single-line cell text: quotes and control characters removed, trimmed."""
+    return value.translate(_CLEAN_TABLE).strip(' ')
+
+
+def excel_trim(value: str) -> str:
+    """Excel TRIM(): strip spaces and collapse runs of spaces."""
+    return ' '.join(part for part in value.split(' ') if part)
+
+
+def _lines(value: str) -> List[str]:
+    """Non-blank lines of a multi-line cell, cleaned and trimmed."""
+    text = value.translate(_CLEAN_LF_TABLE).replace('\r\n', '\n').replace('\r', '\n')
+    return [line for line in (excel_trim(part) for part in text.split('\n')) if line]
+
+
+def is_true(value: str) -> bool:
+    """The macro's flag test: 1, 1.0 or TRUE."""
+    text = str(value).strip()
+    if text.lower() == 'true':
+        return True
+    try:
+        return float(text) == 1
+    except ValueError:
+        return False
+
+
+def name_sort_value(value: str) -> int:
+    """Name Sort Order as the macro reads it: CLng(Val(x)), blank -> MISSING_SORT."""
+    if not value.strip():
+        return MISSING_SORT
+    match = _VAL_RE.match(value)
+    return int(round(float(match.group(1)))) if match else 0
+
+
+def unit_sort_keys(unit: str) -> Tuple[str, int]:
+    """
+    Unit text before the first digit, and the first number in the unit.
+
+    "South Unit 10" -> ("South Unit", 10), "12" -> ("", 12), "" -> ("", 999999).
+    The macro's header comment says "rightmost number", but its code takes the
+    first one; this follows the code so the order matches.
+    """
+    text = clean_text(unit)
+    match = _DIGITS_RE.search(text)
+    if not match:
+        return excel_trim(text), MISSING_SORT
+    return excel_trim(text[:match.start()]), int(match.group())
+
+
+def excel_sort_key(value) -> tuple:
+    """
+    Ascending Excel sort position of a value the macro writes to a cell.
+
+    Text that looks like a number is stored as a number, and numbers sort
+    before text. Text compares case-insensitively, ignoring apostrophes and
+    hyphens, and blank cells sort last.
+    """
+    if isinstance(value, (int, float)):
+        return (0, value, '', '')
+    text = str(value).strip()
+    if not text:
+        return (2, 0, '', '')
+    if _NUMBER_RE.match(text):
+        return (0, float(text), '', '')
+    folded = text.casefold()
+    return (1, 0, folded.replace("'", '').replace('-', ''), folded)
+
+
+def _parse_name_line(line: str) -> List[Tuple[str, str]]:
+    """People in one full-name line: "First1 & First2 Last", "First Last", "Last" or "Resident"."""
+    if line.casefold() == RESIDENT.casefold():
+        return [(RESIDENT, '')]
+    tokens = line.split(' ')
+    if len(tokens) == 1:
+        return [('', tokens[0])]
+    last, first = tokens[-1], ' '.join(tokens[:-1])
+    firsts = [excel_trim(part) for part in first.split('&')]
+    return [(f, last) for f in firsts if f]
+
+
+def expand_people(first: str, last: str, phone: str) -> List[Tuple[str, str, str]]:
+    """
+    Split one export row into (first, last, phone) per person.
+
+    Rows without "&" or newlines are returned as they are. Otherwise each line
+    is one entry: "Ann & Bob" with last name "Lee" is Ann Lee and Bob Lee, a
+    single last name is shared by every first-name line, and a line with no
+    last name is parsed as a full name (last word is the last name). Phones
+    are matched to people in order. A single phone is shared, and people
+    beyond the last phone get the last one.
+    """
+    if '&' not in first and not any(ch in first + last + phone for ch in '\r\n'):
+        return [(first, last, phone)]
+
+    first_lines, last_lines = _lines(first), _lines(last)
+    people = []
+    for i in range(max(len(first_lines), len(last_lines))):
+        f = first_lines[i] if i < len(first_lines) else ''
+        if len(last_lines) == 1:
+            l = last_lines[0]
+        else:
+            l = last_lines[i] if i < len(last_lines) else ''
+        if not l:
+            people.extend(_parse_name_line(f))
+        else:
+            people.extend((part, l) for part in ([excel_trim(p) for p in f.split('&') if p.strip()] or ['']))
+    if not people:
+        return [(first, last, phone)]
+
+    phones = _lines(phone)
+    result = []
+    for i, (f, l) in enumerate(people):
+        result.append((f, l, phones[min(i, len(phones) - 1)] if phones else ''))
+    return result
+
+
+def _header_map(columns) -> Dict[str, str]:
+    """Expected header -> export column, matched case-insensitively after cleanup."""
+    found = {clean_text(str(col)).lower(): col for col in reversed(list(columns))}
+    return {name: found[name.lower()] for name in REQUIRED_HEADERS + OPTIONAL_HEADERS if name.lower() in found}
+
+
+def load_directory_export(path: str) -> Tuple[pd.DataFrame, Dict]:
+    """
+    Read the export and its print settings.
+
+    Args:
+        path: Export CSV, or the directory workbook (its PASTE-HERE sheet and
+            Instructions settings are used)
+
+    Returns:
+        (export rows as strings, settings)
+    """
+    if path.lower().endswith(('.xlsx', '.xlsm')):
+        df = pd.read_excel(path, sheet_name=INPUT_SHEET, dtype=str, keep_default_na=False)
+        return df, read_settings(path)
+    return pd.read_csv(path, dtype=str, keep_default_na=False), dict(DEFAULT_SETTINGS)
+
+
+def _yes_no(value: str, default: bool) -> bool:
+    """The macro's yes/no setting."""
+    text = str(value).strip().lower()
+    if text in ('yes', 'y', 'true', '1'):
+        return True
+    if text in ('no', 'n', 'false', '0'):
+        return False
+    return default
+
+
+def read_settings(path: str) -> Dict:
+    """Font size, unit page breaks, zebra stripes and page prefixes from the Instructions sheet."""
+    import openpyxl
+
+    settings = dict(DEFAULT_SETTINGS)
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        if SETTINGS_SHEET not in wb.sheetnames:
+            return settings
+        ws = wb[SETTINGS_SHEET]
+        for key, cell in SETTINGS_CELLS.items():
+            value = ws[cell].value
+            text = '' if value is None else str(value).strip()
+            if not text:
+                continue
+            if key == 'font_size':
+                match = _VAL_RE.match(text)
+                settings[key] = float(match.group(1)) if match else 0.0
+            elif key in ('unit_page_breaks', 'zebra'):
+                settings[key] = _yes_no(text, settings[key])
+            else:
+                settings[key] = text
+    finally:
+        wb.close()
+    return settings
+
+
+def build_directory(export_df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Build the sorted by-name and by-unit directory rows.
+
+    Args:
+        export_df: Address Users export with the PASTE-HERE headers, as strings
+
+    Returns:
+        (by_name with NAME_COLUMNS + NameSort, by_unit with Unit + UNIT_COLUMNS)
+
+    Raises:
+        ValueError: If a required header is missing
+    """
+    cols = _header_map(export_df.columns)
+    missing = [name for name in REQUIRED_HEADERS if name not in cols]
+    if missing:
+        raise ValueError(f"Missing required header(s): {', '.join(missing)}")
+
+    def column(name: str) -> List[str]:
+        if name not in cols:
+            return [''] * len(export_df)
+        return export_df[cols[name]].astype(str).tolist()
+
+    # Unit grouping: HOA Unit when the column exists, else District
+    unit_column = 'HOA Unit' if 'HOA Unit' in cols else 'District'
+    name_rows, unit_rows = [], []
+    for first, last, number, street, street_unit, unit, phone, member, list_name, list_phone, sort_order in zip(
+            column('First Name'), column('Last Name'), column('Street Number'), column('Street Name'),
+            column('Street Unit'), column(unit_column), column('Phone'), column('Is Member'),
+            column('List Name in Directory'), column('List Phone in Directory'), column('Name Sort Order')):
+        street_no, street = clean_text(number), clean_text(street)
+        if not street_no and not street:
+            continue
+        street_unit = clean_text(street_unit)
+        if street_unit:
+            street_no = f"{street_no}-{street_unit}"
+
+        unit = clean_text(unit)
+        unit_alpha, unit_num = unit_sort_keys(unit)
+        member_text = 'Yes' if is_true(member) else 'No'
+        list_name, list_phone = is_true(list_name), is_true(list_phone)
+        name_sort = name_sort_value(sort_order)
+
+        people = expand_people(first.strip(), last.strip(), phone.strip()) if list_name else [(RESIDENT, '', '')]
+        for person_first, person_last, person_phone in people:
+            shown_phone = person_phone if list_name and list_phone else ''
+            # PRINT-BY-NAME leaves out everyone shown as Resident
+            if list_name and (person_first, person_last) != (RESIDENT, ''):
+                name_rows.append((person_last, person_first, shown_phone, street_no, street, member_text, name_sort))
+            unit_rows.append((unit, unit_alpha, unit_num, street_no, street, person_last, person_first,
+                              shown_phone, member_text))
+
+    name_rows.sort(key=lambda r: (r[6], excel_sort_key(r[0]), excel_sort_key(r[1]),
+                                  excel_sort_key(r[3]), excel_sort_key(r[4])))
+    unit_rows.sort(key=lambda r: (excel_sort_key(r[1]), r[2], excel_sort_key(r[3]), excel_sort_key(r[4]),
+                                  excel_sort_key(r[5]), excel_sort_key(r[6])))
+
+    by_name = pd.DataFrame(name_rows, columns=NAME_COLUMNS + ['NameSort'])
+    by_unit = pd.DataFrame([(r[0],) + r[3:] for r in unit_rows], columns=['Unit'] + UNIT_COLUMNS)
+    return by_name, by_unit
+
+
+def unit_sections(by_unit: pd.DataFrame) -> List[Tuple[str, pd.DataFrame]]:
+    """
+    Consecutive by-unit rows under one unit header.
+
+    A new section starts whenever the unit changes, ignoring case, as in the
+    macro; blank units are labelled "(No Unit)".
+    """
+    sections, start, current = [], 0, None
+    units = by_unit['Unit'].str.strip().tolist()
+    for i, unit in enumerate(units):
+        if current is None or unit.casefold() != current.casefold():
+            if current is not None:
+                sections.append((current or NO_UNIT, by_unit.iloc[start:i]))
+            start, current = i, unit
+    if current is not None:
+        sections.append((current or NO_UNIT, by_unit.iloc[start:]))
+    return sections
+
+
+def print_rows(by_name: pd.DataFrame, by_unit: pd.DataFrame) -> Dict[str, List[Tuple[str, tuple]]]:
+    """
+    Printed rows of each sheet, as ('row', cells) or ('unit', (label,)).
+
+    Returns:
+        Sheet name -> rows below the column header
+    """
+    unit_rows, toc_rows = [], []
+    for label, section in unit_sections(by_unit):
+        unit_rows.append(('unit', (label,)))
+        unit_rows.extend(('row', cells) for cells in section[UNIT_COLUMNS].itertuples(index=False, name=None))
+        toc_rows.append(('row', (label, '')))
+    return {
+        OUT_BY_NAME: [('row', cells) for cells in by_name[NAME_COLUMNS].itertuples(index=False, name=None)],
+        OUT_BY_UNIT: unit_rows,
+        OUT_BY_UNIT_TOC: toc_rows,
+    }
+
+
+@lru_cache(maxsize=2)
+def _char_widths(font: str) -> Dict[str, float]:
+    """Advance width of each Latin-1 character at font size 1."""
+    chars = ''.join(chr(i) for i in range(32, 256))
+    return dict(zip(chars, fitz.Font(font).char_lengths(chars, 1)))
+
+
+def text_width(text: str, font_size: float, bold: bool = False) -> float:
+    """Width of text in points."""
+    widths = _char_widths(FONT_BOLD if bold else FONT)
+    return sum(widths.get(ch, 0.6) for ch in text) * font_size
+
+
+def sheet_layout(headers: List[str], rows: List[Tuple[str, tuple]], settings: Dict) -> Dict:
+    """
+    Column widths, scale and row heights for printing one sheet.
+
+    Columns are auto-fit to their longest value, then the whole sheet is
+    scaled down if it is wider than the page.
+    """
+    font_size = settings['font_size']
+    header_size = font_size + 1
+    widths = [text_width(h, header_size, bold=True) for h in headers]
+    for kind, cells in rows:
+        if kind == 'row':
+            for i, cell in enumerate(cells):
+                widths[i] = max(widths[i], text_width(str(cell), font_size))
+    widths = [w + 2 * CELL_PADDING for w in widths]
+    scale = min(1.0, (PAGE_SIZE[0] - 2 * MARGIN) / sum(widths))
+    return {
+        'widths': widths,
+        'scale': scale,
+        'row_height': font_size + 4,
+        'header_height': header_size + 4,
+    }
+
+
+def paginate(rows: List[Tuple[str, tuple]], layout: Dict, unit_page_breaks: bool) -> List[List[int]]:
+    """
+    Split rows into pages below a repeated column header.
+
+    A unit header starts a new page when unit_page_breaks is set (except the
+    first), and is never left alone at the bottom of a page.
+
+    Returns:
+        Row indices on each page
+    """
+    scale = layout['scale']
+    available = (PAGE_SIZE[1] - 2 * MARGIN - FOOTER_HEIGHT) / scale - layout['header_height']
+    pages, page, used = [], [], 0.0
+    for i, (kind, _) in enumerate(rows):
+        height = layout['header_height'] if kind == 'unit' else layout['row_height']
+        needed = height + (layout['row_height'] if kind == 'unit' else 0)
+        if page and ((kind == 'unit' and unit_page_breaks) or used + needed > available):
+            pages.append(page)
+            page, used = [], 0.0
+        page.append(i)
+        used += height
+    if page or not pages:
+        pages.append(page)
+    return pages
+
+
+def zebra_rows(rows: List[Tuple[str, tuple]]) -> List[bool]:
+    """Shaded rows for zebra stripes: every other row, restarting after each unit header."""
+    shaded, shade = [], False
+    for kind, _ in rows:
+        shade = False if kind == 'unit' else not shade
+        shaded.append(shade)
+    return shaded
+
+
+def fill_toc_pages(rows: Dict[str, List[Tuple[str, tuple]]], unit_pages: List[List[int]], prefix: str):
+    """Put each unit's first page ("B-3") into the TOC rows."""
+    page_of = {i: n for n, page in enumerate(unit_pages, 1) for i in page}
+    starts = [page_of[i] for i, (kind, _) in enumerate(rows[OUT_BY_UNIT]) if kind == 'unit']
+    rows[OUT_BY_UNIT_TOC] = [('row', (cells[0], f"{prefix}-{n}"))
+                             for (_, cells), n in zip(rows[OUT_BY_UNIT_TOC], starts)]
+
+
+def write_xlsx(sheets: Dict[str, Dict], path: str, settings: Dict):
+    """
+    Write the three print sheets as the macro formats them.
+
+    Page breaks are placed where the PDF breaks, so the printed pages and the
+    TOC page numbers agree.
+    """
+    from openpyxl import Workbook
+    from openpyxl.styles import Alignment, Font, PatternFill
+    from openpyxl.worksheet.pagebreak import Break
+
+    font_size = settings['font_size']
+    body_font = Font(size=font_size)
+    header_font = Font(size=font_size + 1, bold=True)
+    unit_fill = PatternFill('solid', fgColor='EBEBEB')
+    zebra_fill = PatternFill('solid', fgColor='F5F5F5')
+    aligns = {a: Alignment(horizontal=a, vertical='center') for a in ('left', 'center')}
+
+    wb = Workbook()
+    wb.remove(wb.active)
+    for name, sheet in sheets.items():
+        ws = wb.create_sheet(name)
+        headers, rows, align, layout = sheet['headers'], sheet['rows'], sheet['align'], sheet['layout']
+        ws.append(headers)
+        for cell, a in zip(ws[1], align):
+            cell.font, cell.alignment = header_font, aligns[a]
+        ws.row_dimensions[1].height = layout['header_height']
+
+        shaded = zebra_rows(rows) if settings['zebra'] and name != OUT_BY_UNIT_TOC else [False] * len(rows)
+        for r, ((kind, cells), shade) in enumerate(zip(rows, shaded), 2):
+            if kind == 'unit':
+                ws.cell(r, 1, cells[0])
+                ws.merge_cells(start_row=r, start_column=1, end_row=r, end_column=len(headers))
+                cell = ws.cell(r, 1)
+                cell.font, cell.alignment, cell.fill = header_font, aligns['center'], unit_fill
+                ws.row_dimensions[r].height = layout['header_height']
+                continue
+            for c, (value, a) in enumerate(zip(cells, align), 1):
+                # Whole numbers are stored as numbers, as Excel does when the macro writes them
+                if isinstance(value, str) and value.isdigit() and not value.startswith('0'):
+                    value = int(value)
+                cell = ws.cell(r, c, value)
+                cell.font, cell.alignment = body_font, aligns[a]
+                if shade:
+                    cell.fill = zebra_fill
+            ws.row_dimensions[r].height = layout['row_height']
+
+        for letter, width in zip('ABCDEF', layout['widths']):
+            ws.column_dimensions[letter].width = round(width / EXCEL_WIDTH_UNIT + 1, 1)
+        if name == OUT_BY_NAME:
+            for r, sort_value in enumerate(sheet['name_sort'], 2):
+                ws.cell(r, 7, sort_value)
+            ws.cell(1, 7, 'NameSort')
+            ws.column_dimensions['G'].hidden = True
+        for page in sheet['pages'][:-1]:
+            if page:
+                ws.row_breaks.append(Break(id=page[-1] + 2))
+
+        ws.freeze_panes = 'A2'
+        ws.print_title_rows = '1:1'
+        ws.page_setup.orientation = 'portrait'
+        ws.page_setup.fitToWidth = 1
+        ws.page_setup.fitToHeight = 0
+        ws.sheet_properties.pageSetUpPr.fitToPage = True
+        if sheet['prefix']:
+            ws.oddFooter.center.text = f"{sheet['prefix']}-&P"
+    wb.save(path)
+
+
+def _draw_page(page, headers: List[str], rows: List[Tuple[str, tuple]], shaded: List[bool],
+               align: List[str], layout: Dict, font_size: float):
+    """Draw the column header and one page of rows."""
+    scale = layout['scale']
+    widths = [w * scale for w in layout['widths']]
+    body_size, header_size = font_size * scale, (font_size + 1) * scale
+    row_height, header_height = layout['row_height'] * scale, layout['header_height'] * scale
+    left, right = MARGIN, MARGIN + sum(widths)
+    shape = page.new_shape()
+
+    def text_x(text: str, x: float, width: float, a: str, bold: bool, size: float) -> float:
+        if a == 'center':
+            return x + (width - text_width(text, size, bold)) / 2
+        return x + CELL_PADDING * scale
+
+    def baseline(y: float, height: float, size: float) -> float:
+        return y + height / 2 + size * 0.35
+
+    # Backgrounds first so text is drawn over them
+    y = MARGIN + header_height
+    for (kind, _), shade in zip(rows, shaded):
+        height = header_height if kind == 'unit' else row_height
+        if kind == 'unit' or shade:
+            shape.draw_rect(fitz.Rect(left, y, right, y + height))
+            shape.finish(fill=UNIT_FILL if kind == 'unit' else ZEBRA_FILL, color=None, width=0)
+        y += height
+
+    x = left
+    for header, width, a in zip(headers, widths, align):
+        shape.insert_text((text_x(header, x, width, a, True, header_size), baseline(MARGIN, header_height, header_size)),
+                          header, fontname=FONT_BOLD, fontsize=header_size)
+        x += width
+    shape.draw_line((left, MARGIN + header_height), (right, MARGIN + header_height))
+    shape.finish(width=0.6)
+
+    def write_run(run: List[tuple], y: float):
+        # Per-call text insertion is slow in PyMuPDF, so each column of a run
+        # of rows goes in as multi-line text, one block per distinct x
+        # position (centered numbers mostly share a few widths)
+        x = left
+        for c, (width, a) in enumerate(zip(widths, align)):
+            blocks: Dict[float, List[str]] = {}
+            for r, cells in enumerate(run):
+                text = str(cells[c])
+                if text:
+                    lines = blocks.setdefault(round(text_x(text, x, width, a, False, body_size), 2), [''] * len(run))
+                    lines[r] = text
+            for block_x, lines in blocks.items():
+                shape.insert_text((block_x, baseline(y, row_height, body_size)), lines, fontname=FONT,
+                                  fontsize=body_size, lineheight=row_height / body_size)
+            x += width
+
+    y, run, run_y = MARGIN + header_height, [], MARGIN + header_height
+    for kind, cells in rows:
+        if kind == 'unit':
+            if run:
+                write_run(run, run_y)
+            label = cells[0]
+            shape.insert_text((text_x(label, left, right - left, 'center', True, header_size),
+                               baseline(y, header_height, header_size)),
+                              label, fontname=FONT_BOLD, fontsize=header_size)
+            y += header_height
+            run, run_y = [], y
+            continue
+        run.append(cells)
+        y += row_height
+    if run:
+        write_run(run, run_y)
+    shape.commit()
+
+
+def write_pdf(sheets: Dict[str, Dict], path: str, settings: Dict):
+    """
+    Write the by-name pages (A-1, A-2, ...), the unit TOC and the by-unit
+    pages (B-1, ...) to one PDF, with bookmarks for each section and unit.
+    """
+    doc = fitz.open()
+    width, height = PAGE_SIZE
+    outline = []
+    for name, sheet in sheets.items():
+        rows = sheet['rows']
+        shaded = zebra_rows(rows) if settings['zebra'] and name != OUT_BY_UNIT_TOC else [False] * len(rows)
+        outline.append([1, name, doc.page_count + 1])
+        for n, page_rows in enumerate(sheet['pages'], 1):
+            page = doc.new_page(width=width, height=height)
+            _draw_page(page, sheet['headers'], [rows[i] for i in page_rows], [shaded[i] for i in page_rows],
+                       sheet['align'], sheet['layout'], settings['font_size'])
+            if sheet['prefix']:
+                label = f"{sheet['prefix']}-{n}"
+                page.insert_text((width / 2 - text_width(label, 8) / 2, height - MARGIN / 2), label,
+                                 fontname=FONT, fontsize=8)
+            outline.extend([2, cells[0], page.number + 1] for kind, cells in (rows[i] for i in page_rows)
+                           if kind == 'unit')
+    doc.set_toc(outline)
+    doc.save(path, garbage=3, deflate=True)
+    doc.close()
+
+
+def layout_directory(by_name: pd.DataFrame, by_unit: pd.DataFrame, settings: Dict) -> Dict[str, Dict]:
+    """
+    Lay out the print sheets, in output order.
+
+    Returns:
+        Sheet name -> headers, align, prefix, rows, layout and pages
+    """
+    rows = print_rows(by_name, by_unit)
+    sheets = {}
+    for name, headers, align, prefix in [
+            (OUT_BY_NAME, NAME_COLUMNS, NAME_ALIGN, settings['prefix_by_name']),
+            (OUT_BY_UNIT_TOC, TOC_COLUMNS, TOC_ALIGN, ''),
+            (OUT_BY_UNIT, UNIT_COLUMNS, UNIT_ALIGN, settings['prefix_by_unit'])]:
+        sheets[name] = {'headers': headers, 'align': align, 'prefix': prefix}
+    # The unit pages decide the TOC page numbers, so lay them out first
+    for name in (OUT_BY_NAME, OUT_BY_UNIT, OUT_BY_UNIT_TOC):
+        if name == OUT_BY_UNIT_TOC:
+            fill_toc_pages(rows, sheets[OUT_BY_UNIT]['pages'], settings['prefix_by_unit'])
+        layout = sheet_layout(sheets[name]['headers'], rows[name], settings)
+        sheets[name].update(rows=rows[name], layout=layout,
+                            pages=paginate(rows[name], layout, settings['unit_page_breaks']))
+    sheets[OUT_BY_NAME]['name_sort'] = by_name['NameSort'].tolist()
+    return sheets
+
+
+def build_printable_directory(export_df: pd.DataFrame, output_stem: str = OUTPUT_STEM,
+                              formats: Optional[List[str]] = None,
+                              settings: Optional[Dict] = None) -> Dict[str, str]:
+    """
+    Build, lay out and write the directory in one pass.
+
+    Args:
+        export_df: Address Users export with the PASTE-HERE headers, as strings
+        output_stem: Output path without extension
+        formats: Any of FORMATS (default: all)
+        settings: Print settings (default: DEFAULT_SETTINGS)
+
+    Returns:
+        Format -> path written
+    """
+    settings = {**DEFAULT_SETTINGS, **(settings or {})}
+    by_name, by_unit = build_directory(export_df)
+    sheets = layout_directory(by_name, by_unit, settings)
+
+    written = {}
+    for fmt in formats or FORMATS:
+        path = f"{output_stem}.{fmt}"
+        if fmt == 'xlsx':
+            write_xlsx(sheets, path, settings)
+        elif fmt == 'pdf':
+            write_pdf(sheets, path, settings)
+        written[fmt] = path
+    print(f"  {len(by_name):,} listed names, {len(by_unit):,} unit rows in {len(sheets[OUT_BY_UNIT_TOC]['rows']):,} units")
+    print(f"  {len(sheets[OUT_BY_NAME]['pages'])} by-name pages, {len(sheets[OUT_BY_UNIT]['pages'])} by-unit pages")
+    return written
+
+
+def parse_args():
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description="Build the printable directory by name and by unit.")
+    parser.add_argument('source', help="Address Users export CSV, or the directory workbook (.xlsm/.xlsx)")
+    parser.add_argument('-o', '--output', default=OUTPUT_STEM, help=f"Output path without extension (default: {OUTPUT_STEM})")
+    parser.add_argument('--formats', default=','.join(FORMATS),
+                        help=f"Comma-separated output formats (default: {','.join(FORMATS)})")
+    parser.add_argument('--font-size', type=float, help="Font size (default: workbook setting or 10)")
+    parser.add_argument('--unit-page-breaks', choices=['yes', 'no'], help="Start each unit on a new page (default: workbook setting or yes)")
+    parser.add_argument('--zebra', choices=['yes', 'no'], help="Shade every other row (default: workbook setting or no)")
+    parser.add_argument('--name-prefix', help="PRINT-BY-NAME page number prefix (default: workbook setting or A)")
+    parser.add_argument('--unit-prefix', help="PRINT-BY-UNIT page number prefix (default: workbook setting or B)")
+    return parser.parse_args()
+
+
+def main():
+    """Main execution function."""
+    args = parse_args()
+    formats = [f.strip().lower() for f in args.formats.split(',') if f.strip()]
+    unknown = [f for f in formats if f not in FORMATS]
+    if unknown:
+        print(f"✗ Unknown format(s): {', '.join(unknown)} (choose from {', '.join(FORMATS)})")
+        return
+    needs_openpyxl = 'xlsx' in formats or args.source.lower().endswith(('.xlsx', '.xlsm'))
+    if needs_openpyxl and importlib.util.find_spec('openpyxl') is None:
+        print("✗ Reading or writing workbooks needs openpyxl (pip install openpyxl)")
+        return
+    if not os.path.exists(args.source):
+        print(f"✗ {args.source} not found")
+        return
+
+    export_df, settings = load_directory_export(args.source)
+    overrides = {
+        'font_size': args.font_size,
+        'unit_page_breaks': None if args.unit_page_breaks is None else args.unit_page_breaks == 'yes',
+        'zebra': None if args.zebra is None else args.zebra == 'yes',
+        'prefix_by_name': args.name_prefix,
+        'prefix_by_unit': args.unit_prefix,
+    }
+    settings.update({k: v for k, v in overrides.items() if v is not None})
+
+    out_dir = os.path.dirname(args.output)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    print(f"Building directory from {os.path.basename(args.source)} ({len(export_df):,} rows)")
+    try:
+        written = build_printable_directory(export_df, args.output, formats, settings)
+    except ValueError as e:
+        print(f"✗ {e}")
+        return
+    for fmt, path in written.items():
+        print(f"✓ {fmt.upper()} saved to: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Batch Thumbnail Generator
+Renders thumbnails for every PDF under a directory tree without the GUI,
+using a pool of worker processes, and writes a manifest of the results.
+
+Each PDF is rasterized once and saved in every requested variant (size and
+format, see thumbnail_cache.VARIANTS). Rendered variants are kept in a
+content-addressed cache, so re-running over the archive only renders new or
+changed PDFs.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import List, Dict, Optional
+
+from thumbnail_cache import (DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES, DEFAULT_VARIANTS, VARIANTS,
+                             ThumbnailCache, render_variants, supported_variants)
+from thumbnail_generator import OVERSAMPLE, thumbnail_name
+
+
+MANIFEST_NAME = 'thumbnail_manifest.json'
+
+
+def find_pdfs(root: str) -> List[str]:
+    """
+    Find all PDFs under a directory tree.
+
+    Args:
+        root: Directory to search
+
+    Returns:
+        Sorted list of PDF paths
+    """
+    pdfs = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in filenames:
+            if name.lower().endswith('.pdf'):
+                pdfs.append(os.path.join(dirpath, name))
+    return sorted(pdfs)
+
+
+def plan_jobs(pdfs: List[str], output_dir: str, variants: List[str]) -> List[Dict]:
+    """
+    Assign output files to each PDF.
+
+    Names come from the year and month in the PDF file name, as in the GUI.
+    PDFs without a date keep their own name. When two PDFs map to the same
+    thumbnail, the first one (in path order) gets it and the others are
+    reported as failures instead of silently overwriting it.
+
+    Args:
+        pdfs: PDF paths
+        output_dir: Directory for the thumbnails
+        variants: Variant names; each adds its suffix to the thumbnail name stem
+
+    Returns:
+        List of job dictionaries (pdf, outputs by variant, and error for collisions)
+    """
+    jobs = []
+    claimed = {}
+    for pdf_path in pdfs:
+        fallback = os.path.splitext(os.path.basename(pdf_path))[0] + '.png'
+        name = thumbnail_name(pdf_path, default=fallback)
+        stem = os.path.join(output_dir, os.path.splitext(name)[0])
+        job = {'pdf': pdf_path,
+               'outputs': {v: stem + VARIANTS[v]['suffix'] for v in variants}}
+        if stem in claimed:
+            job['error'] = f"Thumbnail name {name} already used by {claimed[stem]}"
+        else:
+            claimed[stem] = pdf_path
+        jobs.append(job)
+    return jobs
+
+
+def render_job(job: Dict) -> Dict:
+    """
+    Render every variant of one thumbnail into job['targets'].
+
+    Runs in worker processes, so it must stay a module-level function. Errors
+    are returned in the result rather than raised, so one broken PDF doesn't
+    stop the batch.
+
+    Args:
+        job: Job dictionary from plan_jobs()
+
+    Returns:
+        Result dictionary with status 'ok' or 'failed'
+    """
+    result = {'pdf': job['pdf'], 'outputs': list(job['outputs'].values())}
+    start = time.perf_counter()
+    try:
+        result['bytes'] = render_variants(job['pdf'], job['targets'], job.get('oversample', OVERSAMPLE))
+        result['status'] = 'ok'
+    except Exception as e:
+        result['status'] = 'failed'
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['seconds'] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def export_files(sources: Dict[str, str], outputs: Dict[str, str]):
+    """Copy cached variants to their output files, skipping ones already up to date."""
+    for name, source in sources.items():
+        output = outputs[name]
+        if os.path.exists(output):
+            src, dst = os.stat(source), os.stat(output)
+            if src.st_size == dst.st_size and src.st_mtime == dst.st_mtime:
+                continue
+        shutil.copy2(source, output)
+
+
+def generate_thumbnails(root: str, output_dir: str, workers: Optional[int] = None,
+                        skip_existing: bool = False, variants: Optional[List[str]] = None,
+                        cache: Optional[ThumbnailCache] = None) -> List[Dict]:
+    """
+    Render thumbnails for every PDF under root.
+
+    Args:
+        root: Directory tree containing the PDFs
+        output_dir: Directory for the thumbnails (created if missing)
+        workers: Number of processes (default: number of cores)
+        skip_existing: Keep thumbnails that already exist instead of re-rendering
+        variants: Variant names to produce (default: DEFAULT_VARIANTS)
+        cache: Reuse and store rendered variants here (None renders everything)
+
+    Returns:
+        One result dictionary per PDF, in path order
+    """
+    variants = variants or DEFAULT_VARIANTS
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = plan_jobs(find_pdfs(root), output_dir, variants)
+    print(f"✓ Found {len(jobs)} PDFs under {root}")
+
+    results = []
+    pending = []
+    # PDFs with identical content share a cache key; render each key once and
+    # export it to every job that shares it
+    sharing: Dict[str, List[Dict]] = {}
+    for job in jobs:
+        outputs = list(job['outputs'].values())
+        if 'error' in job:
+            results.append({'pdf': job['pdf'], 'outputs': outputs,
+                            'status': 'failed', 'error': job['error']})
+        elif skip_existing and all(os.path.exists(f) for f in outputs):
+            results.append({'pdf': job['pdf'], 'outputs': outputs, 'status': 'skipped'})
+        elif cache:
+            try:
+                job['md5'] = cache.source_md5(job['pdf'])
+            except OSError as e:
+                results.append({'pdf': job['pdf'], 'outputs': outputs,
+                                'status': 'failed', 'error': f"{type(e).__name__}: {e}"})
+                continue
+            job['key'] = cache.cache_key(job['md5'], variants)
+            cached = cache.lookup(job['key'], variants)
+            if cached:
+                export_files(cached, job['outputs'])
+                results.append({'pdf': job['pdf'], 'outputs': outputs, 'status': 'cached'})
+            elif job['key'] in sharing:
+                sharing[job['key']].append(job)
+            else:
+                sharing[job['key']] = []
+                job['targets'] = cache.prepare(job['key'], variants)
+                pending.append(job)
+        else:
+            job['targets'] = job['outputs']
+            pending.append(job)
+
+    if pending:
+        workers = workers or os.cpu_count() or 1
+        print(f"Rendering {len(pending)} thumbnails with {workers} process(es)...\n")
+        # One PDF per task: rendering dominates, so per-task overhead is negligible
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for i, (job, result) in enumerate(zip(pending, pool.map(render_job, pending)), 1):
+                if cache and result['status'] == 'ok':
+                    cache.add(job['key'], job['md5'], result['bytes'])
+                    export_files(job['targets'], job['outputs'])
+                elif cache:
+                    cache.discard(job['key'])
+                mark = '✓' if result['status'] == 'ok' else '✗'
+                print(f"  [{i}/{len(pending)}] {mark} {result['pdf']}")
+                results.append(result)
+                for copy in sharing.get(job.get('key'), []):
+                    copy_result = {'pdf': copy['pdf'], 'outputs': list(copy['outputs'].values())}
+                    if result['status'] == 'ok':
+                        export_files(job['targets'], copy['outputs'])
+                        copy_result['status'] = 'cached'
+                    else:
+                        copy_result.update(status='failed', error=result['error'])
+                    results.append(copy_result)
+
+    if cache:
+        cache.evict()
+
+    results.sort(key=lambda r: r['pdf'])
+    return results
+
+
+def save_manifest(results: List[Dict], output_file: str, source: str):
+    """Save the batch results and failures as JSON."""
+    counts = {}
+    for result in results:
+        counts[result['status']] = counts.get(result['status'], 0) + 1
+    manifest = {
+        'generated': datetime.now().isoformat(),
+        'source': os.path.abspath(source),
+        'counts': counts,
+        'failures': [r for r in results if r['status'] == 'failed'],
+        'results': results,
+    }
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    print(f"✓ Manifest saved to: {output_file}")
+
+
+def parse_args():
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description="Render GRIT thumbnails for a directory tree of PDFs.")
+    parser.add_argument('source', help="Directory containing the PDFs (searched recursively)")
+    parser.add_argument('-o', '--output-dir', default='thumbnails',
+                        help="Directory for the thumbnails (default: ./thumbnails)")
+    parser.add_argument('--workers', type=int, help="Number of processes (default: number of cores)")
+    parser.add_argument('--skip-existing', action='store_true',
+                        help="Don't re-render thumbnails that already exist")
+    parser.add_argument('--variants', default=','.join(DEFAULT_VARIANTS),
+                        help=f"Comma-separated sizes/formats to write, from {', '.join(VARIANTS)} "
+                             f"(default: {','.join(DEFAULT_VARIANTS)})")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                        help=f"Thumbnail cache directory (default: {DEFAULT_CACHE_DIR})")
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024), metavar='MB',
+                        help=f"Evict least recently used cache entries above this size "
+                             f"(default: {DEFAULT_MAX_BYTES // (1024 * 1024)})")
+    parser.add_argument('--no-cache', action='store_true', help="Render every PDF without the cache")
+    parser.add_argument('--manifest', metavar='FILE',
+                        help=f"Manifest file (default: {MANIFEST_NAME} in the output directory)")
+    return parser.parse_args()
+
+
+def main():
+    """Main execution function."""
+    args = parse_args()
+
+    if not os.path.isdir(args.source):
+        print(f"✗ Source directory not found: {args.source}")
+        return
+
+    variants = [v.strip() for v in args.variants.split(',') if v.strip()]
+    unknown = [v for v in variants if v not in VARIANTS]
+    if unknown:
+        print(f"✗ Unknown variant(s): {', '.join(unknown)} (choose from {', '.join(VARIANTS)})")
+        return
+    variants, unsupported = supported_variants(variants)
+    if unsupported:
+        print(f"⚠ Warning: this Pillow build can't write {', '.join(unsupported)}; skipping")
+    if not variants:
+        print("✗ No variants left to write")
+        return
+
+    cache = None if args.no_cache else ThumbnailCache(args.cache_dir, max_bytes=args.cache_size * 1024 * 1024)
+    start = time.perf_counter()
+    try:
+        results = generate_thumbnails(args.source, args.output_dir, workers=args.workers,
+                                      skip_existing=args.skip_existing, variants=variants, cache=cache)
+    finally:
+        if cache:
+            cache.close()
+    elapsed = time.perf_counter() - start
+
+    save_manifest(results, args.manifest or os.path.join(args.output_dir, MANIFEST_NAME), args.source)
+
+    failed = [r for r in results if r['status'] == 'failed']
+    rendered = sum(1 for r in results if r['status'] == 'ok')
+    print(f"\nRendered {rendered} thumbnails in {elapsed:.1f}s")
+    if cache:
+        print(f"Cache: {cache.stats['hits']} reused, {cache.stats['misses']} not cached, "
+              f"{cache.stats['hashed']} PDFs hashed, {cache.stats['evicted']} entries evicted")
+    if failed:
+        print(f"⚠ Warning: {len(failed)} PDFs failed (see manifest)")
+        for result in failed:
+            print(f"  {result['pdf']}: {result['error']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Thumbnail Rendering Benchmark
+Compares the original render path (full-page pixmap at the default 72 dpi,
+copied into a PIL image, then resized to 400 px high) against rendering the
+page straight at the target height with a fitz.Matrix scale.
+
+Each method runs in its own fresh process so its peak RSS isn't inflated by
+the other methods. Reports time per PDF and peak RSS above the baseline after
+imports.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from typing import List, Dict
+
+from batch_thumbnails import find_pdfs
+
+
+METHODS = ['legacy', 'direct', 'direct-1x']
+
+
+def legacy_thumbnail(pdf_path, output_name):
+    """The original generate_thumbnail_image(), kept here as the baseline."""
+    from PIL import Image
+    import fitz
+
+    doc = fitz.open(pdf_path)
+    page = doc.load_page(0)
+    pix = page.get_pixmap()
+    img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+    new_height = 400
+    new_width = int(img.width / img.height * new_height)
+    resized_img = img.resize((new_width, new_height))
+    im = Image.new('RGB', (600, 400), (255, 255, 255))
+    im.paste(resized_img, ((600 - new_width) // 2, 0))
+    im.save(output_name)
+    return im
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_method(method: str, pdfs: List[str], repeat: int, queue):
+    """Render every PDF with one method (runs in a child process)."""
+    import thumbnail_generator
+
+    baseline = peak_rss_mb()
+    times = []
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, 'thumb.png')
+        for _ in range(repeat):
+            for pdf_path in pdfs:
+                start = time.perf_counter()
+                if method == 'legacy':
+                    legacy_thumbnail(pdf_path, output)
+                elif method == 'direct':
+                    thumbnail_generator.generate_thumbnail_image(pdf_path, output)
+                else:
+                    page_img = thumbnail_generator.render_first_page(pdf_path, oversample=1.0)
+                    thumbnail_generator.compose_thumbnail(page_img).save(output)
+                times.append(time.perf_counter() - start)
+    queue.put({
+        'method': method,
+        'renders': len(times),
+        'total_s': sum(times),
+        'mean_ms': statistics.mean(times) * 1000,
+        'p50_ms': statistics.median(times) * 1000,
+        'max_ms': max(times) * 1000,
+        'baseline_rss_mb': baseline,
+        'peak_rss_mb': peak_rss_mb(),
+        'extra_rss_mb': peak_rss_mb() - baseline,
+    })
+
+
+def benchmark(pdfs: List[str], methods: List[str], repeat: int = 1) -> List[Dict]:
+    """Run each method in a fresh process and collect its results."""
+    ctx = multiprocessing.get_context('spawn')
+    results = []
+    for method in methods:
+        print(f"  Running {method}...")
+        queue = ctx.Queue()
+        proc = ctx.Process(target=run_method, args=(method, pdfs, repeat, queue))
+        proc.start()
+        result = queue.get()
+        proc.join()
+        results.append(result)
+    return results
+
+
+def print_report(results: List[Dict]):
+    """Print a comparison table."""
+    print()
+    print(f"{'method':<12}{'renders':>8}{'mean ms':>10}{'p50 ms':>10}{'max ms':>10}"
+          f"{'peak MB':>10}{'+MB':>8}")
+    for r in results:
+        print(f"{r['method']:<12}{r['renders']:>8}{r['mean_ms']:>10.1f}{r['p50_ms']:>10.1f}"
+              f"{r['max_ms']:>10.1f}{r['peak_rss_mb']:>10.1f}{r['extra_rss_mb']:>8.1f}")
+    legacy = next((r for r in results if r['method'] == 'legacy'), None)
+    if legacy:
+        for r in results:
+            if r is not legacy and r['mean_ms']:
+                print(f"{r['method']}: {legacy['mean_ms'] / r['mean_ms']:.1f}x faster than legacy")
+
+
+def parse_args():
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description="Compare thumbnail rendering time and peak memory.")
+    parser.add_argument('paths', nargs='+', help="PDF files or directories of PDFs")
+    parser.add_argument('--methods', default=','.join(METHODS),
+                        help=f"Comma-separated methods to run (default: {','.join(METHODS)})")
+    parser.add_argument('--repeat', type=int, default=1, help="Render each PDF this many times")
+    parser.add_argument('--output', help="Also save the results as JSON")
+    return parser.parse_args()
+
+
+def main():
+    """Main execution function."""
+    args = parse_args()
+    methods = [m.strip() for m in args.methods.split(',') if m.strip()]
+    unknown = [m for m in methods if m not in METHODS]
+    if unknown:
+        print(f"✗ Unknown method(s): {', '.join(unknown)} (choose from {', '.join(METHODS)})")
+        return
+
+    pdfs = []
+    for path in args.paths:
+        pdfs.extend(find_pdfs(path) if os.path.isdir(path) else [path])
+    if not pdfs:
+        print("✗ No PDFs found")
+        return
+
+    print(f"Benchmarking {len(pdfs)} PDFs x {args.repeat}")
+    results = benchmark(pdfs, methods, repeat=args.repeat)
+    print_report(results)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'pdfs': len(pdfs), 'repeat': args.repeat, 'results': results}, f, indent=2)
+        print(f"✓ Results saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Thumbnail Cache
+Content-addressed store of rendered thumbnails, so unchanged PDFs are never
+rendered twice.
+
+Entries are keyed by the PDF's MD5 plus the render parameters (variants,
+oversample, RENDER_VERSION), and each entry holds every requested variant
+(size and format) made from a single rasterization of the page. An SQLite
+index records entry sizes and last use for LRU eviction down to a byte limit,
+and remembers each PDF's size and mtime so unchanged PDFs aren't re-hashed.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from thumbnail_generator import OVERSAMPLE, compose_thumbnail, render_first_page
+
+
+# Bump when rendering changes, so old cache entries stop matching
+RENDER_VERSION = 1
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'shha_thumbnails')
+DEFAULT_MAX_BYTES = 500 * 1024 * 1024
+
+# Output variants: size, Pillow format, suffix appended to the thumbnail name
+# stem, and save options
+VARIANTS = {
+    'png': {'size': (600, 400), 'format': 'PNG', 'suffix': '.png', 'params': {'optimize': True}},
+    'png@2x': {'size': (1200, 800), 'format': 'PNG', 'suffix': '@2x.png', 'params': {'optimize': True}},
+    'webp': {'size': (600, 400), 'format': 'WEBP', 'suffix': '.webp', 'params': {'quality': 85, 'method': 6}},
+    'webp@2x': {'size': (1200, 800), 'format': 'WEBP', 'suffix': '@2x.webp', 'params': {'quality': 85, 'method': 6}},
+    'avif': {'size': (600, 400), 'format': 'AVIF', 'suffix': '.avif', 'params': {'quality': 60}},
+    'avif@2x': {'size': (1200, 800), 'format': 'AVIF', 'suffix': '@2x.avif', 'params': {'quality': 60}},
+}
+DEFAULT_VARIANTS = ['png', 'png@2x', 'webp']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    md5 TEXT NOT NULL,
+    bytes INTEGER NOT NULL,
+    created TEXT NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_last_used ON entries(last_used);
+CREATE TABLE IF NOT EXISTS sources (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    md5 TEXT NOT NULL
+);
+"""
+
+
+def supported_variants(names: List[str]) -> Tuple[List[str], List[str]]:
+    """
+    Split variant names into those this Pillow build can write and those it can't.
+
+    AVIF needs a Pillow build with libavif, or the pillow-avif-plugin package.
+
+    Returns:
+        (supported names, unsupported names)
+    """
+    try:
+        import pillow_avif  # noqa: F401  (registers the AVIF plugin)
+    except ImportError:
+        pass
+    Image.init()
+    supported, unsupported = [], []
+    for name in names:
+        if VARIANTS[name]['format'] in Image.SAVE:
+            supported.append(name)
+        else:
+            unsupported.append(name)
+    return supported, unsupported
+
+
+def file_md5(path: str, block_size: int = 1024 * 1024) -> str:
+    """MD5 of a file, read in blocks."""
+    md5_hash = hashlib.md5()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            md5_hash.update(block)
+    return md5_hash.hexdigest()
+
+
+def render_variants(pdf_path: str, targets: Dict[str, str], oversample: float = OVERSAMPLE) -> Dict[str, int]:
+    """
+    Rasterize the first page once and save every variant from it.
+
+    The page is rendered for the tallest variant; smaller ones are downsized
+    from that image. Runs in worker processes, so it must stay a module-level
+    function.
+
+    Args:
+        pdf_path: PDF to render
+        targets: Variant name -> output file
+        oversample: Render this much above the tallest variant's height
+
+    Returns:
+        Variant name -> bytes written
+    """
+    height = max(VARIANTS[name]['size'][1] for name in targets)
+    page_img = render_first_page(pdf_path, height=height, oversample=oversample)
+    written = {}
+    for name, output in targets.items():
+        spec = VARIANTS[name]
+        im = compose_thumbnail(page_img, spec['size'])
+        im.save(output, spec['format'], **spec['params'])
+        written[name] = os.path.getsize(output)
+    return written
+
+
+class ThumbnailCache:
+    """Content-addressed, size-limited store of rendered thumbnails."""
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Open (or create) a thumbnail cache.
+
+        Args:
+            cache_dir: Directory for the cached files and the index
+            max_bytes: evict() removes least recently used entries above this size
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(cache_dir, 'index.db'))
+        self.conn.executescript(SCHEMA)
+        self.stats = {'hits': 0, 'misses': 0, 'hashed': 0, 'evicted': 0}
+
+    def close(self):
+        """Close the index."""
+        self.conn.close()
+
+    def source_md5(self, pdf_path: str) -> str:
+        """
+        MD5 of a PDF, re-hashing only when its size or mtime changed.
+
+        Args:
+            pdf_path: PDF file
+
+        Returns:
+            MD5 hash as hex string
+        """
+        path = os.path.abspath(pdf_path)
+        st = os.stat(path)
+        row = self.conn.execute("SELECT size, mtime, md5 FROM sources WHERE path = ?", (path,)).fetchone()
+        if row and row[0] == st.st_size and row[1] == st.st_mtime:
+            return row[2]
+
+        md5 = file_md5(path)
+        self.stats['hashed'] += 1
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO sources (path, size, mtime, md5) VALUES (?, ?, ?, ?)",
+                              (path, st.st_size, st.st_mtime, md5))
+        return md5
+
+    @staticmethod
+    def cache_key(md5: str, variants: List[str], oversample: float = OVERSAMPLE) -> str:
+        """Key for a PDF's content plus everything that affects the rendered output."""
+        params = {
+            'md5': md5,
+            'variants': {name: VARIANTS[name] for name in sorted(variants)},
+            'oversample': oversample,
+            'version': RENDER_VERSION,
+        }
+        return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+    def entry_dir(self, key: str) -> str:
+        """Directory holding one entry's files."""
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def entry_files(self, key: str, variants: List[str]) -> Dict[str, str]:
+        """Variant name -> cached file for an entry."""
+        directory = self.entry_dir(key)
+        return {name: os.path.join(directory, 'thumb' + VARIANTS[name]['suffix']) for name in variants}
+
+    def lookup(self, key: str, variants: List[str]) -> Optional[Dict[str, str]]:
+        """
+        Find a cached entry and mark it as used.
+
+        Returns:
+            Variant name -> cached file, or None if the entry is missing or incomplete
+        """
+        row = self.conn.execute("SELECT key FROM entries WHERE key = ?", (key,)).fetchone()
+        files = self.entry_files(key, variants)
+        if row and all(os.path.exists(f) for f in files.values()):
+            with self.conn:
+                self.conn.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+            self.stats['hits'] += 1
+            return files
+        self.stats['misses'] += 1
+        return None
+
+    def prepare(self, key: str, variants: List[str]) -> Dict[str, str]:
+        """Create an entry's directory and return where its variants should be written."""
+        os.makedirs(self.entry_dir(key), exist_ok=True)
+        return self.entry_files(key, variants)
+
+    def add(self, key: str, md5: str, sizes: Dict[str, int]):
+        """Record a newly rendered entry (files written to the paths from prepare())."""
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO entries (key, md5, bytes, created, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, md5, sum(sizes.values()), datetime.now().isoformat(), time.time()))
+
+    def discard(self, key: str):
+        """Remove an entry's files and index row."""
+        shutil.rmtree(self.entry_dir(key), ignore_errors=True)
+        with self.conn:
+            self.conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def total_bytes(self) -> int:
+        """Bytes used by all cached entries."""
+        return self.conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM entries").fetchone()[0]
+
+    def evict(self) -> int:
+        """
+        Remove least recently used entries until the cache fits in max_bytes.
+
+        Returns:
+            Number of entries removed
+        """
+        excess = self.total_bytes() - self.max_bytes
+        removed = 0
+        if excess <= 0:
+            return removed
+        for key, size in self.conn.execute("SELECT key, bytes FROM entries ORDER BY last_used").fetchall():
+            if excess <= 0:
+                break
+            self.discard(key)
+            excess -= size
+            removed += 1
+        self.stats['evicted'] += removed
+        return removed
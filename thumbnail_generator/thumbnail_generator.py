@@ -1,38 +1,48 @@
-import tkinter as tk
-from tkinter import filedialog, messagebox
 from PIL import Image
 import fitz  # PyMuPDF
 import re
 import os
 
 
+# Thumbnail layout: the whole first page, centered on a white 600x400 background
+THUMBNAIL_SIZE = (600, 400)
+
+# Rasterize slightly above the target height so the final downscale stays sharp
+OVERSAMPLE = 1.5
+
+
+def render_first_page(pdf_path, height=THUMBNAIL_SIZE[1], oversample=OVERSAMPLE):
+    # Scale the page so MuPDF rasterizes straight at (about) the target height,
+    # instead of rendering the full page and throwing most of it away in resize()
+    with fitz.open(pdf_path) as doc:
+        page = doc.load_page(0)  # First page
+        zoom = height * oversample / page.rect.height
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+        
+        # Wrap the pixmap samples without copying them; resize() makes the only copy
+        img = Image.frombuffer("RGB", (pix.width, pix.height), pix.samples_mv,
+                               "raw", "RGB", pix.stride, 1)
+        width = max(1, round(pix.width * height / pix.height))
+        if (width, height) != img.size:
+            img = img.resize((width, height), Image.LANCZOS)
+        else:
+            img = img.copy()
+    return img
+
+
+# Center the page image on a white background of the given size
+def compose_thumbnail(page_img, size=THUMBNAIL_SIZE):
+    if page_img.height != size[1]:
+        width = max(1, round(page_img.width * size[1] / page_img.height))
+        page_img = page_img.resize((width, size[1]), Image.LANCZOS)
+    im = Image.new('RGB', size, (255, 255, 255))
+    offset = ((size[0] - page_img.width) // 2, 0)  # Center horizontally
+    im.paste(page_img, offset)
+    return im
+
+
 def generate_thumbnail_image(pdf_path,output_name):
-    doc = fitz.open(pdf_path)
-    page = doc.load_page(0)  # First page
-    pix = page.get_pixmap()
-    
-    # Convert pixmap to PIL Image
-    img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-    
-    # OPTION 1: Crop to 600x400 pixels, keeping the top of the page
-    #cropped_img = img.crop((0, 0, 600, 400))
-    #cropped_img.save(output_path)
-
-    # OPTION 2: Center the whole page image in 600*400px white background
-    # Calculate the new width while keeping aspect ratio
-    new_height = 400
-    aspect_ratio = img.width / img.height
-    new_width = int(aspect_ratio * new_height)
-    
-    # Resize the image
-    resized_img = img.resize((new_width, new_height))
-    
-    # Create a white background (600x400)
-    im = Image.new('RGB', (600, 400), (255, 255, 255))
-    
-    # Center the resized image on the background
-    offset = ((600 - new_width) // 2, 0)  # Center horizontally
-    im.paste(resized_img, offset)
+    im = compose_thumbnail(render_first_page(pdf_path))
     im.save(output_name)
     return im
 
@@ -82,18 +92,24 @@ def detect_year(filename):
     return int(match.group()) if match else None
 
 
+# Thumbnail file name for a PDF, e.g. SHHA-GRIT-1985_03.png (default if no date is found)
+def thumbnail_name(pdf_path, default='thumbnail.png'):
+    month = detect_month(os.path.basename(pdf_path))
+    year = detect_year(os.path.basename(pdf_path))
+    if month is not None and year is not None:
+        return f"SHHA-GRIT-{year}_{str(month).zfill(2)}.png"
+    return default
+
+
 def browse_file():
+    from tkinter import filedialog, messagebox
+    
     pdf_path = filedialog.askopenfilename(
         filetypes=[("PDF Files", "*.pdf")], title="Select a PDF file"
     )
     if pdf_path:
         try:
-            month = detect_month(os.path.basename(pdf_path))
-            year = detect_year(os.path.basename(pdf_path))
-            if month is not None and year is not None:
-                output_name = f"SHHA-GRIT-{year}_{str(month).zfill(2)}.png"
-            else:
-                output_name = 'thumbnail.png'
+            output_name = thumbnail_name(pdf_path)
             thumbnail = generate_thumbnail_image(pdf_path,output_name)
             messagebox.showinfo("Success", "Thumbnail generated and saved as "+output_name)
             thumbnail.show()  # Opens the generated thumbnail for a quick preview
@@ -101,14 +117,22 @@ def browse_file():
         except Exception as e:
             messagebox.showerror("Error", f"Failed to generate thumbnail: {e}")
 
-# Set up the main application window
-root = tk.Tk()
-root.title("GRIT Thumbnail Generator")
-root.geometry("600x400")
+def main():
+    # Imported here so the functions above work without a display (see batch_thumbnails.py)
+    import tkinter as tk
+    
+    # Set up the main application window
+    root = tk.Tk()
+    root.title("GRIT Thumbnail Generator")
+    root.geometry("600x400")
+    
+    # Add a button to select the PDF file
+    browse_button = tk.Button(root, text="Select PDF and Generate Thumbnail", command=browse_file)
+    browse_button.pack(pady=20)
+    
+    # Run the GUI loop
+    root.mainloop()
 
-# Add a button to select the PDF file
-browse_button = tk.Button(root, text="Select PDF and Generate Thumbnail", command=browse_file)
-browse_button.pack(pady=20)
 
-# Run the GUI loop
-root.mainloop()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,232 @@
+"""
+Address Normalization
+Shared cleaning and canonical address keys for the SHHA user-list notebooks.
+
+Every step is a whole-column pandas .str operation with a precompiled regex,
+so a full export is normalized in one pass instead of calling a Python
+function per row:
+
+    lowercase, drop punctuation        "725-20 Tramway Vista Dr. N.E."
+    standard suffixes/directionals     "725-20 tramway vista dr ne"
+    pull the unit out of the address   number 725, street "tramway vista dr ne", unit 20
+    canonical key                      "725 tramway vista dr ne #20"
+
+Units are recognized as "725-20 ...", "... NE 20", "... NE B", "... Apt 5",
+"... Unit 5" and "... #5", or taken from a separate unit column.
+"""
+
+import re
+from typing import Optional
+
+import pandas as pd
+
+
+# USPS standard abbreviations for the suffixes and directionals seen in the exports
+STREET_SUFFIXES = {
+    'avenue': 'ave', 'av': 'ave',
+    'boulevard': 'blvd', 'blv': 'blvd',
+    'circle': 'cir', 'circ': 'cir',
+    'court': 'ct', 'crt': 'ct',
+    'drive': 'dr', 'drv': 'dr',
+    'highway': 'hwy',
+    'lane': 'ln',
+    'loop': 'loop',
+    'parkway': 'pkwy', 'pky': 'pkwy',
+    'place': 'pl',
+    'plaza': 'plz',
+    'road': 'rd',
+    'street': 'st', 'str': 'st',
+    'terrace': 'ter', 'terr': 'ter',
+    'trail': 'trl', 'tr': 'trl',
+    'way': 'way',
+}
+DIRECTIONALS = {
+    'northeast': 'ne', 'northwest': 'nw', 'southeast': 'se', 'southwest': 'sw',
+    'north': 'n', 'south': 's', 'east': 'e', 'west': 'w',
+}
+UNIT_DESIGNATORS = ['apartment', 'apt', 'unit', 'suite', 'ste', '#']
+
+# Placeholder email addresses used in the user system for people without one
+FAKE_EMAIL_MARKER = 'fake.fake'
+
+# "n.e." loses its periods to punctuation cleanup and comes out as "n e"
+_SPLIT_DIRECTIONALS = {'n e': 'ne', 'n w': 'nw', 's e': 'se', 's w': 'sw'}
+_WORD_MAP = {**STREET_SUFFIXES, **DIRECTIONALS, **_SPLIT_DIRECTIONALS}
+_WORD_RE = re.compile(r'\b(' + '|'.join(sorted(_WORD_MAP, key=len, reverse=True)) + r')\b')
+_PUNCT_TABLE = str.maketrans({c: ' ' for c in '.,;:\'"()'})
+# Punctuation and runs of whitespace both become a single space
+_SEPARATOR_RE = re.compile(r'[\s.,;:\'"()]+')
+_HASH_RE = re.compile(r'\s*#\s*')
+_UNIT_WORDS = '|'.join(re.escape(u) for u in UNIT_DESIGNATORS if u != '#')
+_UNIT_PREFIX_RE = re.compile(rf'^(?:(?:{_UNIT_WORDS})\s*|#\s*)')
+
+# One pass over a normalized address:
+#   number, unit glued to the number ("725-20 ..."), street, then at most one of
+#   a designated unit ("... apt 5", "... #5") or a short token after the
+#   directional ("... ne 20", "... ne b")
+_ADDRESS_RE = re.compile(
+    r'^(?:(?P<number>\d+[a-z]?)(?:-(?P<glued>[a-z0-9]+))?\s+)?'
+    r'(?P<street>.*?)'
+    rf'(?:\s+(?:{_UNIT_WORDS})\s*(?P<designated>[a-z0-9-]+)'
+    r'|\s#(?P<hashed>[a-z0-9-]+)'
+    r'|\s(?P<directional>ne|nw|se|sw)\s+(?P<trailing>[a-z]|\d{1,4}[a-z]?))?$'
+)
+
+
+def _on_distinct(series: pd.Series, func):
+    """
+    Apply a column function to the distinct values only and spread the result
+    back, since exports repeat the same address/unit/email many times.
+    """
+    codes, uniques = pd.factorize(series.fillna('').astype(str))
+    result = func(pd.Series(uniques, dtype=object))
+    return result.take(codes).set_axis(series.index)
+
+
+def clean_column(df: pd.DataFrame, col: str) -> pd.Series:
+    """A column as stripped strings, with missing values as ''."""
+    return df[col].fillna('').astype(str).str.strip()
+
+
+def split_list(series: pd.Series, sep: str = ',') -> pd.Series:
+    """
+    Split a column of separator-joined values (e.g. Users, Addresses) into lists.
+
+    Items are stripped and empty items dropped, like the notebooks'
+    split_users/split_addresses, but in one vectorized pass.
+    """
+    parts = series.fillna('').astype(str).str.split(re.escape(sep), regex=True)
+    return parts.map(lambda items: [p.strip() for p in items if p.strip()])
+
+
+def count_list(series: pd.Series, sep: str = ',') -> pd.Series:
+    """Number of non-empty items in each row of a separator-joined column."""
+    counts = explode_list(series, sep).groupby(level=0).size()
+    return counts.reindex(series.index, fill_value=0)
+
+
+def explode_list(series: pd.Series, sep: str = ',') -> pd.Series:
+    """
+    One row per item of a separator-joined column, keeping the original index.
+
+    Rows with no items are dropped.
+    """
+    exploded = series.fillna('').astype(str).str.split(re.escape(sep), regex=True).explode().str.strip()
+    return exploded[exploded != '']
+
+
+def valid_email_mask(series: pd.Series) -> pd.Series:
+    """Emails that are non-empty and not a fake.fake placeholder."""
+    emails = series.fillna('').astype(str).str.strip().str.lower()
+    return (emails != '') & ~emails.str.contains(FAKE_EMAIL_MARKER, regex=False)
+
+
+def normalize_email(series: pd.Series) -> pd.Series:
+    """Emails stripped and lowercased for matching across exports."""
+    return series.fillna('').astype(str).str.strip().str.lower()
+
+
+def normalize_address(series: pd.Series) -> pd.Series:
+    """
+    Lowercase, drop punctuation, standardize suffixes and directionals.
+
+    "725 Tramway Vista Drive N.E." -> "725 tramway vista dr ne"
+    """
+    return _on_distinct(series, _normalize_address)
+
+
+def _normalize_address(s: pd.Series) -> pd.Series:
+    s = s.str.lower().str.replace(_SEPARATOR_RE, ' ', regex=True)
+    s = s.str.replace(_HASH_RE, ' #', regex=True).str.strip()
+    return s.str.replace(_WORD_RE, lambda m: _WORD_MAP[m.group(1)], regex=True)
+
+
+def normalize_unit(series: pd.Series) -> pd.Series:
+    """Unit values lowercased without 'Apt'/'Unit'/'#' prefixes."""
+    return _on_distinct(series, _normalize_unit)
+
+
+def _normalize_unit(s: pd.Series) -> pd.Series:
+    s = s.str.lower().str.translate(_PUNCT_TABLE).str.strip()
+    return s.str.replace(_UNIT_PREFIX_RE, '', regex=True).str.strip()
+
+
+def parse_addresses(series: pd.Series, unit: Optional[pd.Series] = None) -> pd.DataFrame:
+    """
+    Split addresses into number, street and unit, and build a canonical key.
+
+    Args:
+        series: Address strings
+        unit: Optional unit column; used when the address has no unit of its own
+
+    Returns:
+        DataFrame with the same index and columns address (normalized),
+        number, street, unit, key
+    """
+    parsed = _on_distinct(series, _parse_addresses)
+    if unit is not None:
+        given = normalize_unit(unit)
+        parsed['unit'] = parsed['unit'].where(parsed['unit'] != '', given)
+    key = (parsed['number'] + ' ' + parsed['street']).str.strip()
+    parsed['key'] = key.where(parsed['unit'] == '', key + ' #' + parsed['unit'])
+    return parsed
+
+
+def _parse_addresses(s: pd.Series) -> pd.DataFrame:
+    return _split_address(_normalize_address(s))
+
+
+def _split_address(address: pd.Series) -> pd.DataFrame:
+    parts = address.str.extract(_ADDRESS_RE)
+    street = parts['street'].fillna('')
+    street = street.where(parts['directional'].isna(), street + ' ' + parts['directional'])
+    unit = parts['designated'].fillna(parts['hashed']).fillna(parts['trailing']).fillna(parts['glued'])
+    return pd.DataFrame({'address': address, 'number': parts['number'].fillna(''), 'street': street,
+                         'unit': unit.fillna('')})
+
+
+def address_key(series: pd.Series, unit: Optional[pd.Series] = None) -> pd.Series:
+    """Canonical address key column (see parse_addresses)."""
+    return parse_addresses(series, unit)['key']
+
+
+def find_unit_mailing_artifacts(addresses_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Find "separate" mailing addresses that are really the property address
+    mangled by unit handling in the address database.
+
+    Two cases (as first found in the January 2026 export):
+    - numeric unit embedded in the mailing address:
+      "725 Tramway Vista Dr NE" unit 20 -> mail "725-20 Tramway Vista Dr NE"
+    - letter unit stripped from the mailing address:
+      "810 Live Oak Rd NE B" unit B -> mail "810 Live Oak Rd NE"
+
+    Args:
+        addresses_df: addresses_export.csv rows (Address, Unit, Mail Address)
+
+    Returns:
+        Rows with a separate mailing address that hit either case, with
+        boolean columns numeric_unit_artifact and letter_unit_stripped
+    """
+    # Only rows with a mailing address and a plain number or letter unit can
+    # be affected; most have neither
+    df = addresses_df[clean_column(addresses_df, 'Mail Address') != '']
+    unit = normalize_unit(df['Unit'])
+    is_number = _on_distinct(unit, lambda s: s.str.fullmatch(r'\d+'))
+    is_letter = _on_distinct(unit, lambda s: s.str.fullmatch(r'[a-z]'))
+    df = df[is_number | is_letter]
+
+    # Split the property address only where the mailing address differs
+    mail = parse_addresses(df['Mail Address'])
+    address = normalize_address(df['Address'])
+    has_separate = mail['address'] != address
+    df, mail = df[has_separate], mail[has_separate]
+    physical = _on_distinct(address[has_separate], _split_address)
+
+    unit = unit.loc[df.index]
+    same_place = (mail['number'] == physical['number']) & (mail['street'] == physical['street'])
+    numeric_artifact = is_number.loc[df.index] & same_place & (mail['unit'] == unit)
+    letter_stripped = is_letter.loc[df.index] & same_place & (mail['unit'] == '')
+
+    result = df.assign(numeric_unit_artifact=numeric_artifact, letter_unit_stripped=letter_stripped)
+    return result[numeric_artifact | letter_stripped]
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Event Check-in List
+One row per address from address_users_export.csv (1 row = 1 person tied to
+an address), with everyone at the address in the leftmost column, the unit,
+membership status and household size. Rows are sorted by street name, then
+street number and unit in natural order (2 < 10 < 10A < 12).
+
+Writes any of CSV, XLSX (needs openpyxl) and a print-ready PDF (needs
+PyMuPDF) with a check-off box per row, in one run. A format whose library is
+missing is skipped with a message:
+
+    python checkin_list.py address_users_export.csv -o event_checkin --title "Annual Meeting"
+"""
+
+import argparse
+import importlib.util
+import os
+import re
+from datetime import date
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from export_cache import DEFAULT_CACHE_DIR, load_export
+
+
+OUTPUT_STEM = 'event_checkin_by_address_from_address_users'
+FORMATS = ['csv', 'xlsx', 'pdf']
+# Optional library behind each format: (module, pip package)
+FORMAT_LIBRARIES = {'xlsx': ('openpyxl', 'openpyxl'), 'pdf': ('fitz', 'pymupdf')}
+EXPORT_COLUMNS = ['People', 'Address', 'Street Unit', 'Membership Status', 'HouseholdSize']
+GROUP_COLUMNS = ['Street Name', 'Street Number', 'Street Unit', 'Address']
+_SPACE_RE = re.compile(r'\s+')
+
+# PDF layout (US Letter, points)
+PAGE_SIZE = (612, 792)
+MARGIN = 36
+FONT = 'helv'
+FONT_BOLD = 'hebo'
+FONT_SIZE = 9
+LINE_HEIGHT = 12
+# Column title, width, source column ('' = check-off box)
+PDF_COLUMNS = [
+    ('', 18, ''),
+    ('People', 214, 'People'),
+    ('Address', 170, 'Address'),
+    ('Unit', 40, 'Street Unit'),
+    ('Status', 66, 'Membership Status'),
+    ('Size', 32, 'HouseholdSize'),
+]
+
+
+def _natural_parts(series: pd.Series, missing: int) -> pd.DataFrame:
+    """Leading number (missing -> the given value) and the rest lowercased, for natural sorting."""
+    parts = series.str.extract(r'^(\d*)\s*(.*)$')
+    number = pd.to_numeric(parts[0], errors='coerce').fillna(missing).astype(int)
+    return pd.DataFrame({'number': number, 'rest': parts[1].fillna('').str.lower()}, index=series.index)
+
+
+def build_checkin_list(addr_users_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Group address-user rows into one row per address.
+
+    People are de-duplicated per address in their original order, and
+    HouseholdSize counts distinct named people. An address is a Member if
+    any of its rows has Is Member == 1.
+
+    Args:
+        addr_users_df: address_users_export.csv rows as returned by
+            load_export() (stripped strings, Is Member as 0/1)
+
+    Returns:
+        DataFrame with EXPORT_COLUMNS, sorted for printing
+    """
+    df = addr_users_df[['Street Number', 'Street Name', 'Street Unit']].copy()
+    df['Address'] = (df['Street Number'] + ' ' + df['Street Name'] + ' ' + df['Street Unit']) \
+        .str.replace(_SPACE_RE, ' ', regex=True).str.strip()
+    first = addr_users_df['First Name'].str.strip('"').str.strip()
+    last = addr_users_df['Last Name'].str.strip('"').str.strip()
+    df['Person'] = (first + ' ' + last).str.replace(_SPACE_RE, ' ', regex=True).str.strip()
+
+    # One integer code per address; everything below groups on that
+    group = df.groupby(GROUP_COLUMNS, sort=False).ngroup().to_numpy()
+    checkin = df.drop_duplicates(GROUP_COLUMNS)[GROUP_COLUMNS].reset_index(drop=True)
+    is_member = pd.Series(addr_users_df['Is Member'].to_numpy()).groupby(group).max()
+    checkin['Membership Status'] = is_member.map({1: 'Member', 0: 'Non-member'}).to_numpy()
+
+    # People in original order, de-duplicated per address: stable-sort the
+    # named rows by address code and join each run of codes
+    named = pd.DataFrame({'group': group, 'Person': df['Person'].to_numpy()})
+    named = named[named['Person'] != ''].drop_duplicates()
+    named = named.sort_values('group', kind='stable')
+    codes = named['group'].to_numpy()
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    names = named['Person'].to_numpy()
+    people = np.full(len(checkin), '', dtype=object)
+    if len(codes):
+        people[codes[starts]] = ['; '.join(chunk) for chunk in np.split(names, starts[1:])]
+    checkin['People'] = people
+    checkin['HouseholdSize'] = np.bincount(codes, minlength=len(checkin))
+
+    # Addresses without a street number last, as the notebook sorted them;
+    # no unit before "1", "A", ...
+    number = _natural_parts(checkin['Street Number'], missing=10**9)
+    unit = _natural_parts(checkin['Street Unit'], missing=-1)
+    order = pd.DataFrame({
+        'street': checkin['Street Name'].str.lower(),
+        'number': number['number'], 'number_rest': number['rest'],
+        'unit': unit['number'], 'unit_rest': unit['rest'],
+    }).sort_values(['street', 'number', 'number_rest', 'unit', 'unit_rest'], kind='stable').index
+    return checkin.loc[order, EXPORT_COLUMNS].reset_index(drop=True)
+
+
+def write_xlsx(checkin: pd.DataFrame, path: str, title: str = ''):
+    """Write the list as a spreadsheet that prints with a repeated header row."""
+    with pd.ExcelWriter(path, engine='openpyxl') as writer:
+        checkin.to_excel(writer, index=False, sheet_name='Check-in')
+        ws = writer.sheets['Check-in']
+        for letter, width in zip('ABCDE', [48, 36, 8, 16, 10]):
+            ws.column_dimensions[letter].width = width
+        ws.freeze_panes = 'A2'
+        ws.auto_filter.ref = ws.dimensions
+        ws.print_title_rows = '1:1'
+        ws.page_setup.orientation = 'landscape'
+        ws.page_setup.fitToWidth = 1
+        ws.page_setup.fitToHeight = 0
+        ws.sheet_properties.pageSetUpPr.fitToPage = True
+        if title:
+            ws.oddHeader.center.text = title
+
+
+@lru_cache(maxsize=1)
+def _char_widths() -> Dict[str, float]:
+    """Advance width of each Latin-1 character in the body font."""
+    import fitz  # PyMuPDF
+
+    chars = ''.join(chr(i) for i in range(32, 256))
+    return dict(zip(chars, fitz.Font(FONT).char_lengths(chars, FONT_SIZE)))
+
+
+def _wrap(text: str, width: float) -> List[str]:
+    """Split text into lines that fit a column width."""
+    widths = _char_widths()
+    space = widths[' ']
+    lines, line, line_width = [], '', 0.0
+    for word in text.split():
+        word_width = sum(widths.get(ch, FONT_SIZE * 0.6) for ch in word)
+        if line and line_width + space + word_width > width:
+            lines.append(line)
+            line, line_width = word, word_width
+        elif line:
+            line, line_width = f"{line} {word}", line_width + space + word_width
+        else:
+            line, line_width = word, word_width
+    lines.append(line)
+    return lines
+
+
+def write_pdf(checkin: pd.DataFrame, path: str, title: str = 'SHHA Event Check-in'):
+    """Write the list as a paginated Letter PDF with a check-off box per row."""
+    import fitz  # PyMuPDF
+
+    doc = fitz.open()
+    width, height = PAGE_SIZE
+    subtitle = f"{len(checkin):,} addresses · {date.today().isoformat()}"
+    header_y = MARGIN + 44
+    top = header_y + 4
+    lines_per_page = int((height - MARGIN - LINE_HEIGHT - top) // LINE_HEIGHT)
+
+    def write_page(columns: List[List[str]], rows: List[int]):
+        # Each column goes in as one multi-line text block: per-call text
+        # insertion is slow in PyMuPDF, and every row is a whole number of lines
+        shape = doc.new_page(width=width, height=height).new_shape()
+        shape.insert_text((MARGIN, MARGIN + 12), title, fontname=FONT_BOLD, fontsize=13)
+        shape.insert_text((MARGIN, MARGIN + 26), subtitle, fontname=FONT, fontsize=FONT_SIZE)
+        x = MARGIN
+        for (name, col_width, col), lines in zip(PDF_COLUMNS, columns):
+            shape.insert_text((x + 2, header_y), name, fontname=FONT_BOLD, fontsize=FONT_SIZE)
+            if col and lines:
+                shape.insert_text((x + 2, top + LINE_HEIGHT - 2), lines, fontname=FONT, fontsize=FONT_SIZE,
+                                  lineheight=LINE_HEIGHT / FONT_SIZE)
+            x += col_width
+        shape.draw_line((MARGIN, top), (width - MARGIN, top))
+        shape.finish(width=0.8)
+        for start in rows:
+            y = top + start * LINE_HEIGHT
+            shape.draw_rect(fitz.Rect(MARGIN + 3, y + 2, MARGIN + 11, y + 10))
+        shape.finish(width=0.6)
+        for end in rows[1:] + [len(columns[1])]:
+            y = top + end * LINE_HEIGHT
+            shape.draw_line((MARGIN, y), (width - MARGIN, y))
+        shape.finish(width=0.3, color=(0.6, 0.6, 0.6))
+        shape.commit()
+
+    columns = [[] for _ in PDF_COLUMNS]
+    rows = []
+    for row in checkin.itertuples(index=False):
+        values = dict(zip(EXPORT_COLUMNS, row))
+        cells = [_wrap(str(values[col]), col_width - 4) if col else []
+                 for _, col_width, col in PDF_COLUMNS]
+        row_lines = max(len(lines) for lines in cells)
+        if rows and len(columns[1]) + row_lines > lines_per_page:
+            write_page(columns, rows)
+            columns = [[] for _ in PDF_COLUMNS]
+            rows = []
+        rows.append(len(columns[1]))
+        for column, lines in zip(columns, cells):
+            column.extend(lines + [''] * (row_lines - len(lines)))
+    write_page(columns, rows)
+
+    for page in doc:
+        page.insert_text((width - MARGIN - 60, height - MARGIN / 2), f"Page {page.number + 1} of {doc.page_count}",
+                         fontname=FONT, fontsize=8)
+    doc.save(path, garbage=3, deflate=True)
+    doc.close()
+
+
+def available_formats(formats: List[str]) -> List[str]:
+    """
+    The requested formats whose library is installed.
+
+    Each format that has to be skipped is reported.
+    """
+    available = []
+    for fmt in formats:
+        module, package = FORMAT_LIBRARIES.get(fmt, (None, None))
+        if module and importlib.util.find_spec(module) is None:
+            print(f"✗ {fmt.upper()} output needs {package} (pip install {package}); skipping it")
+        else:
+            available.append(fmt)
+    return available
+
+
+def write_outputs(checkin: pd.DataFrame, output_stem: str, formats: List[str],
+                  title: str = 'SHHA Event Check-in') -> Dict[str, str]:
+    """
+    Write the list in each requested format, skipping those whose library is missing.
+
+    Returns:
+        Format -> path written
+    """
+    written = {}
+    for fmt in available_formats(formats):
+        path = f"{output_stem}.{fmt}"
+        if fmt == 'csv':
+            checkin.to_csv(path, index=False)
+        elif fmt == 'xlsx':
+            write_xlsx(checkin, path, title)
+        elif fmt == 'pdf':
+            write_pdf(checkin, path, title)
+        written[fmt] = path
+    return written
+
+
+def generate_checkin_list(source: str, output_stem: str = OUTPUT_STEM, formats: Optional[List[str]] = None,
+                          title: str = 'SHHA Event Check-in',
+                          cache_dir: Optional[str] = DEFAULT_CACHE_DIR) -> pd.DataFrame:
+    """
+    Load address_users_export.csv, build the check-in list and write it.
+
+    Args:
+        source: address_users_export.csv
+        output_stem: Output path without extension
+        formats: Any of FORMATS (default: all; see available_formats())
+        title: Title for the PDF and XLSX header
+        cache_dir: Export cache directory, or None to read the CSV directly
+
+    Returns:
+        The check-in list
+    """
+    checkin = build_checkin_list(load_export(source, cache_dir))
+    for fmt, path in write_outputs(checkin, output_stem, FORMATS if formats is None else formats, title).items():
+        print(f"✓ {fmt.upper()} saved to: {path}")
+    return checkin
+
+
+def parse_args():
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description="Build the one-row-per-address event check-in list.")
+    parser.add_argument('source', nargs='?', default='address_users_export.csv',
+                        help="Address users export (default: address_users_export.csv)")
+    parser.add_argument('-o', '--output', default=OUTPUT_STEM, help=f"Output path without extension (default: {OUTPUT_STEM})")
+    parser.add_argument('--formats', default=','.join(FORMATS),
+                        help=f"Comma-separated output formats (default: {','.join(FORMATS)})")
+    parser.add_argument('--title', default='SHHA Event Check-in', help="Title printed on the PDF/XLSX")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help=f"Export cache directory (default: {DEFAULT_CACHE_DIR})")
+    parser.add_argument('--no-cache', action='store_true', help="Read the CSV directly")
+    return parser.parse_args()
+
+
+def main():
+    """Main execution function."""
+    args = parse_args()
+    formats = [f.strip().lower() for f in args.formats.split(',') if f.strip()]
+    unknown = [f for f in formats if f not in FORMATS]
+    if unknown:
+        print(f"✗ Unknown format(s): {', '.join(unknown)} (choose from {', '.join(FORMATS)})")
+        return
+    formats = available_formats(formats)
+    if not formats:
+        print("✗ No output format left to write")
+        raise SystemExit(1)
+    if not os.path.exists(args.source):
+        print(f"✗ {args.source} not found")
+        return
+
+    out_dir = os.path.dirname(args.output)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    checkin = generate_checkin_list(args.source, args.output, formats, args.title,
+                                    None if args.no_cache else args.cache_dir)
+    print(f"Unique addresses exported: {len(checkin):,}")
+    print(f"Rows with blank People (needs review): {(checkin['People'] == '').sum():,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Export Cache
+Loads the membership CSV exports once into a cleaned, typed columnar cache.
+
+Each export is read with every column as a stripped string (missing values as
+''), and the 0/1 flag columns as integers. That is what the notebooks' repeated
+read_csv(...).fillna("") and _s() passes produced. The result is saved in the
+cache directory under the export's name and content hash:
+
+    export-users-3f2a9c0d1e7b4a55.feather
+
+Later loads of the same file read the cache directly. Feather (Arrow IPC) files
+are memory-mapped and need pyarrow; without it the cache falls back to pandas
+pickles. Writing the cache for a new version of an export removes the cache
+of the same file's previous content and the caches of older dated exports of
+that kind; loading an older export keeps the newer ones' caches.
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+from typing import Dict, Optional
+
+import pandas as pd
+
+from address_normalization import clean_column
+
+try:
+    import pyarrow.feather as feather
+except ImportError:
+    feather = None
+
+
+# Bump when cleaning changes, so old caches stop matching
+CACHE_VERSION = 1
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'shha_exports')
+
+# 0/1 columns loaded as integers; everything else is a stripped string
+FLAG_COLUMNS = ['Is Member', 'Mail GRIT']
+
+_EXPORT_DATE_RE = re.compile(r'[-_]?(\d{4}-\d{2}-\d{2})$')
+
+
+def export_kind(path: str) -> str:
+    """Export name without its date: export-users-2026-01-18.csv -> export-users."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return _EXPORT_DATE_RE.sub('', stem)
+
+
+def export_date(path: str) -> str:
+    """ISO date in an export's name ('' for undated exports); sorts correctly as text."""
+    match = _EXPORT_DATE_RE.search(os.path.splitext(os.path.basename(path))[0])
+    return match.group(1) if match else ''
+
+
+def file_md5(path: str, block_size: int = 1024 * 1024) -> str:
+    """MD5 of a file, read in blocks."""
+    md5_hash = hashlib.md5()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            md5_hash.update(block)
+    return md5_hash.hexdigest()
+
+
+def clean_export(df: pd.DataFrame) -> pd.DataFrame:
+    """Stripped string columns with '' for missing values, and integer flag columns."""
+    cleaned = {}
+    for col in df.columns:
+        if col in FLAG_COLUMNS:
+            cleaned[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(int)
+        else:
+            cleaned[col] = clean_column(df, col)
+    return pd.DataFrame(cleaned)
+
+
+def read_export(path: str) -> pd.DataFrame:
+    """Read and clean a CSV export without the cache."""
+    return clean_export(pd.read_csv(path, dtype=str, keep_default_na=False))
+
+
+class ExportCache:
+    """Cleaned copies of CSV exports, keyed by the source file's content hash."""
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR):
+        """
+        Open (or create) an export cache.
+
+        Args:
+            cache_dir: Directory for the cached tables and the source index
+        """
+        self.cache_dir = cache_dir
+        self.suffix = '.feather' if feather else '.pkl'
+        os.makedirs(cache_dir, exist_ok=True)
+        self.index_path = os.path.join(cache_dir, 'sources.json')
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self.sources = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.sources = {}
+        self.stats = {'hits': 0, 'misses': 0, 'hashed': 0, 'removed': 0}
+
+    def source_md5(self, path: str) -> str:
+        """
+        MD5 of an export, re-hashing only when its size or mtime changed.
+
+        Args:
+            path: CSV export
+
+        Returns:
+            MD5 hash as hex string
+        """
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        known = self.sources.get(path)
+        if known and known['size'] == st.st_size and known['mtime'] == st.st_mtime:
+            return known['md5']
+
+        md5 = file_md5(path)
+        self.stats['hashed'] += 1
+        self.sources[path] = {'size': st.st_size, 'mtime': st.st_mtime, 'md5': md5}
+        if known and 'cache' in known:
+            self.sources[path]['cache'] = known['cache']
+        self.save_sources()
+        return md5
+
+    def save_sources(self):
+        """Write the source index (atomically)."""
+        tmp = self.index_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.sources, f, indent=2)
+        os.replace(tmp, self.index_path)
+
+    def cache_path(self, path: str, md5: str) -> str:
+        """Cached table for one version of an export."""
+        return os.path.join(self.cache_dir, f"{export_kind(path)}-{md5[:16]}-v{CACHE_VERSION}{self.suffix}")
+
+    def load(self, path: str) -> pd.DataFrame:
+        """
+        Cleaned export, from the cache when the file is unchanged.
+
+        Args:
+            path: CSV export
+
+        Returns:
+            DataFrame as produced by read_export()
+        """
+        cached = self.cache_path(path, self.source_md5(path))
+        if os.path.exists(cached):
+            self.stats['hits'] += 1
+            self.record_cache(path, cached)
+            if feather:
+                return feather.read_feather(cached, memory_map=True)
+            return pd.read_pickle(cached)
+
+        self.stats['misses'] += 1
+        df = read_export(path)
+        tmp = cached + '.tmp'
+        if feather:
+            feather.write_feather(df, tmp, compression='uncompressed')
+        else:
+            df.to_pickle(tmp)
+        os.replace(tmp, cached)
+        self.remove_stale(path, keep=cached)
+        self.record_cache(path, cached)
+        return df
+
+    def record_cache(self, path: str, cached: str):
+        """Note in the source index which cached table an export was last loaded from."""
+        known = self.sources[os.path.abspath(path)]
+        if known.get('cache') != os.path.basename(cached):
+            known['cache'] = os.path.basename(cached)
+            self.save_sources()
+
+    def remove_stale(self, path: str, keep: str) -> int:
+        """
+        Remove the caches a new version of an export replaces.
+
+        That is the cache of the same file's previous content, and the caches
+        of exports of the same kind with an older date in their name. Caches
+        of newer exports are kept, so going back to an older export does not
+        invalidate them. Cache files from before the source index recorded
+        them are removed too.
+
+        Args:
+            path: CSV export whose cache was just written
+            keep: The cache just written
+
+        Returns:
+            Number of files removed
+        """
+        path = os.path.abspath(path)
+        kind, date = export_kind(path), export_date(path)
+        stale, live = set(), {os.path.basename(keep)}
+        for source, known in self.sources.items():
+            if 'cache' not in known or export_kind(source) != kind:
+                continue
+            if source == path or export_date(source) < date:
+                stale.add(known['cache'])
+            else:
+                live.add(known['cache'])
+
+        recorded = {known['cache'] for known in self.sources.values() if 'cache' in known}
+        removed = 0
+        for other in glob.glob(os.path.join(self.cache_dir, f"{glob.escape(kind)}-*")):
+            name = os.path.basename(other)
+            if name in live or name.endswith('.tmp'):
+                continue
+            # Only this kind's caches, not another kind sharing the prefix (export-users-...)
+            if not re.fullmatch(rf'{re.escape(kind)}-[0-9a-f]{{16}}-v\d+\.\w+', name):
+                continue
+            if name in stale or name not in recorded:
+                os.remove(other)
+                removed += 1
+        self.stats['removed'] += removed
+        return removed
+
+
+def load_export(path: str, cache_dir: Optional[str] = DEFAULT_CACHE_DIR) -> pd.DataFrame:
+    """
+    Load a cleaned CSV export, through the cache unless cache_dir is None.
+
+    Args:
+        path: CSV export
+        cache_dir: Cache directory, or None to read the CSV directly
+
+    Returns:
+        DataFrame with stripped string columns and integer flag columns
+    """
+    if cache_dir is None:
+        return read_export(path)
+    return ExportCache(cache_dir).load(path)
+
+
+def parse_args():
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description="Convert membership CSV exports into the export cache.")
+    parser.add_argument('paths', nargs='+', help="CSV exports")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help=f"Cache directory (default: {DEFAULT_CACHE_DIR})")
+    return parser.parse_args()
+
+
+def main():
+    """Main execution function."""
+    args = parse_args()
+    cache = ExportCache(args.cache_dir)
+    for path in args.paths:
+        df = cache.load(path)
+        print(f"  {os.path.basename(path)}: {len(df):,} rows -> {cache.cache_path(path, cache.source_md5(path))}")
+    stats: Dict[str, int] = cache.stats
+    print(f"✓ {stats['hits']} cached, {stats['misses']} converted, {stats['removed']} stale removed"
+          f" ({'feather' if feather else 'pickle, install pyarrow for feather'})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Membership Lists
+Reconciles the address, user, address-user and subscriber exports on canonical
+address and email keys.
+
+The comma-joined Users/Addresses and |-joined User Emails columns are exploded
+once into link tables:
+
+    person_addresses   user row -> address key   (export-users Addresses)
+    address_emails     address key -> email      (addresses User Emails)
+    residents          address-user row -> address key
+    subscriptions      email -> list name        (subscribers Lists)
+
+Addresses and people are indexed by address key and email, and a per-address
+summary (linked users, valid email, phone, newsletter) is computed once, so
+coverage questions are index lookups and boolean filters rather than
+re-splitting strings in every notebook cell.
+"""
+
+import argparse
+import glob
+import os
+import re
+from typing import Dict, Optional
+
+import pandas as pd
+
+from address_normalization import (
+    address_key,
+    clean_column,
+    explode_list,
+    normalize_email,
+    valid_email_mask,
+)
+from export_cache import DEFAULT_CACHE_DIR, load_export
+
+
+ADDRESSES_FILE = 'addresses_export.csv'
+USERS_PATTERN = 'export-users-*.csv'
+ADDRESS_USERS_FILE = 'address_users_export.csv'
+SUBSCRIBERS_FILE = 'subscribers.csv'
+
+NEWSLETTER_LIST = 'Newsletters'
+
+# An item of a comma-joined address list that belongs to the previous address:
+# a unit ("Apt 5", "#5", "B", "20") ...
+_UNIT_FRAGMENT_RE = re.compile(r'^(?:(?:apartment|apt|unit|suite|ste)\b\.?\s*\S+|#\s*\S+|[a-z]|\d{1,4}[a-z]?)$',
+                               re.IGNORECASE)
+# ... and an item that starts a new one
+_ADDRESS_START_RE = re.compile(r'^(?:\d|p\.?\s*o\.?\s*box\b)', re.IGNORECASE)
+
+
+def latest_export(directory: str, pattern: str = USERS_PATTERN) -> str:
+    """
+    Newest dated export matching a pattern, e.g. export-users-2026-01-18.csv.
+
+    The ISO date in the name sorts correctly as text.
+
+    Raises:
+        FileNotFoundError: If no file in the directory matches the pattern
+    """
+    matches = sorted(glob.glob(os.path.join(directory, pattern)))
+    if not matches:
+        raise FileNotFoundError(f"No {pattern} export in {os.path.abspath(directory)}")
+    return matches[-1]
+
+
+def export_paths(directory: str) -> Dict[str, Optional[str]]:
+    """Paths of the four exports in a directory (None for any that are missing)."""
+    try:
+        users = latest_export(directory)
+    except FileNotFoundError:
+        users = None
+    paths = {
+        'addresses': os.path.join(directory, ADDRESSES_FILE),
+        'users': users,
+        'address_users': os.path.join(directory, ADDRESS_USERS_FILE),
+        'subscribers': os.path.join(directory, SUBSCRIBERS_FILE),
+    }
+    return {name: path if path and os.path.exists(path) else None for name, path in paths.items()}
+
+
+def load_exports(directory: str, cache_dir: Optional[str] = DEFAULT_CACHE_DIR) -> Dict[str, Optional[pd.DataFrame]]:
+    """
+    Load the cleaned exports in a directory (None for missing files).
+
+    Args:
+        directory: Directory with the CSV exports
+        cache_dir: Export cache directory, or None to read the CSVs directly
+    """
+    return {name: load_export(path, cache_dir) if path else None
+            for name, path in export_paths(directory).items()}
+
+
+def explode_addresses(series: pd.Series) -> pd.Series:
+    """
+    One row per address of a comma-joined address list, keeping the original index.
+
+    Plain splitting on commas over-counts when an address itself contains
+    commas. Items that look like a unit ("725 Tramway Vista Dr NE, Apt 20")
+    are joined back onto the address before them, and other items that don't
+    start with a street number or PO Box (city, state, ZIP) are dropped.
+    """
+    items = explode_list(series, ',')
+    if items.empty:
+        return items
+    is_unit = items.str.match(_UNIT_FRAGMENT_RE)
+    starts = items.str.match(_ADDRESS_START_RE) & ~is_unit
+    row = pd.Series(items.index, index=items.index)
+    new_row = row.ne(row.shift())
+    # A unit at the start of a row has nothing to attach to; keep it as its own item
+    starts |= new_row
+    group = starts.cumsum()
+    keep = starts | is_unit
+    joined = items[keep].groupby(group[keep]).agg(' '.join)
+    return pd.Series(joined.values, index=row[starts].values)
+
+
+class MembershipLists:
+    """Address, user and subscriber exports linked on canonical keys."""
+
+    def __init__(self, addresses_df: pd.DataFrame, users_df: pd.DataFrame,
+                 address_users_df: Optional[pd.DataFrame] = None,
+                 subscribers_df: Optional[pd.DataFrame] = None):
+        """
+        Build the link tables, indexes and per-address summary.
+
+        Args:
+            addresses_df: addresses_export.csv (Address, Unit, Is Member, User Emails, ...)
+            users_df: export-users-*.csv (Email, Phone, Cell Phone, Addresses, ...)
+            address_users_df: Optional address_users_export.csv (Street Number/Name/Unit, names, Role)
+            subscribers_df: Optional subscribers.csv (Email, Lists)
+        """
+        # Addresses, indexed by key
+        addresses = addresses_df.copy()
+        addresses['address_key'] = address_key(addresses['Address'], addresses['Unit'])
+        addresses['is_member'] = pd.to_numeric(addresses['Is Member'], errors='coerce').fillna(0).astype(int) == 1
+        self.duplicate_addresses = addresses[addresses['address_key'].duplicated(keep=False)]
+        self.addresses = addresses.drop_duplicates('address_key').set_index('address_key')
+
+        # People (users), indexed by row with an email index alongside
+        people = users_df.copy()
+        people['email'] = normalize_email(people['Email'])
+        people['valid_email'] = valid_email_mask(people['Email'])
+        people['has_phone'] = (clean_column(people, 'Phone') != '') | (clean_column(people, 'Cell Phone') != '')
+        people.index.name = 'person'
+        self.people = people
+        self.people_by_email = people.reset_index().set_index('email')
+
+        # person <-> address links
+        user_addresses = explode_addresses(people['Addresses'])
+        self.person_addresses = pd.DataFrame({
+            'person': user_addresses.index,
+            'address': user_addresses.values,
+            'address_key': address_key(user_addresses).values,
+        })
+
+        # address <-> email links from the address export's own User Emails
+        emails = normalize_email(explode_list(addresses_df['User Emails'], '|')) \
+            if 'User Emails' in addresses_df else pd.Series(dtype=object)
+        self.address_emails = pd.DataFrame({
+            'address_key': addresses['address_key'].reindex(emails.index).values,
+            'email': emails.values,
+            'valid_email': valid_email_mask(emails).values,
+        })
+
+        # People tied to addresses in the address-users export
+        if address_users_df is not None:
+            residents = address_users_df.copy()
+            street = clean_column(residents, 'Street Number') + ' ' + clean_column(residents, 'Street Name')
+            residents['address_key'] = address_key(street, residents['Street Unit'])
+            self.residents = residents
+        else:
+            self.residents = pd.DataFrame(columns=['address_key'])
+
+        # email <-> list subscriptions
+        if subscribers_df is not None:
+            lists = explode_list(subscribers_df['Lists'], ',')
+            self.subscriptions = pd.DataFrame({
+                'email': normalize_email(subscribers_df['Email']).reindex(lists.index).values,
+                'list': lists.values,
+            })
+        else:
+            self.subscriptions = pd.DataFrame(columns=['email', 'list'])
+
+        self.summary = self._summarize()
+
+    @classmethod
+    def from_directory(cls, directory: str, cache_dir: Optional[str] = DEFAULT_CACHE_DIR) -> 'MembershipLists':
+        """Build from the exports in a directory (newest export-users-*.csv)."""
+        exports = load_exports(directory, cache_dir)
+        if exports['addresses'] is None or exports['users'] is None:
+            raise FileNotFoundError(f"{ADDRESSES_FILE} and {USERS_PATTERN} are required in {directory}")
+        return cls(exports['addresses'], exports['users'], exports['address_users'], exports['subscribers'])
+
+    def subscribed_emails(self, list_name: str = NEWSLETTER_LIST) -> pd.Index:
+        """Emails on a subscriber list (list names match case-insensitively)."""
+        on_list = self.subscriptions['list'].str.contains(list_name, case=False, regex=False)
+        return pd.Index(self.subscriptions.loc[on_list, 'email'].unique())
+
+    def _summarize(self) -> pd.DataFrame:
+        """Per-address flags, aggregated over every person and email linked to it."""
+        newsletter = self.subscribed_emails()
+
+        linked = self.person_addresses.join(self.people[['email', 'valid_email', 'has_phone']], on='person')
+        by_user = linked.groupby('address_key').agg(
+            users=('person', 'nunique'),
+            user_valid_email=('valid_email', 'any'),
+            any_phone=('has_phone', 'any'),
+        )
+        linked_newsletter = linked.loc[linked['valid_email'] & linked['email'].isin(newsletter), 'address_key']
+
+        emails = self.address_emails
+        by_email = emails.groupby('address_key').agg(listed_valid_email=('valid_email', 'any'))
+        email_newsletter = emails.loc[emails['valid_email'] & emails['email'].isin(newsletter), 'address_key']
+
+        residents = self.residents.groupby('address_key').size().rename('residents')
+
+        summary = self.addresses[['ID', 'Address', 'Unit', 'is_member']].join([by_user, by_email, residents])
+        summary[['users', 'residents']] = summary[['users', 'residents']].fillna(0).astype(int)
+        flags = ['user_valid_email', 'listed_valid_email', 'any_phone']
+        summary[flags] = summary[flags].fillna(False).astype(bool)
+        summary['any_valid_email'] = summary['user_valid_email'] | summary['listed_valid_email']
+        summary['newsletter'] = summary.index.isin(linked_newsletter) | summary.index.isin(email_newsletter)
+        return summary.drop(columns=flags[:2])
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def address(self, text: str, unit: str = '') -> pd.Series:
+        """Summary row for an address in any spelling ("725-20 Tramway Vista Dr. N.E.")."""
+        key = address_key(pd.Series([text]), pd.Series([unit])).iloc[0]
+        return self.summary.loc[key]
+
+    def people_at(self, text: str, unit: str = '') -> pd.DataFrame:
+        """Users linked to an address."""
+        key = address_key(pd.Series([text]), pd.Series([unit])).iloc[0]
+        persons = self.person_addresses.loc[self.person_addresses['address_key'] == key, 'person']
+        return self.people.loc[persons.unique()]
+
+    def person(self, email: str) -> pd.DataFrame:
+        """Users with an email (any case/spacing)."""
+        return self.people_by_email.loc[[email.strip().lower()]]
+
+    # ------------------------------------------------------------------
+    # Coverage questions
+    # ------------------------------------------------------------------
+
+    def members_without_valid_email(self) -> pd.DataFrame:
+        """Member addresses where no linked user or listed email is a valid address."""
+        s = self.summary
+        return s[s['is_member'] & ~s['any_valid_email']]
+
+    def addresses_without_users(self) -> pd.DataFrame:
+        """Addresses no user in the users export is linked to."""
+        return self.summary[self.summary['users'] == 0]
+
+    def users_without_address(self) -> pd.DataFrame:
+        """Users with no address."""
+        return self.people[~self.people.index.isin(self.person_addresses['person'])]
+
+    def unmatched_user_addresses(self) -> pd.DataFrame:
+        """User address links whose key isn't in the address export (spelling or unit mismatches)."""
+        links = self.person_addresses
+        return links[~links['address_key'].isin(self.addresses.index)]
+
+    def subscribers_not_users(self, list_name: str = NEWSLETTER_LIST) -> pd.Index:
+        """Subscriber emails on a list that don't belong to any user."""
+        emails = self.subscribed_emails(list_name)
+        return emails[~emails.isin(self.people_by_email.index)]
+
+    def coverage(self) -> Dict[str, int]:
+        """Headline counts for the address, user and subscriber exports."""
+        s = self.summary
+        members = s[s['is_member']]
+        return {
+            'addresses': len(s),
+            'duplicate_address_rows': len(self.duplicate_addresses),
+            'member_addresses': len(members),
+            'addresses_without_users': int((s['users'] == 0).sum()),
+            'addresses_with_valid_email': int(s['any_valid_email'].sum()),
+            'addresses_with_newsletter': int(s['newsletter'].sum()),
+            'members_without_valid_email': int((~members['any_valid_email']).sum()),
+            'members_without_newsletter': int((~members['newsletter']).sum()),
+            'users': len(self.people),
+            'users_without_address': len(self.users_without_address()),
+            'user_address_links': len(self.person_addresses),
+            'unmatched_user_addresses': len(self.unmatched_user_addresses()),
+            'newsletter_subscribers': len(self.subscribed_emails()),
+            'newsletter_subscribers_not_users': len(self.subscribers_not_users()),
+        }
+
+
+def parse_args():
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description="Reconcile the SHHA address, user and subscriber exports.")
+    parser.add_argument('directory', nargs='?', default='.', help="Directory with the CSV exports (default: .)")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                        help=f"Export cache directory (default: {DEFAULT_CACHE_DIR})")
+    parser.add_argument('--no-cache', action='store_true', help="Read the CSVs directly")
+    parser.add_argument('--export', metavar='DIR',
+                        help="Also write members_without_valid_email.csv, addresses_without_users.csv "
+                             "and unmatched_user_addresses.csv here")
+    return parser.parse_args()
+
+
+def main():
+    """Main execution function."""
+    args = parse_args()
+    try:
+        lists = MembershipLists.from_directory(args.directory, None if args.no_cache else args.cache_dir)
+    except FileNotFoundError as e:
+        print(f"✗ {e}")
+        return
+
+    print("MEMBERSHIP LIST COVERAGE")
+    print("------------------------")
+    for name, count in lists.coverage().items():
+        print(f"{name.replace('_', ' ').capitalize() + ':':<36}{count:>8,}")
+
+    if args.export:
+        os.makedirs(args.export, exist_ok=True)
+        reports = {
+            'members_without_valid_email.csv': lists.members_without_valid_email(),
+            'addresses_without_users.csv': lists.addresses_without_users(),
+            'unmatched_user_addresses.csv': lists.unmatched_user_addresses(),
+        }
+        for filename, df in reports.items():
+            df.to_csv(os.path.join(args.export, filename))
+        print(f"✓ Reports saved to: {args.export}")
+
+
+if __name__ == "__main__":
+    main()
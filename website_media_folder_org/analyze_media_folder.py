@@ -1,81 +1,413 @@
 #!/usr/bin/env python3
 """
-Analyze which files in /media are unique vs duplicated elsewhere
+Inventory Duplicate Analyzer
+Finds which files under given folders (e.g. /media) are unique vs duplicated
+elsewhere, and how many bytes duplicate copies take up in each directory.
+
+The inventory is indexed once (MD5 -> copies, plus a directory tree), so any
+number of folders can be checked without rescanning it. Works as a command
+line tool or as a library:
+
+    analyzer = InventoryAnalyzer.from_file('ftp_inventory_20260120_174025.csv')
+    results = analyzer.classify(['/media', '/uploaded-files'])
 """
 
+import argparse
 import csv
+import glob
+import json
+import os
 from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ftp_inventory import iter_inventory
+
+
+DEFAULT_PREFIXES = ['/media']
+DEFAULT_TOP = 20
+
+
+def split_path(path: str) -> List[str]:
+    """Split a path into its directory names and file name, ignoring empty parts."""
+    return [part for part in path.split('/') if part]
+
+
+def find_latest_inventory(directory: str = ".") -> Optional[str]:
+    """Newest ftp_inventory_* file in a directory (any supported format), or None."""
+    candidates = [p for p in glob.glob(os.path.join(directory, "ftp_inventory_*"))
+                  if p.endswith(('.csv', '.json', '.jsonl', '.gz')) and 'journal' not in p]
+    return max(candidates, key=os.path.getmtime) if candidates else None
+
+
+class DirectoryNode:
+    """One directory in the inventory tree, with totals for everything below it."""
+    
+    __slots__ = ('name', 'parent', 'children', 'file_ids', 'files', 'bytes', 'reclaimable')
+    
+    def __init__(self, name: str = "", parent: Optional['DirectoryNode'] = None):
+        self.name = name
+        self.parent = parent
+        self.children: Dict[str, 'DirectoryNode'] = {}
+        self.file_ids: List[int] = []   # Files directly in this directory
+        self.files = 0                  # Files in this directory and below
+        self.bytes = 0
+        self.reclaimable = 0            # Bytes of redundant duplicate copies below
+    
+    @property
+    def path(self) -> str:
+        """Full directory path, e.g. '/media/images'."""
+        parts = []
+        node = self
+        while node.parent is not None:
+            parts.append(node.name)
+            node = node.parent
+        return '/' + '/'.join(reversed(parts))
+    
+    def walk(self) -> Iterable['DirectoryNode']:
+        """Yield this directory and every directory below it."""
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(node.children[name] for name in sorted(node.children, reverse=True))
+
+
+class InventoryAnalyzer:
+    """Hash index and directory tree over one inventory, for duplicate questions."""
+    
+    def __init__(self, records: Iterable[Dict], keep_prefixes: Optional[List[str]] = None):
+        """
+        Index inventory records.
+        
+        Args:
+            records: File information dictionaries (path, size, md5)
+            keep_prefixes: When a file has several copies, prefer keeping the one
+                under these folders when working out reclaimable bytes
+        """
+        self.paths: List[str] = []
+        self.sizes: List[int] = []
+        self.md5s: List[str] = []
+        self.nodes: List[DirectoryNode] = []
+        self.by_md5: Dict[str, List[int]] = defaultdict(list)
+        self.unhashed: List[str] = []
+        self.root = DirectoryNode()
+        self._directories: Dict[str, DirectoryNode] = {'': self.root}
+        
+        for record in records:
+            self._add(record)
+        
+        self._total_up()
+        self._compute_reclaimable(keep_prefixes or [])
+    
+    @classmethod
+    def from_file(cls, filepath: str, keep_prefixes: Optional[List[str]] = None) -> 'InventoryAnalyzer':
+        """Index an inventory file (JSON, JSON Lines or CSV, optionally gzipped)."""
+        return cls(iter_inventory(filepath), keep_prefixes=keep_prefixes)
+    
+    def _add(self, record: Dict):
+        """Add one record to the index and the directory tree."""
+        path = record.get('path') or ''
+        md5 = record.get('md5') or ''
+        if not path:
+            return
+        if not md5 or md5 == 'ERROR':
+            self.unhashed.append(path)
+            return
+        
+        try:
+            size = int(record.get('size') or 0)
+        except ValueError:
+            size = 0
+        
+        directory = path.rpartition('/')[0]
+        node = self._directories.get(directory)
+        if node is None:
+            node = self.root
+            for part in split_path(directory):
+                child = node.children.get(part)
+                if child is None:
+                    child = node.children[part] = DirectoryNode(part, node)
+                node = child
+            self._directories[directory] = node
+        node.files += 1
+        node.bytes += size
+        
+        file_id = len(self.paths)
+        node.file_ids.append(file_id)
+        self.paths.append(path)
+        self.sizes.append(size)
+        self.md5s.append(md5)
+        self.nodes.append(node)
+        self.by_md5[md5].append(file_id)
+    
+    def _total_up(self):
+        """Add each directory's file counts and bytes into all directories above it."""
+        # walk() lists parents before children, so go backwards
+        for node in reversed(list(self.root.walk())):
+            if node.parent is not None:
+                node.parent.files += node.files
+                node.parent.bytes += node.bytes
+    
+    def find(self, prefix: str) -> Optional[DirectoryNode]:
+        """Directory node for a folder path, or None if the inventory has nothing there."""
+        node = self.root
+        for part in split_path(prefix):
+            node = node.children.get(part)
+            if node is None:
+                return None
+        return node
+    
+    def _is_under(self, file_id: int, prefix_parts: List[str]) -> bool:
+        """Whether a file lies inside the folder given as a list of names."""
+        parts = split_path(self.paths[file_id])[:-1]
+        return parts[:len(prefix_parts)] == prefix_parts
+    
+    def _compute_reclaimable(self, keep_prefixes: List[str]):
+        """
+        Attribute the bytes of redundant copies to their directories.
+        
+        For each group of identical files one copy is kept: one under a
+        keep_prefixes folder if there is one, otherwise the shallowest path
+        (then alphabetical). Every other copy counts as reclaimable in its
+        directory and all directories above it.
+        """
+        keep_parts = [split_path(p) for p in keep_prefixes]
+        
+        for file_ids in self.by_md5.values():
+            if len(file_ids) < 2:
+                continue
+            
+            def keep_rank(file_id: int) -> Tuple[int, int, str]:
+                preferred = any(self._is_under(file_id, parts) for parts in keep_parts)
+                return (0 if preferred else 1, self.paths[file_id].count('/'), self.paths[file_id])
+            
+            kept = min(file_ids, key=keep_rank)
+            for file_id in file_ids:
+                if file_id == kept:
+                    continue
+                node = self.nodes[file_id]
+                while node is not None:
+                    node.reclaimable += self.sizes[file_id]
+                    node = node.parent
+    
+    def files_under(self, node: DirectoryNode) -> List[int]:
+        """Ids of every file in a directory and below it."""
+        return [file_id for directory in node.walk() for file_id in directory.file_ids]
+    
+    def classify(self, prefixes: List[str]) -> Dict[str, Dict]:
+        """
+        Split the files under each folder into unique vs duplicated outside it.
+        
+        A file is duplicated outside X if any file with the same MD5 lies
+        outside X; otherwise it is unique to X (copies inside X don't count).
+        Every folder is answered in one pass over the files under any of them:
+        each directory first learns which of the folders it lies in, then each
+        file is filed under all of those folders at once.
+        
+        Args:
+            prefixes: Folder paths, e.g. ['/media', '/uploaded-files/cropped-images']
+        
+        Returns:
+            Dictionary mapping each folder to its totals, 'unique' records and
+            'duplicated' records (with the copies outside the folder in 'also_at')
+        """
+        unique: Dict[str, List[Dict]] = {}
+        duplicated: Dict[str, List[Dict]] = {}
+        folders_at: Dict[DirectoryNode, Tuple[str, ...]] = {}
+        for prefix in prefixes:
+            key = '/' + '/'.join(split_path(prefix))
+            if key in unique:
+                continue
+            unique[key], duplicated[key] = [], []
+            node = self.find(prefix)
+            if node is not None:
+                folders_at[node] = folders_at.get(node, ()) + (key,)
+        
+        # Folders containing each directory; walk() lists parents first
+        containing: Dict[DirectoryNode, Tuple[str, ...]] = {}
+        for node in self.root.walk():
+            keys = containing.get(node.parent, ()) + folders_at.get(node, ())
+            if keys:
+                containing[node] = keys
+        
+        outside_cache: Dict[Tuple[str, str], List[str]] = {}
+        for node, keys in containing.items():
+            for file_id in node.file_ids:
+                md5 = self.md5s[file_id]
+                for key in keys:
+                    if (key, md5) not in outside_cache:
+                        outside_cache[key, md5] = [self.paths[other] for other in self.by_md5[md5]
+                                                   if key not in containing.get(self.nodes[other], ())]
+                    record = {'path': self.paths[file_id], 'size': self.sizes[file_id], 'md5': md5}
+                    if outside_cache[key, md5]:
+                        record['also_at'] = outside_cache[key, md5]
+                        duplicated[key].append(record)
+                    else:
+                        unique[key].append(record)
+        
+        return {
+            key: {
+                'total_files': len(unique[key]) + len(duplicated[key]),
+                'unique_files': len(unique[key]),
+                'unique_bytes': sum(r['size'] for r in unique[key]),
+                'duplicated_files': len(duplicated[key]),
+                'duplicated_bytes': sum(r['size'] for r in duplicated[key]),
+                'unique': unique[key],
+                'duplicated': duplicated[key],
+            }
+            for key in unique
+        }
+    
+    def directory_report(self, max_depth: Optional[int] = None, min_reclaimable: int = 1) -> List[Dict]:
+        """
+        Per-directory totals, largest reclaimable bytes first.
+        
+        Args:
+            max_depth: Only include directories at most this deep (root is 0)
+            min_reclaimable: Skip directories with fewer reclaimable bytes than this
+        
+        Returns:
+            List of {path, files, bytes, reclaimable_bytes} dictionaries
+        """
+        rows = []
+        stack = [(self.root, 0)]
+        while stack:
+            node, depth = stack.pop()
+            if node.reclaimable >= min_reclaimable:
+                rows.append({'path': node.path, 'files': node.files, 'bytes': node.bytes,
+                             'reclaimable_bytes': node.reclaimable})
+            if max_depth is None or depth < max_depth:
+                stack.extend((child, depth + 1) for child in node.children.values())
+        
+        rows.sort(key=lambda r: (-r['reclaimable_bytes'], r['path']))
+        return rows
+    
+    def print_report(self, results: Dict[str, Dict], top: int = DEFAULT_TOP):
+        """Print folder results and the directories with most reclaimable bytes."""
+        for path in self.unhashed:
+            print(f"WARNING - No hash: {path}")
+        
+        for prefix, result in results.items():
+            print(f"\n{'='*70}")
+            print(f"Analysis of {prefix}")
+            print(f"{'='*70}\n")
+            print(f"Total files in {prefix}: {result['total_files']}")
+            print(f"Files UNIQUE to {prefix} (not found elsewhere): {result['unique_files']} "
+                  f"({result['unique_bytes']:,} bytes)")
+            print(f"Files duplicated outside {prefix} (safe to delete): {result['duplicated_files']} "
+                  f"({result['duplicated_bytes']:,} bytes)\n")
+            
+            if result['unique']:
+                print(f"{'='*70}")
+                print(f"UNIQUE FILES - These exist ONLY in {prefix} (first {top}):")
+                print(f"{'='*70}\n")
+                for f in result['unique'][:top]:
+                    print(f"{f['path']} ({f['size']} bytes)")
+                if len(result['unique']) > top:
+                    print(f"... and {len(result['unique']) - top} more unique files")
+                print()
+            
+            if result['duplicated']:
+                print(f"{'='*70}")
+                print(f"DUPLICATED FILES - These exist elsewhere (first {top}):")
+                print(f"{'='*70}\n")
+                for i, dup in enumerate(result['duplicated'][:top], 1):
+                    print(f"{i}. {dup['path']}")
+                    print(f"   Also at: {dup['also_at'][0]}")
+                    if len(dup['also_at']) > 1:
+                        print(f"   (and {len(dup['also_at'])-1} other location(s))")
+                    print()
+                
+                if len(result['duplicated']) > top:
+                    print(f"... and {len(result['duplicated'])-top} more duplicated files\n")
+        
+        directories = self.directory_report()
+        if directories:
+            print(f"{'='*70}")
+            print(f"RECLAIMABLE SPACE - Bytes in redundant duplicate copies (top {top} directories):")
+            print(f"{'='*70}\n")
+            for row in directories[:top]:
+                print(f"{row['reclaimable_bytes']:>15,}  {row['path']}")
+            print()
+    
+    def save_json(self, results: Dict[str, Dict], output_file: str, source: str = ""):
+        """Save folder results and the directory report to a JSON file."""
+        output = {
+            'generated_at': datetime.now().isoformat(),
+            'inventory': source,
+            'total_files': len(self.paths),
+            'unhashed': self.unhashed,
+            'prefixes': results,
+            'directories': self.directory_report(min_reclaimable=0),
+        }
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(output, f, indent=2)
+        print(f"✓ JSON results saved to: {output_file}")
+    
+    def save_csv(self, results: Dict[str, Dict], output_file: str):
+        """Save one row per analyzed file: folder, path, size, md5, status and other copies."""
+        with open(output_file, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['prefix', 'path', 'size', 'md5', 'status', 'also_at', 'other_copies'])
+            for prefix, result in results.items():
+                for r in result['unique']:
+                    writer.writerow([prefix, r['path'], r['size'], r['md5'], 'unique', '', 0])
+                for r in result['duplicated']:
+                    writer.writerow([prefix, r['path'], r['size'], r['md5'], 'duplicated',
+                                     r['also_at'][0], len(r['also_at'])])
+        print(f"✓ CSV results saved to: {output_file}")
+    
+    def save_directories_csv(self, output_file: str):
+        """Save per-directory file counts, bytes and reclaimable bytes to CSV."""
+        with open(output_file, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=['path', 'files', 'bytes', 'reclaimable_bytes'])
+            writer.writeheader()
+            writer.writerows(self.directory_report(min_reclaimable=0))
+        print(f"✓ Directory report saved to: {output_file}")
+
+
+def parse_args():
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description="Find unique vs duplicated files in inventory folders.")
+    parser.add_argument('inventory', nargs='?',
+                        help="Inventory file (JSON, JSON Lines or CSV, optionally .gz; "
+                             "default: newest ftp_inventory_* here)")
+    parser.add_argument('--prefix', action='append', dest='prefixes', metavar='FOLDER',
+                        help="Folder to analyze; repeat for several (default: /media)")
+    parser.add_argument('--keep', action='append', default=[], metavar='FOLDER',
+                        help="Prefer keeping copies in this folder when counting reclaimable bytes")
+    parser.add_argument('--top', type=int, default=DEFAULT_TOP,
+                        help=f"Files and directories to list per section (default: {DEFAULT_TOP})")
+    parser.add_argument('--json', metavar='FILE', help="Save full results as JSON")
+    parser.add_argument('--csv', metavar='FILE', help="Save one row per analyzed file as CSV")
+    parser.add_argument('--dirs-csv', metavar='FILE', help="Save per-directory reclaimable bytes as CSV")
+    return parser.parse_args()
+
+
+def main():
+    """Main execution function."""
+    args = parse_args()
+    
+    inventory = args.inventory or find_latest_inventory()
+    if not inventory or not os.path.exists(inventory):
+        print("✗ Inventory file not found (run ftp_inventory.py first or pass a file)")
+        return
+    
+    print(f"Loading {inventory}...")
+    analyzer = InventoryAnalyzer.from_file(inventory, keep_prefixes=args.keep)
+    print(f"✓ Indexed {len(analyzer.paths)} files, {len(analyzer.by_md5)} distinct hashes")
+    
+    results = analyzer.classify(args.prefixes or DEFAULT_PREFIXES)
+    analyzer.print_report(results, top=args.top)
+    
+    if args.json:
+        analyzer.save_json(results, args.json, source=inventory)
+    if args.csv:
+        analyzer.save_csv(results, args.csv)
+    if args.dirs_csv:
+        analyzer.save_directories_csv(args.dirs_csv)
+
 
-# Load the inventory
-files_by_hash = defaultdict(list)
-media_files = []
-
-with open('ftp_inventory_20260120_174025.csv', 'r', encoding='utf-8') as f:
-    reader = csv.DictReader(f)
-    for row in reader:
-        path = row['path']
-        md5 = row['md5']
-        
-        # Track all files by hash
-        if md5 and md5 != 'ERROR':
-            files_by_hash[md5].append(path)
-        
-        # Track files in /media
-        if path.startswith('/media/'):
-            media_files.append(row)
-
-# Find media files that are unique (no duplicates elsewhere)
-unique_to_media = []
-duplicated = []
-
-for file_info in media_files:
-    md5 = file_info['md5']
-    path = file_info['path']
-    
-    if md5 == 'ERROR':
-        print(f"WARNING - No hash: {path}")
-        continue
-    
-    all_locations = files_by_hash[md5]
-    
-    # Check if this file exists outside /media
-    non_media_locations = [loc for loc in all_locations if not loc.startswith('/media/')]
-    
-    if non_media_locations:
-        duplicated.append({
-            'media_path': path,
-            'also_at': non_media_locations,
-            'size': file_info['size']
-        })
-    else:
-        unique_to_media.append(file_info)
-
-# Report results
-print(f"\n{'='*70}")
-print(f"Analysis of /media folder")
-print(f"{'='*70}\n")
-print(f"Total files in /media: {len(media_files)}")
-print(f"Files UNIQUE to /media (not found elsewhere): {len(unique_to_media)}")
-print(f"Files duplicated outside /media (safe to delete): {len(duplicated)}\n")
-
-if unique_to_media:
-    print(f"{'='*70}")
-    print(f"UNIQUE FILES - These exist ONLY in /media:")
-    print(f"{'='*70}\n")
-    for f in unique_to_media:
-        print(f"{f['path']} ({f['size']} bytes)")
-    print()
-
-if duplicated:
-    print(f"{'='*70}")
-    print(f"DUPLICATED FILES - These exist elsewhere (first 20):")
-    print(f"{'='*70}\n")
-    for i, dup in enumerate(duplicated[:20], 1):
-        print(f"{i}. {dup['media_path']}")
-        print(f"   Also at: {dup['also_at'][0]}")
-        if len(dup['also_at']) > 1:
-            print(f"   (and {len(dup['also_at'])-1} other location(s))")
-        print()
-    
-    if len(duplicated) > 20:
-        print(f"... and {len(duplicated)-20} more duplicated files\n")
+if __name__ == "__main__":
+    main()
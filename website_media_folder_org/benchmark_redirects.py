@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+"""
+Redirect Validation and Benchmark
+Serves generated redirect rules from a local stand-in web server, replays the
+old URLs against it concurrently and checks that every one lands on its new URL.
+
+The stand-in server reads the same files the generator writes and resolves them
+the way the real servers do:
+- htaccess:     RewriteRule regexes tried in order on every request (Apache)
+- nginx:        exact-match location blocks
+- nginx-map:    one hash lookup in the map
+- rewritemap:   one lookup of the escaped path in the RewriteMap file
+
+Reports mismatches, redirect chains, p50/p99 latency and config load time,
+either for a real url_mappings JSON or for synthetic rule sets of growing size.
+Absolute numbers are for this Python server, not Apache or nginx; compare the
+formats and sizes against each other.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import re
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+from generate_url_mappings import URLMappingGenerator, url_quote
+
+
+FORMATS = ['htaccess', 'nginx', 'nginx-map', 'rewritemap']
+DEFAULT_SCALES = [100, 1000, 10000, 100000]
+DEFAULT_CONCURRENCY = 16
+DEFAULT_SAMPLE = 500
+
+# Stop following redirects after this many hops (browsers give up around 20)
+MAX_HOPS = 10
+
+# Quoted or bare config token
+TOKEN = r'("(?:[^"\\]|\\.)*"|\S+)'
+REWRITE_RULE_RE = re.compile(r'^\s*RewriteRule\s+' + TOKEN + r'\s+' + TOKEN + r'(?:\s+\[([^\]]*)\])?')
+LOCATION_RE = re.compile(r'^\s*location\s+=\s+' + TOKEN + r'\s*\{')
+RETURN_RE = re.compile(r'^\s*return\s+(\d{3})\s+' + TOKEN + r'\s*;')
+MAP_ENTRY_RE = re.compile(r'^\s*' + TOKEN + r'\s+' + TOKEN + r'\s*;')
+
+
+def unquote_token(token: str) -> str:
+    """Strip config quoting from a token parsed out of a rule file."""
+    if len(token) >= 2 and token[0] == token[-1] == '"':
+        return re.sub(r'\\(["\\])', r'\1', token[1:-1])
+    return token
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of numbers (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100 * len(ordered))))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def load_htaccess(filepath: str) -> Callable[[str], Optional[str]]:
+    """
+    Load RewriteRules from an .htaccess file.
+    
+    Returns:
+        Resolver taking the decoded request path and returning the redirect
+        target, or None. Rules are tried in file order like Apache does.
+    """
+    rules = []
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for line in f:
+            match = REWRITE_RULE_RE.match(line)
+            if match:
+                pattern, target, _ = match.groups()
+                rules.append((re.compile(unquote_token(pattern)), unquote_token(target)))
+    
+    def resolve(path: str) -> Optional[str]:
+        # .htaccess rules see the path without its leading slash
+        relative = path.lstrip('/')
+        for pattern, target in rules:
+            if pattern.search(relative):
+                return target
+        return None
+    
+    return resolve
+
+
+def load_nginx_locations(filepath: str) -> Callable[[str], Optional[str]]:
+    """Load exact-match location blocks from an nginx config file."""
+    locations = {}
+    current = None
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for line in f:
+            match = LOCATION_RE.match(line)
+            if match:
+                current = unquote_token(match.group(1))
+                continue
+            match = RETURN_RE.match(line)
+            if match and current is not None:
+                locations[current] = unquote_token(match.group(2))
+                current = None
+    return locations.get
+
+
+def load_nginx_map(filepath: str) -> Callable[[str], Optional[str]]:
+    """Load the entries of an nginx map block."""
+    entries = {}
+    in_map = False
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.lstrip().startswith('map '):
+                in_map = True
+                continue
+            if in_map:
+                if line.strip() == '}':
+                    break
+                match = MAP_ENTRY_RE.match(line)
+                if match and match.group(1) != 'default':
+                    entries[unquote_token(match.group(1))] = unquote_token(match.group(2))
+    return lambda path: entries.get(path) or None
+
+
+def load_rewritemap(filepath: str) -> Callable[[str], Optional[str]]:
+    """Load an Apache RewriteMap txt file; lookups escape the path like int:escape."""
+    entries = {}
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.startswith('#') or not line.strip():
+                continue
+            key, value = line.split()[:2]
+            entries[key] = value
+    return lambda path: entries.get(url_quote(path))
+
+
+LOADERS = {
+    'htaccess': load_htaccess,
+    'nginx': load_nginx_locations,
+    'nginx-map': load_nginx_map,
+    'rewritemap': load_rewritemap,
+}
+
+
+class StandInServer:
+    """Local HTTP server that answers requests from one set of redirect rules."""
+    
+    def __init__(self, resolve: Callable[[str], Optional[str]], live_paths: set):
+        """
+        Initialize stand-in server.
+        
+        Args:
+            resolve: Function mapping a decoded request path to a redirect target (or None)
+            live_paths: Paths that exist as files (answered with 200)
+        """
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            
+            def do_HEAD(self):
+                path = unquote(urlsplit(self.path).path)
+                target = resolve(path)
+                if target:
+                    self.send_response(301)
+                    self.send_header('Location', target)
+                elif path in live_paths:
+                    self.send_response(200)
+                else:
+                    self.send_response(404)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+            
+            do_GET = do_HEAD
+            
+            def log_message(self, format, *args):
+                pass
+        
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+    
+    def __enter__(self):
+        self.thread.start()
+        return self
+    
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class RedirectBenchmark:
+    """Replay old URLs against generated redirect rules and measure the results."""
+    
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY):
+        """
+        Initialize benchmark.
+        
+        Args:
+            concurrency: Number of simultaneous client connections
+        """
+        self.concurrency = concurrency
+        self.results: List[Dict] = []
+        self._connections: List[http.client.HTTPConnection] = []
+        self._lock = threading.Lock()
+    
+    def write_rules(self, generator: URLMappingGenerator, directory: str) -> Dict[str, str]:
+        """
+        Write every redirect format for the generator's mappings.
+        
+        Returns:
+            Dictionary mapping format name to rule file path
+        """
+        files = {
+            'htaccess': os.path.join(directory, 'redirects.htaccess'),
+            'nginx': os.path.join(directory, 'redirects.nginx.conf'),
+            'nginx-map': os.path.join(directory, 'redirects.nginx.map.conf'),
+            'rewritemap': os.path.join(directory, 'redirects.map.txt'),
+        }
+        generator.save_htaccess(files['htaccess'])
+        generator.save_nginx(files['nginx'])
+        generator.save_nginx_map(files['nginx-map'])
+        generator.save_apache_rewritemap(files['rewritemap'], os.path.join(directory, 'redirects.rewritemap.conf'))
+        return files
+    
+    def _follow(self, conn_holder: threading.local, port: int, old_path: str) -> Tuple[float, int, str, int]:
+        """
+        Request one old path and follow its redirects.
+        
+        Returns:
+            (seconds for the first response, redirects followed, final path, final status)
+        """
+        if not hasattr(conn_holder, 'conn'):
+            conn_holder.conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+            with self._lock:
+                self._connections.append(conn_holder.conn)
+        conn = conn_holder.conn
+        
+        path = url_quote(old_path)
+        first = None
+        hops = 0
+        while True:
+            start = time.perf_counter()
+            conn.request('HEAD', path)
+            response = conn.getresponse()
+            response.read()
+            if first is None:
+                first = time.perf_counter() - start
+            if response.status not in (301, 302, 307, 308) or hops >= MAX_HOPS:
+                return first, hops, unquote(path), response.status
+            hops += 1
+            path = urlsplit(response.getheader('Location')).path
+    
+    def replay(self, rule_format: str, rule_file: str, mappings: List[Dict], live_paths: set) -> Dict:
+        """
+        Serve one rule file and replay old paths against it.
+        
+        Args:
+            rule_format: One of FORMATS
+            rule_file: Generated rule file
+            mappings: Mappings to check (old_path must end at new_path)
+            live_paths: Paths that exist as files on the stand-in server
+        
+        Returns:
+            Result dictionary with mismatches, chains and latency figures
+        """
+        start = time.perf_counter()
+        resolve = LOADERS[rule_format](rule_file)
+        load_seconds = time.perf_counter() - start
+        
+        latencies = []
+        mismatches = []
+        chains = []
+        
+        with StandInServer(resolve, live_paths) as server:
+            local = threading.local()
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                outcomes = pool.map(lambda m: self._follow(local, server.port, m['old_path']), mappings)
+                for mapping, (latency, hops, final, status) in zip(mappings, outcomes):
+                    latencies.append(latency)
+                    if final != mapping['new_path'] or status != 200:
+                        mismatches.append({'old_path': mapping['old_path'], 'expected': mapping['new_path'],
+                                           'got': final, 'status': status})
+                    if hops > 1:
+                        chains.append({'old_path': mapping['old_path'], 'hops': hops})
+            elapsed = time.perf_counter() - start
+            
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        
+        return {
+            'format': rule_format,
+            'requests': len(mappings),
+            'mismatches': mismatches,
+            'chains': chains,
+            'load_ms': load_seconds * 1000,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+            'mean_ms': statistics.fmean(latencies) * 1000 if latencies else 0.0,
+            'requests_per_sec': len(mappings) / elapsed if elapsed else 0.0,
+        }
+    
+    def run(self, generator: URLMappingGenerator, formats: List[str], sample: Optional[int] = None,
+            label: str = "") -> List[Dict]:
+        """
+        Write, serve and replay every requested format for one set of mappings.
+        
+        Args:
+            generator: Generator holding the mappings
+            formats: Formats to test
+            sample: Replay only this many randomly chosen mappings (default: all)
+            label: Name for this run in the report
+        
+        Returns:
+            Result dictionaries, one per format
+        """
+        mappings = generator.mappings
+        live_paths = {m['new_path'] for m in mappings}
+        replayed = mappings
+        if sample and sample < len(mappings):
+            replayed = random.Random(0).sample(mappings, sample)
+        
+        results = []
+        with tempfile.TemporaryDirectory() as directory:
+            files = self.write_rules(generator, directory)
+            for rule_format in formats:
+                print(f"  Replaying {len(replayed)} URLs against {rule_format} ({len(mappings)} rules)...")
+                result = self.replay(rule_format, files[rule_format], replayed, live_paths)
+                result['rules'] = len(mappings)
+                result['label'] = label
+                results.append(result)
+        
+        self.results.extend(results)
+        return results
+    
+    def print_report(self):
+        """Print a table of all results."""
+        print(f"\n{'='*96}")
+        print(f"{'Run':<12} {'Format':<11} {'Rules':>7} {'Sent':>6} {'Wrong':>6} {'Chains':>6} "
+              f"{'Load ms':>9} {'p50 ms':>8} {'p99 ms':>8} {'Req/s':>8}")
+        print(f"{'-'*96}")
+        for r in self.results:
+            print(f"{r['label']:<12} {r['format']:<11} {r['rules']:>7} {r['requests']:>6} "
+                  f"{len(r['mismatches']):>6} {len(r['chains']):>6} {r['load_ms']:>9.1f} "
+                  f"{r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['requests_per_sec']:>8.0f}")
+        print(f"{'='*96}")
+        
+        for r in self.results:
+            for m in r['mismatches'][:5]:
+                print(f"✗ {r['label']} {r['format']}: {m['old_path']} -> {m['got']} "
+                      f"(HTTP {m['status']}, expected {m['expected']})")
+            for c in r['chains'][:5]:
+                print(f"⚠ {r['label']} {r['format']}: {c['old_path']} takes {c['hops']} redirects")
+    
+    def save_json(self, output_file: str):
+        """Save all results to a JSON file."""
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump({'generated_at': time.strftime('%Y-%m-%dT%H:%M:%S'), 'results': self.results}, f, indent=2)
+        print(f"✓ Benchmark results saved to: {output_file}")
+
+
+def load_mappings(mappings_file: str) -> URLMappingGenerator:
+    """Load a url_mappings JSON file (from save_json) into a generator."""
+    with open(mappings_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    generator = URLMappingGenerator(base_url=data.get('base_url', ''))
+    generator.mappings = data.get('mappings', [])
+    return generator
+
+
+def synthetic_mappings(count: int) -> URLMappingGenerator:
+    """
+    Build a generator holding `count` made-up mappings.
+    
+    Names include spaces, dots and parentheses so escaping is exercised too.
+    """
+    generator = URLMappingGenerator()
+    for i in range(count):
+        old_path = f"/uploaded-files/folder {i % 97}/image_{i}.v1 (copy).jpg"
+        new_path = f"/media/{i % 31}/image_{i}.jpg"
+        generator.mappings.append({
+            'old_path': old_path,
+            'new_path': new_path,
+            'old_url': generator._path_to_url(old_path),
+            'new_url': generator._path_to_url(new_path),
+            'md5': f"{i:032x}",
+            'filename': f"image_{i}.jpg",
+            'size': '1000',
+            'status': 'moved'
+        })
+    return generator
+
+
+def parse_args():
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description="Check generated redirects and measure their per-request cost.")
+    parser.add_argument('mappings_file', nargs='?',
+                        help="url_mappings JSON to validate (omit to benchmark synthetic rule sets)")
+    parser.add_argument('--formats', default=','.join(FORMATS),
+                        help=f"Comma-separated formats to test (default: {','.join(FORMATS)})")
+    parser.add_argument('--scales', default=','.join(str(n) for n in DEFAULT_SCALES),
+                        help="Comma-separated rule counts for the synthetic benchmark")
+    parser.add_argument('--sample', type=int,
+                        help=f"Replay only this many URLs per run (default: all for a mappings file, "
+                             f"{DEFAULT_SAMPLE} for the synthetic benchmark)")
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"Simultaneous client connections (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument('--output', help="Also save the results as JSON")
+    return parser.parse_args()
+
+
+def main():
+    """Main execution function."""
+    args = parse_args()
+    formats = [f.strip() for f in args.formats.split(',') if f.strip()]
+    unknown = [f for f in formats if f not in FORMATS]
+    if unknown:
+        print(f"✗ Unknown format(s): {', '.join(unknown)} (choose from {', '.join(FORMATS)})")
+        return
+    
+    benchmark = RedirectBenchmark(concurrency=args.concurrency)
+    
+    if args.mappings_file:
+        if not os.path.exists(args.mappings_file):
+            print(f"✗ Mappings file not found: {args.mappings_file}")
+            return
+        generator = load_mappings(args.mappings_file)
+        print(f"Validating {len(generator.mappings)} mappings from {args.mappings_file}")
+        benchmark.run(generator, formats, sample=args.sample, label='mappings')
+    else:
+        for count in (int(n) for n in args.scales.split(',')):
+            print(f"\nSynthetic rule set: {count} redirects")
+            benchmark.run(synthetic_mappings(count), formats, sample=args.sample or DEFAULT_SAMPLE,
+                          label=f"{count} rules")
+    
+    benchmark.print_report()
+    if args.output:
+        benchmark.save_json(args.output)
+    
+    if any(r['mismatches'] for r in benchmark.results):
+        print("\n✗ Some old URLs did not reach their new URL")
+    else:
+        print("\n✓ Every replayed URL reached its new URL")
+
+
+if __name__ == "__main__":
+    main()
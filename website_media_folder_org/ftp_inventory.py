@@ -2,24 +2,416 @@
 """
 FTP File Inventory Generator
 Creates a comprehensive inventory of files from an FTP server with MD5 hashes
-for tracking file relocations and URL mapping.
+for tracking file relocations and URL mapping. A local mirror of the site can
+be inventoried instead with --local (see local_inventory.py).
 """
 
 import ftplib
 import hashlib
 import csv
+import gzip
 import json
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Iterable, Optional, TextIO
 import os
-from io import BytesIO
+import re
+import stat
+import argparse
+from collections import defaultdict
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
 
 
-class FTPInventory:
+# Most shared hosts allow only a handful of simultaneous logins per account
+DEFAULT_MAX_SESSIONS = 4
+
+# Bytes requested per read from the data connection while hashing
+DEFAULT_BLOCK_SIZE = 64 * 1024
+
+# Bytes read from each end of a file when screening same-size files for duplicates
+DEFAULT_SAMPLE_SIZE = 4 * 1024
+
+# MD5 of zero bytes; every empty file has it
+EMPTY_MD5 = hashlib.md5(b'').hexdigest()
+
+# Checkpoint file that records each hashed file as soon as it is done
+DEFAULT_JOURNAL = "ftp_inventory_journal.jsonl"
+
+# Columns of an inventory record, shared by every backend
+INVENTORY_FIELDS = ['path', 'name', 'size', 'permissions', 'modified', 'md5', 'hash_method', 'timestamp']
+
+# Unix-style LIST line: permissions, links, owner, [group], size, date, name
+UNIX_LIST_RE = re.compile(
+    r'^([\-dlbcps][\-rwxsStT]{9})\S*\s+\d+\s+(?:\S+\s+){1,2}(\d+)\s+'
+    r'(\w{3}\s+\d{1,2}\s+(?:\d{1,2}:\d{2}|\d{4}))\s(.+)$'
+)
+
+# DOS/IIS-style LIST line: date, time, <DIR> or size, name
+DOS_LIST_RE = re.compile(r'^(\d{2}-\d{2}-\d{2,4})\s+(\d{1,2}:\d{2}[AP]M)\s+(<DIR>|\d+)\s+(.+)$', re.I)
+
+
+def format_rate(num_bytes: int, seconds: float) -> str:
+    """Format a transfer rate as a human-readable string (e.g. '1.4 MB/s')."""
+    rate = num_bytes / seconds if seconds > 0 else 0.0
+    for unit in ('B/s', 'KB/s', 'MB/s'):
+        if rate < 1024:
+            return f"{rate:.1f} {unit}"
+        rate /= 1024
+    return f"{rate:.1f} GB/s"
+
+
+def parse_list_line(line: str) -> Optional[Dict]:
+    """
+    Parse one line of LIST output (Unix or DOS format).
+    
+    Args:
+        line: Raw LIST line
+        
+    Returns:
+        Entry dictionary, or None for lines that aren't entries (e.g. 'total 12')
+    """
+    match = UNIX_LIST_RE.match(line)
+    if match:
+        permissions, size, _, name = match.groups()
+        if permissions.startswith('l') and ' -> ' in name:
+            name = name.split(' -> ', 1)[0]
+        # Skip current and parent directory references
+        if name in ('.', '..'):
+            return None
+        return {
+            'name': name,
+            'type': 'dir' if permissions.startswith('d') else 'file',
+            'size': size,
+            'permissions': permissions,
+            'modified': '',
+        }
+    
+    match = DOS_LIST_RE.match(line)
+    if match:
+        _, _, size, name = match.groups()
+        is_dir = size.upper() == '<DIR>'
+        return {
+            'name': name,
+            'type': 'dir' if is_dir else 'file',
+            'size': '0' if is_dir else size,
+            'permissions': '',
+            'modified': '',
+        }
+    
+    return None
+
+
+def parse_mlsd_facts(name: str, facts: Dict[str, str]) -> Optional[Dict]:
+    """
+    Convert one MLSD entry into the same shape parse_list_line returns.
+    
+    Args:
+        name: Entry name
+        facts: MLSD facts (ftplib lower-cases the fact names)
+        
+    Returns:
+        Entry dictionary, or None for the '.' and '..' entries
+    """
+    kind = facts.get('type', '').lower()
+    if kind in ('cdir', 'pdir') or name in ('.', '..'):
+        return None
+    
+    is_dir = kind == 'dir'
+    mode = facts.get('unix.mode')
+    if mode:
+        permissions = stat.filemode(int(mode, 8) | (stat.S_IFDIR if is_dir else stat.S_IFREG))
+    else:
+        permissions = facts.get('perm', '')
+    
+    return {
+        'name': name,
+        'type': 'dir' if is_dir else 'file',
+        'size': facts.get('size', '0'),
+        'permissions': permissions,
+        # YYYYMMDDHHMMSS[.sss] in UTC, same as MDTM
+        'modified': facts.get('modify', '').split('.')[0],
+    }
+
+
+def open_inventory_file(filepath: str, mode: str = 'r') -> TextIO:
+    """
+    Open an inventory file as text, gzip-compressed if the name ends in .gz.
+    
+    Args:
+        filepath: Path to inventory file
+        mode: 'r', 'w' or 'a'
+        
+    Returns:
+        Text file object
+    """
+    if filepath.endswith('.gz'):
+        return gzip.open(filepath, mode + 't', newline='', encoding='utf-8')
+    return open(filepath, mode, newline='', encoding='utf-8')
+
+
+def iter_inventory(filepath: str) -> Iterable[Dict]:
+    """
+    Read records from a saved inventory one at a time.
+    
+    Handles JSON (save_to_json), JSON Lines and CSV, optionally gzipped.
+    JSON Lines and CSV are read incrementally, so a file that is still being
+    written by a streaming run can be read up to its last complete record.
+    
+    Args:
+        filepath: Path to inventory file
+        
+    Yields:
+        File information dictionaries
+    """
+    name = filepath[:-3] if filepath.endswith('.gz') else filepath
+    
+    with open_inventory_file(filepath) as f:
+        if name.endswith('.json'):
+            yield from json.load(f).get('files', [])
+        elif name.endswith('.jsonl'):
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # Partially written last line
+                    continue
+        else:
+            yield from csv.DictReader(f)
+
+
+def load_inventory(filepath: str) -> List[Dict]:
+    """
+    Load a previously saved inventory (JSON, JSON Lines or CSV, optionally gzipped).
+    
+    Args:
+        filepath: Path to an inventory written by save_to_json, save_to_csv or InventoryWriter
+        
+    Returns:
+        List of file information dictionaries
+    """
+    return list(iter_inventory(filepath))
+
+
+def csv_fieldnames(records: Iterable[Dict]) -> List[str]:
+    """
+    Collect CSV columns: INVENTORY_FIELDS first, then any extra keys in first-seen order.
+    
+    Args:
+        records: Inventory records
+        
+    Returns:
+        Column names covering every key in every record
+    """
+    fieldnames = list(INVENTORY_FIELDS)
+    seen = set(fieldnames)
+    for record in records:
+        for key in record:
+            if key not in seen:
+                seen.add(key)
+                fieldnames.append(key)
+    return fieldnames
+
+
+class InventoryWriter:
+    """
+    Write inventory records to disk as they are produced.
+    
+    Each record is appended as a CSV row and/or a JSON Lines line and flushed,
+    so memory use doesn't grow with the inventory and other tools can read
+    the files while the scan is still running. Names ending in .gz are
+    gzip-compressed (flushed every flush_every records instead).
+    """
+    
+    def __init__(self, csv_file: Optional[str] = None, jsonl_file: Optional[str] = None,
+                 flush_every: Optional[int] = None):
+        """
+        Open the output files.
+        
+        Args:
+            csv_file: CSV output path, or None to skip CSV
+            jsonl_file: JSON Lines output path, or None to skip JSON Lines
+            flush_every: Records between flushes (default: 1, or 1000 for gzip)
+        """
+        self.csv_file = csv_file
+        self.jsonl_file = jsonl_file
+        self.count = 0
+        self._lock = threading.Lock()
+        self._csv = open_inventory_file(csv_file, 'w') if csv_file else None
+        self._jsonl = open_inventory_file(jsonl_file, 'w') if jsonl_file else None
+        compressed = any(f and f.endswith('.gz') for f in (csv_file, jsonl_file))
+        self.flush_every = flush_every or (1000 if compressed else 1)
+        
+        self._csv_writer = None
+        if self._csv:
+            # The header has to be written before any record is seen, so the
+            # columns are fixed; extra keys still go to the JSON Lines output
+            self._csv_writer = csv.DictWriter(self._csv, fieldnames=INVENTORY_FIELDS,
+                                              restval='', extrasaction='ignore')
+            self._csv_writer.writeheader()
+    
+    def write(self, record: Dict):
+        """Append one record to every output (safe to call from several threads)."""
+        with self._lock:
+            if self._csv_writer:
+                self._csv_writer.writerow(record)
+            if self._jsonl:
+                self._jsonl.write(json.dumps(record) + '\n')
+            self.count += 1
+            if self.count % self.flush_every == 0:
+                self.flush()
+    
+    def flush(self):
+        """Push buffered records to disk."""
+        for f in (self._csv, self._jsonl):
+            if f:
+                f.flush()
+    
+    def close(self):
+        """Flush and close the output files."""
+        for f in (self._csv, self._jsonl):
+            if f:
+                f.close()
+        for path in (self.csv_file, self.jsonl_file):
+            if path:
+                print(f"✓ Streamed {self.count} records to: {path}")
+
+
+def is_unchanged(old: Optional[Dict], file_info: Dict) -> bool:
+    """
+    Check whether a file can keep the MD5 from an earlier inventory record.
+    
+    Args:
+        old: Earlier record for the same path (or None)
+        file_info: Current listing record, including 'modified'
+        
+    Returns:
+        True if size and modification time match and the old hash is usable
+    """
+    return bool(
+        old and file_info.get('modified')
+        and old.get('md5') not in (None, '', 'ERROR')
+        and str(old.get('size')) == str(file_info['size'])
+        and old.get('modified') == file_info['modified']
+    )
+
+
+def load_journal(filepath: str) -> Dict[str, Dict]:
+    """
+    Load completed records from a checkpoint journal.
+    
+    Records that ended as ERROR are left out so they are retried, and a
+    partially written last line (from a killed process) is ignored.
+    
+    Args:
+        filepath: Path to a JSON Lines journal written during Phase 2
+        
+    Returns:
+        Dictionary mapping path to its most recent successful record
+    """
+    done = {}
+    if not os.path.exists(filepath):
+        return done
+    
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get('md5') not in (None, '', 'ERROR'):
+                done[record['path']] = record
+            else:
+                done.pop(record.get('path'), None)
+    
+    return done
+
+
+class Inventory(ABC):
+    """
+    Base class for inventory backends.
+    
+    A backend lists files under a start path and hashes them, producing
+    records with the INVENTORY_FIELDS columns so that generate_url_mappings.py
+    and analyze_media_folder.py can consume any backend's output.
+    """
+    
+    def __init__(self):
+        self.inventory: List[Dict] = []
+        self.hash_stats: Dict[str, int] = {}
+        self.writer: Optional[InventoryWriter] = None
+    
+    def connect(self) -> bool:
+        """Prepare the backend for use."""
+        return True
+    
+    def disconnect(self):
+        """Release any resources held by the backend."""
+    
+    @abstractmethod
+    def generate_inventory(self, start_path: str = "/", include_hashes: bool = True, **options) -> List[Dict]:
+        """
+        Generate complete inventory with optional hash calculation.
+        
+        Args:
+            start_path: Starting directory path
+            include_hashes: Whether to calculate MD5 hashes
+            **options: Backend-specific options
+            
+        Returns:
+            List of file information dictionaries
+        """
+    
+    def _emit(self, record: Dict):
+        """Pass a finished record to the streaming writer, if one is attached."""
+        if self.writer:
+            self.writer.write(record)
+    
+    def save_to_csv(self, output_file: str = "ftp_inventory.csv"):
+        """Save inventory to CSV file."""
+        if not self.inventory:
+            print("No inventory data to save")
+            return
+        
+        with open_inventory_file(output_file, 'w') as f:
+            writer = csv.DictWriter(f, fieldnames=csv_fieldnames(self.inventory), restval='')
+            writer.writeheader()
+            writer.writerows(self.inventory)
+        
+        print(f"✓ CSV saved to: {output_file}")
+    
+    def save_to_json(self, output_file: str = "ftp_inventory.json"):
+        """Save inventory to JSON file."""
+        if not self.inventory:
+            print("No inventory data to save")
+            return
+        
+        # Written record by record rather than as one json.dump of the whole list
+        with open_inventory_file(output_file, 'w') as f:
+            f.write('{\n')
+            f.write(f'  "generated_at": {json.dumps(datetime.now().isoformat())},\n')
+            f.write(f'  "total_files": {len(self.inventory)},\n')
+            f.write('  "files": [')
+            for i, record in enumerate(self.inventory):
+                f.write(',\n    ' if i else '\n    ')
+                f.write(json.dumps(record))
+            f.write('\n  ]\n}\n')
+        
+        print(f"✓ JSON saved to: {output_file}")
+
+
+# An MD5 digest as it appears in HASH/XMD5 replies (see server_md5)
+MD5_HEX_RE = re.compile(r'\b[0-9a-fA-F]{32}\b')
+
+
+class FTPInventory(Inventory):
     """Safely connect to FTP and generate file inventory with hashes."""
     
-    def __init__(self, host: str, username: str, password: str, port: int = 21, timeout: int = 60):
+    def __init__(self, host: str, username: str, password: str, port: int = 21, timeout: int = 60,
+                 max_sessions: int = DEFAULT_MAX_SESSIONS, block_size: int = DEFAULT_BLOCK_SIZE,
+                 server_hash: bool = True):
         """
         Initialize FTP connection parameters.
         
@@ -29,14 +421,29 @@ class FTPInventory:
             password: FTP password
             port: FTP port (default: 21)
             timeout: Connection timeout in seconds (default: 60)
+            max_sessions: Maximum simultaneous FTP logins to open (default: 4)
+            block_size: Bytes per read while streaming a file into the hash (default: 64 KB)
+            server_hash: Let the server compute MD5s (HASH/XMD5) when it supports it (default: True)
         """
+        super().__init__()
         self.host = host
         self.username = username
         self.password = password
         self.port = port
         self.timeout = timeout
+        self.max_sessions = max(1, max_sessions)
+        self.block_size = block_size
+        self.server_hash = server_hash
         self.ftp = None
-        self.inventory: List[Dict] = []
+        self.features: Dict[str, str] = {}
+        # Server-side MD5 command negotiated at connect time ('HASH', 'XMD5' or None)
+        self.hash_command: Optional[str] = None
+        # How the most recent hash was produced, and the size and duration of its download
+        self.last_method = 'download'
+        self.last_bytes = 0
+        self.last_seconds = 0.0
+        self._journal: Optional[TextIO] = None
+        self._print_lock = threading.Lock()
     
     def connect(self):
         """Establish FTP connection with error handling."""
@@ -46,6 +453,8 @@ class FTPInventory:
             self.ftp.login(self.username, self.password)
             # Enable passive mode for better firewall compatibility
             self.ftp.set_pasv(True)
+            self.features = self.probe_features()
+            self.hash_command = self.negotiate_hash_command() if self.server_hash else None
             print(f"✓ Connected to {self.host}")
             return True
         except ftplib.error_perm as e:
@@ -64,9 +473,95 @@ class FTPInventory:
             except:
                 self.ftp.close()
     
+    def probe_features(self) -> Dict[str, str]:
+        """
+        Ask the server which protocol extensions it supports (FEAT).
+        
+        Returns:
+            Dictionary mapping feature name (e.g. 'MLST', 'MDTM') to its parameters
+        """
+        features = {}
+        try:
+            response = self.ftp.sendcmd('FEAT')
+        except ftplib.Error:
+            return features
+        
+        # First and last lines are "211-Features:" and "211 End"
+        for line in response.splitlines()[1:-1]:
+            name, _, params = line.strip().partition(' ')
+            if name:
+                features[name.upper()] = params
+        return features
+    
+    def negotiate_hash_command(self) -> Optional[str]:
+        """
+        Pick a server-side command that returns MD5 digests, if any.
+        
+        Only MD5-producing commands are used so that hashes stay comparable
+        with download-based inventories. XSHA1/XCRC are ignored for that reason.
+        
+        Returns:
+            'HASH' (with MD5 selected), 'XMD5', or None to download and hash locally
+        """
+        algorithms = [a.strip().rstrip('*').upper() for a in self.features.get('HASH', '').split(';')]
+        if 'MD5' in algorithms:
+            try:
+                self.ftp.sendcmd('OPTS HASH MD5')
+                return 'HASH'
+            except ftplib.Error:
+                pass
+        
+        if 'XMD5' in self.features:
+            return 'XMD5'
+        
+        return None
+    
+    def server_md5(self, filepath: str) -> Optional[str]:
+        """
+        Ask the server for a file's MD5 with the negotiated hash command.
+        
+        Args:
+            filepath: Path to file on FTP server
+            
+        Returns:
+            MD5 hash as lowercase hex string, or None if the server refused
+        """
+        try:
+            response = self.ftp.sendcmd(f'{self.hash_command} {filepath}')
+        except ftplib.error_perm as e:
+            if str(e).startswith(('500', '502', '504')):
+                # Advertised but not implemented; download from now on
+                self.hash_command = None
+            return None
+        
+        # HASH replies "213 MD5 0-1234 <digest> <path>", XMD5 replies "250 <digest>"
+        if self.hash_command == 'HASH' and response[4:].split(' ', 1)[0].upper() != 'MD5':
+            return None
+        match = MD5_HEX_RE.search(response[4:])
+        return match.group().lower() if match else None
+    
+    def spawn_session(self) -> 'FTPInventory':
+        """
+        Create an independent (not yet connected) session with the same settings.
+        
+        Returns:
+            New FTPInventory sharing this instance's credentials
+        """
+        return FTPInventory(self.host, self.username, self.password,
+                            port=self.port, timeout=self.timeout,
+                            max_sessions=self.max_sessions, block_size=self.block_size,
+                            server_hash=self.server_hash)
+    
     def calculate_md5(self, filepath: str, max_retries: int = 3) -> str:
         """
-        Download file from FTP and calculate MD5 hash with retry logic.
+        Calculate a file's MD5 hash with retry logic.
+        
+        Uses the server-side hash command when one was negotiated, falling back
+        to downloading the file when the server can't hash that file. Downloads
+        are fed to the hash block by block as they arrive, so memory use stays
+        at one block regardless of file size. last_method records how the hash
+        was produced; last_bytes/last_seconds record the download for
+        throughput reporting.
         
         Args:
             filepath: Path to file on FTP server
@@ -77,7 +572,12 @@ class FTPInventory:
         """
         for attempt in range(max_retries):
             md5_hash = hashlib.md5()
-            buffer = BytesIO()
+            received = 0
+            
+            def consume(block: bytes):
+                nonlocal received
+                md5_hash.update(block)
+                received += len(block)
             
             try:
                 # Send NOOP to keep connection alive
@@ -88,13 +588,20 @@ class FTPInventory:
                     self.disconnect()
                     self.connect()
                 
-                # Download file to memory with timeout handling
-                self.ftp.retrbinary(f'RETR {filepath}', buffer.write)
-                buffer.seek(0)
+                if self.hash_command:
+                    digest = self.server_md5(filepath)
+                    if digest:
+                        self.last_method = self.hash_command
+                        self.last_bytes = 0
+                        self.last_seconds = 0.0
+                        return digest
                 
-                # Calculate hash in chunks
-                for chunk in iter(lambda: buffer.read(8192), b''):
-                    md5_hash.update(chunk)
+                # Hash the file as it streams in with timeout handling
+                started = time.perf_counter()
+                self.ftp.retrbinary(f'RETR {filepath}', consume, blocksize=self.block_size)
+                self.last_method = 'download'
+                self.last_bytes = received
+                self.last_seconds = time.perf_counter() - started
                 
                 return md5_hash.hexdigest()
             except (ftplib.error_temp, EOFError, TimeoutError, OSError) as e:
@@ -115,65 +622,242 @@ class FTPInventory:
         
         return "ERROR"
     
-    def list_files_recursive(self, path: str = "/") -> List[Dict]:
+    def read_range(self, filepath: str, offset: int, length: int, max_retries: int = 3) -> Optional[bytes]:
         """
-        Recursively list all files in FTP directory.
+        Download part of a file, starting at offset (FTP REST).
+        
+        The data connection is closed as soon as length bytes have arrived, so
+        only that much of the file is transferred. last_bytes/last_seconds
+        record the transfer.
         
         Args:
-            path: Starting path on FTP server
+            filepath: Path to file on FTP server
+            offset: First byte to read
+            length: Number of bytes to read
+            max_retries: Number of retry attempts
             
         Returns:
-            List of file information dictionaries
+            The bytes read (shorter if the file ended first), or None on failure
         """
-        files = []
+        for attempt in range(max_retries):
+            chunks = []
+            remaining = length
+            started = time.perf_counter()
+            try:
+                self.ftp.voidcmd('TYPE I')
+                conn = self.ftp.transfercmd(f'RETR {filepath}', rest=offset or None)
+                try:
+                    while remaining > 0:
+                        block = conn.recv(min(self.block_size, remaining))
+                        if not block:
+                            break
+                        chunks.append(block)
+                        remaining -= len(block)
+                finally:
+                    conn.close()
+                
+                # Hanging up early makes most servers answer 426/451 instead of 226
+                try:
+                    self.ftp.voidresp()
+                except ftplib.Error:
+                    pass
+                
+                data = b''.join(chunks)
+                self.last_bytes = len(data)
+                self.last_seconds = time.perf_counter() - started
+                return data
+            except (ftplib.error_temp, EOFError, TimeoutError, OSError) as e:
+                if attempt < max_retries - 1:
+                    print(f"  Retry {attempt + 1}/{max_retries} (connection issue)")
+                    try:
+                        self.disconnect()
+                        self.connect()
+                    except:
+                        pass
+                else:
+                    print(f"  Warning: Could not read {filepath}: {e}")
+            except Exception as e:
+                print(f"  Warning: Could not read {filepath}: {e}")
+                break
+        
+        return None
+    
+    def sample_md5(self, filepath: str, size: int, sample_size: int = DEFAULT_SAMPLE_SIZE):
+        """
+        Hash the first and last sample_size bytes of a file.
         
+        Files no bigger than two samples are read whole, so their digest is
+        the real MD5.
+        
+        Args:
+            filepath: Path to file on FTP server
+            size: File size from the directory listing
+            sample_size: Bytes to read from each end
+            
+        Returns:
+            (digest, True if the digest covers the whole file) or (None, False) on failure
+        """
+        if size <= 2 * sample_size:
+            data = self.read_range(filepath, 0, size)
+            if data is None:
+                return None, False
+            return hashlib.md5(data).hexdigest(), len(data) == size
+        
+        head = self.read_range(filepath, 0, sample_size)
+        head_bytes = self.last_bytes
+        tail = self.read_range(filepath, size - sample_size, sample_size)
+        if head is None or tail is None:
+            return None, False
+        self.last_bytes += head_bytes
+        return hashlib.md5(head + tail).hexdigest(), False
+    
+    def get_modified(self, filepath: str) -> str:
+        """
+        Get a file's server modification time with MDTM.
+        
+        Args:
+            filepath: Path to file on FTP server
+            
+        Returns:
+            UTC timestamp as YYYYMMDDHHMMSS, or '' if the server can't tell us
+        """
         try:
-            # Change to directory
-            self.ftp.cwd(path)
+            response = self.ftp.sendcmd(f'MDTM {filepath}')
+        except (ftplib.Error, EOFError, OSError):
+            return ''
+        # Response is "213 YYYYMMDDHHMMSS[.sss]"; drop fractional seconds
+        return response[4:].strip().split('.')[0]
+    
+    def list_directory(self, path: str, max_retries: int = 3) -> List[Dict]:
+        """
+        List a single directory with retry logic.
+        
+        Uses MLSD when the server advertises it: one command per directory,
+        machine-readable type/size/modify facts and no change of directory.
+        Otherwise falls back to parsing LIST output.
+        
+        Args:
+            path: Absolute directory path on FTP server
+            max_retries: Number of retry attempts
             
-            # Get directory listing
-            items = []
-            self.ftp.retrlines('LIST', items.append)
+        Returns:
+            Entry dictionaries with name, type ('file' or 'dir'), size,
+            permissions and modified ('' when the listing doesn't say)
             
-            for item in items:
-                # Parse FTP LIST format (Unix-style)
-                parts = item.split(None, 8)
-                if len(parts) < 9:
-                    continue
-                
-                permissions = parts[0]
-                size = parts[4]
-                name = parts[8]
-                
-                # Skip current and parent directory references
-                if name in ['.', '..']:
-                    continue
-                
-                full_path = f"{path}/{name}".replace('//', '/')
+        Raises:
+            ftplib.error_perm: If the directory can't be accessed
+        """
+        for attempt in range(max_retries):
+            try:
+                if 'MLST' in self.features:
+                    try:
+                        facts = ['type', 'size', 'modify', 'perm', 'unix.mode']
+                        entries = [parse_mlsd_facts(name, f) for name, f in self.ftp.mlsd(path, facts)]
+                        return [e for e in entries if e]
+                    except ftplib.error_perm as e:
+                        if not str(e).startswith(('500', '502')):
+                            raise
+                        # Advertised but not implemented; use LIST from now on
+                        self.features.pop('MLST', None)
                 
-                # Check if it's a directory (starts with 'd')
-                if permissions.startswith('d'):
-                    # Recursively process subdirectory
-                    print(f"  Scanning directory: {full_path}")
-                    files.extend(self.list_files_recursive(full_path))
+                # Many servers pass LIST arguments to ls, which breaks on
+                # names with spaces, so change into the (absolute) directory
+                lines = []
+                self.ftp.cwd(path)
+                self.ftp.retrlines('LIST', lines.append)
+                return [e for e in map(parse_list_line, lines) if e]
+            except (ftplib.error_temp, EOFError, TimeoutError, OSError) as e:
+                if attempt < max_retries - 1:
+                    print(f"  Retry {attempt + 1}/{max_retries} listing {path} (connection issue)")
+                    try:
+                        self.disconnect()
+                        self.connect()
+                    except:
+                        pass
+                else:
+                    print(f"  Warning: Could not list {path}: {e}")
+        
+        return []
+    
+    def list_files_recursive(self, path: str = "/", workers: int = 1) -> List[Dict]:
+        """
+        Recursively list all files in FTP directory.
+        
+        Directories are walked breadth-first from a shared queue, so several
+        sessions can list a wide tree at once. The result is assembled in
+        depth-first listing order, the same order a single session gives.
+        
+        Args:
+            path: Starting path on FTP server
+            workers: Number of FTP sessions listing in parallel (default: 1)
+            
+        Returns:
+            List of file information dictionaries
+        """
+        listings: Dict[str, List[Dict]] = {}
+        errors: List[BaseException] = []
+        work: queue.Queue = queue.Queue()
+        work.put(path)
+        
+        def worker(session: 'FTPInventory'):
+            while True:
+                dir_path = work.get()
+                if dir_path is None:
+                    return
+                try:
+                    # After a failure the remaining directories are only drained,
+                    # so work.join() returns and the error can be raised below
+                    if errors:
+                        continue
+                    entries = session.list_directory(dir_path)
+                    for entry in entries:
+                        entry['path'] = f"{dir_path}/{entry['name']}".replace('//', '/')
+                        if entry['type'] == 'dir':
+                            with self._print_lock:
+                                print(f"  Scanning directory: {entry['path']}")
+                            work.put(entry['path'])
+                    listings[dir_path] = entries
+                except ftplib.error_perm as e:
+                    print(f"  Warning: Cannot access {dir_path}: {e}")
+                except Exception as e:
+                    errors.append(e)
+                finally:
+                    work.task_done()
+        
+        sessions = self._open_sessions(workers)
+        threads = [threading.Thread(target=worker, args=(session,), daemon=True) for session in sessions]
+        for thread in threads:
+            thread.start()
+        work.join()
+        for _ in threads:
+            work.put(None)
+        for thread in threads:
+            thread.join()
+        self._close_sessions(sessions)
+        if errors:
+            raise errors[0]
+        
+        files = []
+        
+        def collect(dir_path: str):
+            for entry in listings.get(dir_path, []):
+                if entry['type'] == 'dir':
+                    collect(entry['path'])
                 else:
-                    # It's a file
                     files.append({
-                        'path': full_path,
-                        'name': name,
-                        'size': size,
-                        'permissions': permissions
+                        'path': entry['path'],
+                        'name': entry['name'],
+                        'size': entry['size'],
+                        'permissions': entry['permissions'],
+                        'modified': entry['modified'],
                     })
-            
-            # Return to parent directory
-            self.ftp.cwd('..')
-            
-        except ftplib.error_perm as e:
-            print(f"  Warning: Cannot access {path}: {e}")
         
+        collect(path)
         return files
     
-    def generate_inventory(self, start_path: str = "/", include_hashes: bool = True, reconnect_interval: int = 50):
+    def generate_inventory(self, start_path: str = "/", include_hashes: bool = True, reconnect_interval: int = 50,
+                           workers: int = 1, previous_inventory: Optional[str] = None,
+                           journal: Optional[str] = None, resume: bool = False):
         """
         Generate complete inventory with optional hash calculation.
         
@@ -181,6 +865,11 @@ class FTPInventory:
             start_path: Starting directory path
             include_hashes: Whether to calculate MD5 hashes (slower but recommended)
             reconnect_interval: Reconnect to FTP every N files to prevent timeout (default: 50)
+            workers: Number of FTP sessions hashing in parallel, capped at max_sessions (default: 1)
+            previous_inventory: Earlier inventory file (JSON or CSV); files whose path, size and
+                modification time are unchanged reuse its MD5 instead of being downloaded
+            journal: Checkpoint file; every finished record is appended to it as JSON Lines
+            resume: Continue from an existing journal, skipping files it already completed
         """
         print(f"\n{'='*60}")
         print(f"Starting inventory generation from: {start_path}")
@@ -188,117 +877,490 @@ class FTPInventory:
         
         # Get file list
         print("Phase 1: Scanning directory structure...")
-        files = self.list_files_recursive(start_path)
+        files = self.list_files_recursive(start_path, workers=min(workers, self.max_sessions))
         print(f"✓ Found {len(files)} files\n")
         
         # Calculate hashes if requested
         if include_hashes:
+            previous = {}
+            if previous_inventory:
+                previous = {f['path']: f for f in load_inventory(previous_inventory)}
+                print(f"Incremental mode: loaded {len(previous)} files from {previous_inventory}")
+            
+            pending = files
+            resumed = 0
+            if journal and resume:
+                done = load_journal(journal)
+                pending = []
+                for file_info in files:
+                    record = done.get(file_info['path'])
+                    if record and str(record.get('size')) == str(file_info['size']):
+                        file_info.update({k: v for k, v in record.items() if k not in file_info})
+                        self._emit(file_info)
+                        resumed += 1
+                    else:
+                        pending.append(file_info)
+                print(f"Resuming: {resumed} files already done in {journal}, {len(pending)} to go")
+            
+            workers = max(1, min(workers, self.max_sessions, len(pending)))
             print("Phase 2: Calculating MD5 hashes...")
-            print(f"(Reconnecting every {reconnect_interval} files to prevent timeout)\n")
+            if self.hash_command:
+                print(f"(Server supports {self.hash_command}; files are hashed on the server where possible)")
+            print(f"(Using {workers} FTP session(s), each reconnecting every {reconnect_interval} files)\n")
             
-            error_count = 0
-            for i, file_info in enumerate(files, 1):
-                # Reconnect periodically to prevent timeout
-                if i % reconnect_interval == 0:
-                    print(f"  [Progress: {i}/{len(files)} - Reconnecting...]")
-                    try:
-                        self.disconnect()
-                        self.connect()
-                    except Exception as e:
-                        print(f"  Warning: Reconnection failed: {e}")
-                
-                print(f"  [{i}/{len(files)}] {file_info['path']}")
-                file_info['md5'] = self.calculate_md5(file_info['path'])
-                file_info['timestamp'] = datetime.now().isoformat()
-                
-                if file_info['md5'] == 'ERROR':
-                    error_count += 1
+            if journal:
+                self._journal = open(journal, 'a' if resume else 'w', encoding='utf-8')
+            try:
+                self.hash_stats = self._hash_files(pending, workers, reconnect_interval, previous)
+            finally:
+                if self._journal:
+                    self._journal.close()
+                    self._journal = None
+            self.hash_stats['resumed'] = resumed
             
             print()
-            if error_count > 0:
-                print(f"⚠ Warning: {error_count} files could not be hashed")
-                print(f"  You may want to run the script again to retry these files.\n")
+            if previous:
+                print(f"Reused {self.hash_stats['reused']} unchanged hashes, "
+                      f"rehashed {self.hash_stats['rehashed']} new or changed files")
+            if self.hash_stats['errors'] > 0:
+                print(f"⚠ Warning: {self.hash_stats['errors']} files could not be hashed")
+                if journal:
+                    print(f"  Run again with --resume to retry just these files.\n")
+                else:
+                    print(f"  You may want to run the script again to retry these files.\n")
+        else:
+            for file_info in files:
+                self._emit(file_info)
         
         self.inventory = files
         return files
     
-    def save_to_csv(self, output_file: str = "ftp_inventory.csv"):
-        """Save inventory to CSV file."""
-        if not self.inventory:
-            print("No inventory data to save")
-            return
+    def find_duplicates(self, start_path: str = "/", workers: int = 1,
+                        sample_size: int = DEFAULT_SAMPLE_SIZE) -> List[Dict]:
+        """
+        Find identical files while transferring as little as possible.
         
+        1. Files are grouped by the size from the directory listing; a file
+           with a size nothing else has can't have a duplicate and is never read.
+        2. Same-size files are screened by hashing their first and last
+           sample_size bytes (two short REST transfers each).
+        3. Only files that still match get a full MD5.
+        
+        When the server can hash files itself (HASH/XMD5), step 2 is skipped
+        and same-size files are hashed on the server instead.
+        
+        Args:
+            start_path: Starting directory path
+            workers: Number of FTP sessions reading in parallel, capped at max_sessions
+            sample_size: Bytes read from each end of a file in step 2
+            
+        Returns:
+            Duplicate groups: {'md5', 'size', 'paths'} dictionaries, biggest waste first
+        """
+        print(f"\n{'='*60}")
+        print(f"Finding duplicate files under: {start_path}")
+        print(f"{'='*60}\n")
+        
+        workers = max(1, min(workers, self.max_sessions))
+        print("Phase 1: Scanning directory structure...")
+        files = self.list_files_recursive(start_path, workers=workers)
+        total_bytes = sum(int(f['size']) for f in files)
+        print(f"✓ Found {len(files)} files ({total_bytes:,} bytes)\n")
+        
+        stats = {'files': len(files), 'total_bytes': total_bytes, 'unique_size': 0,
+                 'sampled': 0, 'full': 0, 'server': 0, 'errors': 0, 'bytes': 0}
+        
+        by_size: Dict[int, List[Dict]] = defaultdict(list)
+        for file_info in files:
+            by_size[int(file_info['size'])].append(file_info)
+        
+        candidates = []
+        for size, group in by_size.items():
+            if len(group) < 2:
+                stats['unique_size'] += 1
+            elif size == 0:
+                for file_info in group:
+                    file_info['md5'] = EMPTY_MD5
+            else:
+                candidates.extend(group)
+        print(f"Phase 2: {stats['unique_size']} files have a unique size and are skipped; "
+              f"{len(candidates)} share a size with another file\n")
+        
+        if self.hash_command:
+            print(f"(Server supports {self.hash_command}; hashing same-size files on the server)\n")
+            to_hash = candidates
+        else:
+            def sample(session: 'FTPInventory', file_info: Dict):
+                digest, whole = session.sample_md5(file_info['path'], int(file_info['size']), sample_size)
+                with self._print_lock:
+                    if digest is None:
+                        stats['errors'] += 1
+                        return
+                    stats['sampled'] += 1
+                    stats['bytes'] += session.last_bytes
+                    file_info['sample_md5'] = digest
+                    if whole:
+                        file_info['md5'] = digest
+                        file_info['hash_method'] = 'download'
+            
+            print(f"Screening {len(candidates)} files by their first and last {sample_size:,} bytes...")
+            self._run_sessions(candidates, workers, sample)
+            
+            by_sample: Dict[tuple, List[Dict]] = defaultdict(list)
+            for file_info in candidates:
+                if 'sample_md5' in file_info and 'md5' not in file_info:
+                    by_sample[(file_info['size'], file_info['sample_md5'])].append(file_info)
+            to_hash = [f for group in by_sample.values() if len(group) > 1 for f in group]
+            print(f"✓ {len(to_hash)} files still match another file\n")
+        
+        def full_hash(session: 'FTPInventory', file_info: Dict):
+            digest = session.calculate_md5(file_info['path'])
+            with self._print_lock:
+                if digest == 'ERROR':
+                    stats['errors'] += 1
+                    return
+                file_info['md5'] = digest
+                file_info['hash_method'] = session.last_method
+                if session.last_method == 'download':
+                    stats['full'] += 1
+                    stats['bytes'] += session.last_bytes
+                else:
+                    stats['server'] += 1
+                print(f"  {file_info['path']}")
+        
+        print(f"Phase 3: Full MD5 of {len(to_hash)} files...")
+        self._run_sessions(to_hash, workers, full_hash)
+        
+        by_md5: Dict[tuple, List[str]] = defaultdict(list)
+        for file_info in files:
+            if file_info.get('md5'):
+                by_md5[(file_info['md5'], int(file_info['size']))].append(file_info['path'])
+        
+        groups = [{'md5': md5, 'size': size, 'paths': paths}
+                  for (md5, size), paths in by_md5.items() if len(paths) > 1]
+        groups.sort(key=lambda g: (-g['size'] * (len(g['paths']) - 1), g['paths'][0]))
+        
+        self.inventory = files
+        self.hash_stats = stats
+        
+        wasted = sum(g['size'] * (len(g['paths']) - 1) for g in groups)
+        print(f"\n✓ {len(groups)} groups of identical files, {wasted:,} bytes in extra copies")
+        print(f"✓ Transferred {stats['bytes']:,} of {total_bytes:,} bytes "
+              f"({stats['sampled']} sampled, {stats['full']} downloaded in full, {stats['server']} hashed on server)")
+        if stats['errors']:
+            print(f"⚠ Warning: {stats['errors']} files could not be read; they may hide more duplicates")
+        return groups
+    
+    def save_duplicates_csv(self, groups: List[Dict], output_file: str = "ftp_duplicates.csv"):
+        """
+        Save duplicate groups to CSV, one row per copy.
+        
+        Args:
+            groups: Groups returned by find_duplicates
+            output_file: Output CSV filename
+        """
         with open(output_file, 'w', newline='', encoding='utf-8') as f:
-            if self.inventory:
-                fieldnames = self.inventory[0].keys()
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(self.inventory)
+            writer = csv.writer(f)
+            writer.writerow(['group', 'md5', 'size', 'copies', 'path'])
+            for i, group in enumerate(groups, 1):
+                for path in group['paths']:
+                    writer.writerow([i, group['md5'], group['size'], len(group['paths']), path])
         
-        print(f"✓ CSV saved to: {output_file}")
+        print(f"✓ Duplicate groups saved to: {output_file}")
     
-    def save_to_json(self, output_file: str = "ftp_inventory.json"):
-        """Save inventory to JSON file."""
-        if not self.inventory:
-            print("No inventory data to save")
+    def _run_sessions(self, items: List[Dict], workers: int, task):
+        """
+        Run task(session, item) for every item over a pool of FTP sessions.
+        
+        Args:
+            items: Work items, taken from a shared queue
+            workers: Number of sessions to use (including this one)
+            task: Function called with the session and one item
+        """
+        if not items:
             return
         
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump({
-                'generated_at': datetime.now().isoformat(),
-                'total_files': len(self.inventory),
-                'files': self.inventory
-            }, f, indent=2)
+        sessions = self._open_sessions(max(1, min(workers, len(items))))
+        work: queue.Queue = queue.Queue()
+        for item in items:
+            work.put(item)
         
-        print(f"✓ JSON saved to: {output_file}")
+        def worker(session: 'FTPInventory'):
+            while True:
+                try:
+                    item = work.get_nowait()
+                except queue.Empty:
+                    return
+                task(session, item)
+        
+        if len(sessions) == 1:
+            worker(self)
+        else:
+            threads = [threading.Thread(target=worker, args=(session,), daemon=True) for session in sessions]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self._close_sessions(sessions)
+    
+    def _hash_files(self, files: List[Dict], workers: int, reconnect_interval: int,
+                    previous: Dict[str, Dict]) -> Dict[str, int]:
+        """
+        Hash files over a pool of independent FTP sessions.
+        
+        Worker 0 reuses this instance's connection; every other worker logs in
+        with its own session. Workers pull files from a shared queue and write
+        the result onto that file's own dict, so the inventory keeps the
+        listing order no matter which worker finishes first.
+        
+        A file whose path, size and modification time match its record in
+        previous keeps that record's MD5 and is never downloaded. When the
+        listing has no modification times, MDTM is only asked for files with
+        a same-size record in previous.
+        
+        Args:
+            files: File information dictionaries from the directory scan
+            workers: Number of sessions to use (including this one)
+            reconnect_interval: Reconnect each session every N files it hashes
+            previous: Earlier inventory records keyed by path (may be empty)
+            
+        Returns:
+            Counts of 'reused', 'rehashed', 'server'-hashed and 'errors' files plus 'bytes' downloaded
+        """
+        sessions = self._open_sessions(workers)
+        
+        work: queue.Queue = queue.Queue()
+        for i, file_info in enumerate(files, 1):
+            work.put((i, file_info))
+        
+        total = len(files)
+        stats = {'reused': 0, 'rehashed': 0, 'server': 0, 'errors': 0, 'bytes': 0}
+        started = time.perf_counter()
+        
+        def worker(session: 'FTPInventory'):
+            processed = 0
+            while True:
+                try:
+                    i, file_info = work.get_nowait()
+                except queue.Empty:
+                    return
+                
+                processed += 1
+                # Reconnect periodically to prevent timeout
+                if processed % reconnect_interval == 0:
+                    with self._print_lock:
+                        print(f"  [Progress: {i}/{total} - Reconnecting...]")
+                    try:
+                        session.disconnect()
+                        session.connect()
+                    except Exception as e:
+                        print(f"  Warning: Reconnection failed: {e}")
+                
+                # A listing without times (the LIST fallback) costs an MDTM
+                # round trip per file, so only ask when a same-size record
+                # could be reused
+                old = previous.get(file_info['path'])
+                if old and not file_info.get('modified') and str(old.get('size')) == str(file_info['size']):
+                    file_info['modified'] = session.get_modified(file_info['path'])
+                
+                if is_unchanged(old, file_info):
+                    file_info['md5'] = old['md5']
+                    file_info['hash_method'] = old.get('hash_method') or 'download'
+                    file_info['timestamp'] = old.get('timestamp') or datetime.now().isoformat()
+                    with self._print_lock:
+                        stats['reused'] += 1
+                        print(f"  [{i}/{total}] {file_info['path']} (unchanged)")
+                        self._checkpoint(file_info)
+                    continue
+                
+                file_info['md5'] = session.calculate_md5(file_info['path'])
+                file_info['hash_method'] = session.last_method
+                file_info['timestamp'] = datetime.now().isoformat()
+                
+                with self._print_lock:
+                    if file_info['md5'] == 'ERROR':
+                        stats['errors'] += 1
+                        print(f"  [{i}/{total}] {file_info['path']}")
+                    else:
+                        stats['rehashed'] += 1
+                        if session.last_method == 'download':
+                            stats['bytes'] += session.last_bytes
+                            detail = format_rate(session.last_bytes, session.last_seconds)
+                        else:
+                            stats['server'] += 1
+                            detail = f"server {session.last_method}"
+                        print(f"  [{i}/{total}] {file_info['path']} ({detail})")
+                    self._checkpoint(file_info)
+        
+        if len(sessions) == 1:
+            worker(self)
+        else:
+            threads = [threading.Thread(target=worker, args=(session,), daemon=True) for session in sessions]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self._close_sessions(sessions)
+        
+        elapsed = time.perf_counter() - started
+        print(f"\n✓ Downloaded and hashed {stats['bytes']:,} bytes in {elapsed:.1f}s ({format_rate(stats['bytes'], elapsed)})")
+        if stats['server']:
+            print(f"✓ {stats['server']} files hashed on the server without downloading")
+        return stats
+    
+    def _open_sessions(self, workers: int) -> List['FTPInventory']:
+        """
+        Open up to workers sessions: this one plus newly logged-in extras.
+        
+        Args:
+            workers: Total number of sessions wanted
+            
+        Returns:
+            Connected sessions, starting with this instance
+        """
+        sessions = [self]
+        for _ in range(workers - 1):
+            session = self.spawn_session()
+            if session.connect():
+                sessions.append(session)
+            else:
+                print("  Warning: Could not open extra FTP session, continuing with fewer workers")
+                break
+        return sessions
+    
+    def _close_sessions(self, sessions: List['FTPInventory']):
+        """Disconnect the extra sessions; this instance's connection stays open."""
+        for session in sessions[1:]:
+            session.disconnect()
+    
+    def _checkpoint(self, file_info: Dict):
+        """Append a finished record to the journal and output stream (caller holds the print lock)."""
+        if self._journal:
+            self._journal.write(json.dumps(file_info) + '\n')
+            self._journal.flush()
+        self._emit(file_info)
+
+
+def parse_args():
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description="Generate an FTP file inventory with MD5 hashes.")
+    parser.add_argument('start_path', nargs='?',
+                        help="Starting directory path (prompted for if omitted)")
+    parser.add_argument('--local', metavar='MIRROR_ROOT',
+                        help="Inventory a local mirror of the site (MIRROR_ROOT = the FTP root) instead of FTP")
+    parser.add_argument('--workers', type=int,
+                        help="Number of parallel FTP sessions (default: FTP_WORKERS or 1), "
+                             "or hashing processes with --local (default: one per CPU)")
+    parser.add_argument('--max-sessions', type=int,
+                        default=int(os.getenv('FTP_MAX_SESSIONS', str(DEFAULT_MAX_SESSIONS))),
+                        help=f"Host's limit on simultaneous logins (default: {DEFAULT_MAX_SESSIONS})")
+    parser.add_argument('--block-size', type=int, default=DEFAULT_BLOCK_SIZE,
+                        help=f"Bytes per read while hashing (default: {DEFAULT_BLOCK_SIZE})")
+    parser.add_argument('--no-server-hash', dest='server_hash', action='store_false',
+                        help="Always download files instead of using the server's HASH/XMD5 command")
+    parser.add_argument('--stream', action='store_true',
+                        help="Write CSV and JSON Lines record by record while scanning instead of at the end")
+    parser.add_argument('--compress', action='store_true',
+                        help="gzip the streamed output files (.csv.gz, .jsonl.gz)")
+    parser.add_argument('--incremental', metavar='PREVIOUS_INVENTORY',
+                        help="Reuse MD5s from an earlier inventory (JSON or CSV) for unchanged files")
+    parser.add_argument('--journal', default=DEFAULT_JOURNAL,
+                        help=f"Checkpoint file written while hashing (default: {DEFAULT_JOURNAL})")
+    parser.add_argument('--resume', action='store_true',
+                        help="Continue an interrupted run from its journal; files that failed are retried")
+    parser.add_argument('--duplicates', action='store_true',
+                        help="Only find duplicate files, reading as little as possible (FTP only)")
+    parser.add_argument('--sample-size', type=int, default=DEFAULT_SAMPLE_SIZE,
+                        help=f"Bytes read from each end of same-size files with --duplicates "
+                             f"(default: {DEFAULT_SAMPLE_SIZE})")
+    return parser.parse_args()
 
 
 def main():
     """Main execution function with safe credential handling."""
+    args = parse_args()
     
-    # Get credentials from environment variables (recommended)
-    # Set these in your shell: export FTP_HOST=ftp.example.com
-    host = os.getenv('FTP_HOST', '')
-    username = os.getenv('FTP_USER', '')
-    password = os.getenv('FTP_PASS', '')
-    
-    # If not in environment, prompt user
-    if not all([host, username, password]):
-        print("FTP Credentials not found in environment variables.")
-        print("Please enter credentials (or press Ctrl+C to cancel):\n")
-        host = input("FTP Host: ").strip()
-        username = input("Username: ").strip()
-        password = input("Password: ").strip()  # Note: visible on screen
-    
-    if not all([host, username, password]):
-        print("✗ Missing required credentials")
+    if args.local and args.duplicates:
+        print("✗ --duplicates works on an FTP server; use analyze_media_folder.py on a local inventory")
         return
     
+    if args.local:
+        # Imported here because local_inventory builds on this module
+        from local_inventory import LocalInventory
+        inventory = LocalInventory(args.local)
+        options = {}
+    else:
+        # Get credentials from environment variables (recommended)
+        # Set these in your shell: export FTP_HOST=ftp.example.com
+        host = os.getenv('FTP_HOST', '')
+        username = os.getenv('FTP_USER', '')
+        password = os.getenv('FTP_PASS', '')
+        
+        # If not in environment, prompt user
+        if not all([host, username, password]):
+            print("FTP Credentials not found in environment variables.")
+            print("Please enter credentials (or press Ctrl+C to cancel):\n")
+            host = input("FTP Host: ").strip()
+            username = input("Username: ").strip()
+            password = input("Password: ").strip()  # Note: visible on screen
+        
+        if not all([host, username, password]):
+            print("✗ Missing required credentials")
+            return
+        
+        # Create inventory instance
+        inventory = FTPInventory(host, username, password, max_sessions=args.max_sessions,
+                                 block_size=args.block_size, server_hash=args.server_hash)
+        options = {'journal': args.journal, 'resume': args.resume}
+        args.workers = args.workers or int(os.getenv('FTP_WORKERS', '1'))
+    
     # Optional: specify starting directory
-    start_path = input("Starting directory path (default '/', e.g., '/uploaded-files/cropped-images'): ").strip() or "/"
+    start_path = args.start_path or input("Starting directory path (default '/', e.g., '/uploaded-files/cropped-images'): ").strip() or "/"
     
-    # Create inventory instance
-    inventory = FTPInventory(host, username, password)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     
     try:
-        # Connect to FTP
+        # Connect to FTP (or check the local mirror)
         if not inventory.connect():
             return
         
+        if args.duplicates:
+            groups = inventory.find_duplicates(start_path, workers=args.workers, sample_size=args.sample_size)
+            inventory.save_duplicates_csv(groups, f"ftp_duplicates_{timestamp}.csv")
+            return
+        
+        if args.stream:
+            suffix = '.gz' if args.compress else ''
+            inventory.writer = InventoryWriter(csv_file=f"ftp_inventory_{timestamp}.csv{suffix}",
+                                               jsonl_file=f"ftp_inventory_{timestamp}.jsonl{suffix}")
+        
         # Generate inventory with hashes
-        inventory.generate_inventory(start_path=start_path, include_hashes=True)
+        inventory.generate_inventory(start_path=start_path, include_hashes=True, workers=args.workers,
+                                     previous_inventory=args.incremental, **options)
+        
+        # Save results (streamed runs have already written theirs)
+        if not inventory.writer:
+            inventory.save_to_csv(f"ftp_inventory_{timestamp}.csv")
+            inventory.save_to_json(f"ftp_inventory_{timestamp}.json")
         
-        # Save results
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        inventory.save_to_csv(f"ftp_inventory_{timestamp}.csv")
-        inventory.save_to_json(f"ftp_inventory_{timestamp}.json")
+        # The journal is only needed until every file is hashed and saved
+        if not args.local and os.path.exists(args.journal) and not inventory.hash_stats.get('errors'):
+            os.remove(args.journal)
         
         print(f"\n{'='*60}")
         print(f"✓ Inventory complete! Total files: {len(inventory.inventory)}")
+        if args.resume:
+            print(f"  Resumed from journal: {inventory.hash_stats.get('resumed', 0)}")
+        if args.incremental:
+            print(f"  Reused: {inventory.hash_stats.get('reused', 0)}  "
+                  f"Rehashed: {inventory.hash_stats.get('rehashed', 0)}")
         print(f"{'='*60}\n")
         
     finally:
-        # Always disconnect
+        # Always finish streamed files (a gzip stream needs its trailer to be
+        # readable, even after an error or Ctrl-C) and disconnect
+        if inventory.writer:
+            inventory.writer.close()
         inventory.disconnect()
 
 
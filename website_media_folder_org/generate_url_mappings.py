@@ -6,10 +6,104 @@ Compares before/after FTP inventories to generate URL redirect mappings.
 
 import json
 import csv
+from collections import defaultdict
 from pathlib import Path
 from typing import Dict, List, Tuple
 from datetime import datetime
 import os
+import re
+from urllib.parse import quote
+
+from ftp_inventory import iter_inventory, open_inventory_file
+
+
+# Characters Apache's int:escape map leaves alone; RewriteMap keys are
+# percent-encoded the same way so the escaped request path finds them
+URL_SAFE_CHARS = "/:@&=+$,-_.!~*'()"
+
+# Above this many candidate pairs in one duplicate group, pair by sorted
+# path order instead of scoring every pair, to keep matching linear
+MAX_SCORED_PAIRS = 10_000
+
+# Above this many redirects, main() suggests lookup maps over per-file rules
+MAP_THRESHOLD = 100
+
+
+def url_quote(path: str) -> str:
+    """Percent-encode a path for use in a redirect target or RewriteMap key."""
+    return quote(path, safe=URL_SAFE_CHARS)
+
+
+def nginx_quote(value: str) -> str:
+    """Quote a string for an nginx config file."""
+    return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def apache_pattern(path: str) -> str:
+    """Build a quoted, anchored RewriteRule pattern that matches exactly this path."""
+    return '"^' + re.escape(path).replace('"', '\\"') + '$"'
+
+
+def path_similarity(old_path: str, new_path: str) -> Tuple[int, int, int]:
+    """
+    Score how alike two file paths are, for pairing duplicate copies.
+    
+    Args:
+        old_path: Path before reorganization
+        new_path: Path after reorganization
+        
+    Returns:
+        (same filename, shared directory names, shared leading directories);
+        compare tuples, higher is more alike
+    """
+    old_dirs, _, old_name = old_path.rpartition('/')
+    new_dirs, _, new_name = new_path.rpartition('/')
+    old_parts = old_dirs.split('/')
+    new_parts = new_dirs.split('/')
+    
+    prefix = 0
+    for a, b in zip(old_parts, new_parts):
+        if a != b:
+            break
+        prefix += 1
+    
+    return (int(old_name == new_name), len(set(old_parts) & set(new_parts)), prefix)
+
+
+class InventoryIndex:
+    """
+    Inventory indexed both ways: MD5 to every path with that content, and path to record.
+    
+    Unlike a plain MD5 -> record dict, every copy of duplicated content is kept.
+    """
+    
+    def __init__(self):
+        self.by_md5: Dict[str, List[str]] = defaultdict(list)
+        self.by_path: Dict[str, Dict] = {}
+    
+    def add(self, file_info: Dict):
+        """Index one inventory record (records without a usable hash are skipped)."""
+        md5 = file_info.get('md5')
+        path = file_info.get('path')
+        if not md5 or md5 == 'ERROR' or not path:
+            return
+        
+        old = self.by_path.get(path)
+        if old:
+            # Listed twice; keep the latest record only
+            self.by_md5[old['md5']].remove(path)
+        self.by_path[path] = file_info
+        self.by_md5[md5].append(path)
+    
+    def __len__(self) -> int:
+        return len(self.by_path)
+    
+    def __contains__(self, path: str) -> bool:
+        return path in self.by_path
+    
+    def paths(self, md5: str) -> List[str]:
+        """All paths holding content with this MD5 (empty if none)."""
+        return self.by_md5.get(md5, [])
 
 
 class URLMappingGenerator:
@@ -23,52 +117,85 @@ class URLMappingGenerator:
             base_url: Base URL for the website (e.g., 'https://example.com')
         """
         self.base_url = base_url.rstrip('/')
-        self.before_inventory: Dict[str, Dict] = {}
-        self.after_inventory: Dict[str, Dict] = {}
+        self.before_inventory = InventoryIndex()
+        self.after_inventory = InventoryIndex()
         self.mappings: List[Dict] = []
+        self.ambiguous_groups: List[Dict] = []
+        self.deleted_paths: List[str] = []
     
-    def load_inventory_json(self, filepath: str) -> Dict[str, Dict]:
+    def load_inventory_json(self, filepath: str) -> InventoryIndex:
         """
-        Load inventory from JSON file and index by MD5 hash.
+        Load inventory from JSON file and index by MD5 hash and path.
         
         Args:
             filepath: Path to JSON inventory file
             
         Returns:
-            Dictionary mapping MD5 hash to file info
+            InventoryIndex of the file's records
         """
-        with open(filepath, 'r', encoding='utf-8') as f:
+        with open_inventory_file(filepath) as f:
             data = json.load(f)
         
-        inventory = {}
+        inventory = InventoryIndex()
         for file_info in data.get('files', []):
-            md5 = file_info.get('md5')
-            if md5 and md5 != 'ERROR':
-                inventory[md5] = file_info
+            inventory.add(file_info)
         
         return inventory
     
-    def load_inventory_csv(self, filepath: str) -> Dict[str, Dict]:
+    def load_inventory_csv(self, filepath: str) -> InventoryIndex:
         """
-        Load inventory from CSV file and index by MD5 hash.
+        Load inventory from CSV file and index by MD5 hash and path.
         
         Args:
             filepath: Path to CSV inventory file
             
         Returns:
-            Dictionary mapping MD5 hash to file info
+            InventoryIndex of the file's records
         """
-        inventory = {}
+        inventory = InventoryIndex()
         
-        with open(filepath, 'r', encoding='utf-8') as f:
+        with open_inventory_file(filepath) as f:
             reader = csv.DictReader(f)
             for row in reader:
-                md5 = row.get('md5')
-                if md5 and md5 != 'ERROR':
-                    inventory[md5] = row
+                inventory.add(row)
         
         return inventory
     
+    def load_inventory_jsonl(self, filepath: str) -> InventoryIndex:
+        """
+        Load inventory from JSON Lines file (one record per line) and index by MD5 hash and path.
+        
+        Args:
+            filepath: Path to JSON Lines inventory file (e.g. from ftp_inventory.py --stream)
+            
+        Returns:
+            InventoryIndex of the file's records
+        """
+        inventory = InventoryIndex()
+        
+        # iter_inventory skips a half-written last line from a run still in progress
+        for file_info in iter_inventory(filepath):
+            inventory.add(file_info)
+        
+        return inventory
+    
+    def load_inventory(self, filepath: str) -> InventoryIndex:
+        """
+        Load inventory in whichever format the file name indicates.
+        
+        Args:
+            filepath: Path to JSON, JSON Lines or CSV inventory (optionally .gz)
+            
+        Returns:
+            InventoryIndex of the file's records
+        """
+        name = filepath[:-3] if filepath.endswith('.gz') else filepath
+        if name.endswith('.jsonl'):
+            return self.load_inventory_jsonl(filepath)
+        if name.endswith('.json'):
+            return self.load_inventory_json(filepath)
+        return self.load_inventory_csv(filepath)
+    
     def generate_mappings(self, before_file: str, after_file: str):
         """
         Generate URL mappings by comparing before and after inventories.
@@ -82,68 +209,160 @@ class URLMappingGenerator:
         print(f"{'='*70}\n")
         
         # Determine file format and load inventories
-        if before_file.endswith('.json'):
-            self.before_inventory = self.load_inventory_json(before_file)
-        else:
-            self.before_inventory = self.load_inventory_csv(before_file)
-        
-        if after_file.endswith('.json'):
-            self.after_inventory = self.load_inventory_json(after_file)
-        else:
-            self.after_inventory = self.load_inventory_csv(after_file)
+        self.before_inventory = self.load_inventory(before_file)
+        self.after_inventory = self.load_inventory(after_file)
         
         print(f"✓ Loaded BEFORE inventory: {len(self.before_inventory)} files")
         print(f"✓ Loaded AFTER inventory: {len(self.after_inventory)} files\n")
         
-        # Find moved/renamed files
-        moved_count = 0
-        unchanged_count = 0
-        new_count = 0
-        deleted_count = 0
-        
-        # Track which MD5s we've seen in the after inventory
-        after_md5s = set(self.after_inventory.keys())
-        before_md5s = set(self.before_inventory.keys())
-        
-        # Find moved files (same MD5, different path)
-        for md5 in before_md5s:
-            before_path = self.before_inventory[md5]['path']
+        counts = {'moved': 0, 'merged': 0, 'unchanged': 0, 'new': 0, 'deleted': 0}
+        self.mappings = []
+        self.ambiguous_groups = []
+        self.deleted_paths = []
+        
+        for md5, before_paths in self.before_inventory.by_md5.items():
+            after_paths = self.after_inventory.paths(md5)
+            if not before_paths:
+                continue
+            if not after_paths:
+                # Content no longer exists anywhere
+                counts['deleted'] += len(before_paths)
+                self.deleted_paths.extend(p for p in before_paths if p not in self.after_inventory)
+                continue
             
-            if md5 in after_md5s:
-                after_path = self.after_inventory[md5]['path']
-                
-                if before_path != after_path:
-                    # File was moved/renamed
-                    self.mappings.append({
-                        'old_path': before_path,
-                        'new_path': after_path,
-                        'old_url': self._path_to_url(before_path),
-                        'new_url': self._path_to_url(after_path),
-                        'md5': md5,
-                        'filename': self.after_inventory[md5]['name'],
-                        'size': self.after_inventory[md5]['size'],
-                        'status': 'moved'
-                    })
-                    moved_count += 1
-                else:
-                    # File unchanged
-                    unchanged_count += 1
-            else:
-                # File was deleted
-                deleted_count += 1
-        
-        # Count new files (in after but not in before)
-        new_count = len(after_md5s - before_md5s)
+            pairs, merged, new_copies = self._match_group(before_paths, after_paths)
+            counts['unchanged'] += len(before_paths) - len(pairs) - len(merged)
+            counts['new'] += len(new_copies)
+            
+            for old_path, new_path in pairs:
+                self.mappings.append(self._mapping(old_path, new_path, md5, 'moved'))
+                counts['moved'] += 1
+            for old_path, new_path in merged:
+                self.mappings.append(self._mapping(old_path, new_path, md5, 'merged'))
+                counts['merged'] += 1
+        
+        # Content that didn't exist before at all
+        for md5, after_paths in self.after_inventory.by_md5.items():
+            if not self.before_inventory.paths(md5):
+                counts['new'] += len(after_paths)
+        
+        self.mappings.sort(key=lambda m: m['old_path'])
+        moved_count = counts['moved']
+        unchanged_count = counts['unchanged']
+        new_count = counts['new']
+        deleted_count = counts['deleted']
         
         print(f"Analysis Results:")
         print(f"  Moved/Renamed: {moved_count}")
+        print(f"  Merged copies: {counts['merged']} (duplicates redirected to a surviving copy)")
         print(f"  Unchanged:     {unchanged_count}")
         print(f"  New files:     {new_count}")
         print(f"  Deleted:       {deleted_count}")
+        if self.ambiguous_groups:
+            print(f"\n⚠ {len(self.ambiguous_groups)} duplicate groups had several possible pairings;")
+            print(f"  best guesses were used - review 'ambiguous_groups' in the JSON output")
         print(f"\n{'='*70}\n")
         
         return self.mappings
     
+    def _match_group(self, before_paths: List[str], after_paths: List[str]):
+        """
+        Pair old and new locations of one piece of content.
+        
+        Paths present on both sides are unchanged and paired with themselves.
+        The rest are paired one-to-one, preferring the same filename and then
+        the most similar directories. Extra old copies (the content was
+        de-duplicated) are redirected to their most similar surviving copy.
+        Groups where filenames alone didn't settle the pairing are recorded
+        in ambiguous_groups.
+        
+        Args:
+            before_paths: Paths with this content before reorganization
+            after_paths: Paths with this content after reorganization
+            
+        Returns:
+            (moved pairs, merged pairs, new copies) where pairs are (old_path, new_path)
+        """
+        after_set = set(after_paths)
+        before_set = set(before_paths)
+        old_left = sorted(p for p in before_paths if p not in after_set)
+        new_left = sorted(p for p in after_paths if p not in before_set)
+        
+        # Similarity scoring is only worth its cost on small groups
+        scored = len(old_left) * len(after_paths) <= MAX_SCORED_PAIRS
+        
+        pairs = []
+        if old_left and new_left:
+            # Exact filename matches first
+            new_by_name: Dict[str, List[str]] = defaultdict(list)
+            for path in new_left:
+                new_by_name[path.rpartition('/')[2]].append(path)
+            unmatched = []
+            guessed = False
+            for old_path in old_left:
+                candidates = new_by_name.get(old_path.rpartition('/')[2])
+                if candidates:
+                    guessed = guessed or len(candidates) > 1
+                    best = max(candidates, key=lambda p: path_similarity(old_path, p)) if scored else candidates[0]
+                    candidates.remove(best)
+                    pairs.append((old_path, best))
+                else:
+                    unmatched.append(old_path)
+            
+            taken = {new_path for _, new_path in pairs}
+            remaining = [p for p in new_left if p not in taken]
+            
+            # Then by directory similarity (or plain sorted order for huge groups)
+            if unmatched and remaining:
+                guessed = guessed or (len(unmatched) > 1 and len(remaining) > 1)
+                if scored:
+                    # Best score first; ties keep sorted path order (stable sort)
+                    candidates = [(path_similarity(o, n), o, n) for o in unmatched for n in remaining]
+                    candidates.sort(key=lambda t: t[0], reverse=True)
+                    used_old, used_new = set(), set()
+                    for _, old_path, new_path in candidates:
+                        if old_path not in used_old and new_path not in used_new:
+                            used_old.add(old_path)
+                            used_new.add(new_path)
+                            pairs.append((old_path, new_path))
+                else:
+                    pairs.extend(zip(unmatched, remaining))
+            
+            if guessed:
+                self.ambiguous_groups.append({
+                    'md5': self.before_inventory.by_path[old_left[0]]['md5'],
+                    'old_paths': old_left,
+                    'new_paths': new_left,
+                    'chosen': [{'old_path': o, 'new_path': n} for o, n in sorted(pairs)],
+                })
+        
+        paired_old = {old_path for old_path, _ in pairs}
+        paired_new = {new_path for _, new_path in pairs}
+        
+        merged = []
+        survivors = sorted(after_paths)
+        for old_path in old_left:
+            if old_path not in paired_old:
+                target = max(survivors, key=lambda p: path_similarity(old_path, p)) if scored else survivors[0]
+                merged.append((old_path, target))
+        
+        new_copies = [p for p in new_left if p not in paired_new]
+        return pairs, merged, new_copies
+    
+    def _mapping(self, old_path: str, new_path: str, md5: str, status: str) -> Dict:
+        """Build one mapping record."""
+        new_info = self.after_inventory.by_path[new_path]
+        return {
+            'old_path': old_path,
+            'new_path': new_path,
+            'old_url': self._path_to_url(old_path),
+            'new_url': self._path_to_url(new_path),
+            'md5': md5,
+            'filename': new_info['name'],
+            'size': new_info['size'],
+            'status': status
+        }
+    
     def _path_to_url(self, path: str) -> str:
         """
         Convert FTP path to URL.
@@ -184,7 +403,8 @@ class URLMappingGenerator:
             'generated_at': datetime.now().isoformat(),
             'total_mappings': len(self.mappings),
             'base_url': self.base_url,
-            'mappings': self.mappings
+            'mappings': self.mappings,
+            'ambiguous_groups': self.ambiguous_groups
         }
         
         with open(output_file, 'w', encoding='utf-8') as f:
@@ -211,9 +431,9 @@ class URLMappingGenerator:
             
             for mapping in self.mappings:
                 old_path = mapping['old_path'].lstrip('/')
-                new_path = mapping['new_path'].lstrip('/')
+                new_path = url_quote(mapping['new_path'])
                 f.write(f"# {mapping['filename']}\n")
-                f.write(f"RewriteRule ^{old_path}$ /{new_path} [R=301,L]\n\n")
+                f.write(f"RewriteRule {apache_pattern(old_path)} \"{new_path}\" [R=301,L,NE]\n\n")
         
         print(f"✓ Apache redirects saved to: {output_file}")
     
@@ -234,8 +454,8 @@ class URLMappingGenerator:
             f.write(f"# Total redirects: {len(self.mappings)}\n\n")
             
             for mapping in self.mappings:
-                old_path = mapping['old_path']
-                new_path = mapping['new_path']
+                old_path = nginx_quote(mapping['old_path'])
+                new_path = nginx_quote(url_quote(mapping['new_path']))
                 f.write(f"# {mapping['filename']}\n")
                 f.write(f"location = {old_path} {{\n")
                 f.write(f"    return 301 {new_path};\n")
@@ -243,6 +463,102 @@ class URLMappingGenerator:
         
         print(f"✓ Nginx redirects saved to: {output_file}")
     
+    def save_nginx_map(self, output_file: str = "redirects.nginx.map.conf"):
+        """
+        Generate one Nginx map of old path -> new path.
+        
+        Nginx builds a hash table from the map, so each request costs one
+        lookup however many files moved (unlike one location block per file).
+        Include the file in the http block and add the check shown in its
+        header to the server block.
+        
+        Args:
+            output_file: Output filename for the map
+        """
+        if not self.mappings:
+            print("No mappings to save (no files were moved)")
+            return
+        
+        # Nginx sizes its hash table from these; the defaults are too small for big maps
+        max_key = max(len(m['old_path'].encode('utf-8')) for m in self.mappings)
+        bucket_size = 64
+        while bucket_size < max_key + 32:
+            bucket_size *= 2
+        
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write("# Generated URL Redirects (lookup map)\n")
+            f.write(f"# Generated: {datetime.now().isoformat()}\n")
+            f.write(f"# Total redirects: {len(self.mappings)}\n")
+            f.write("#\n")
+            f.write("# Include this file inside the http { } block, then add to the server { } block:\n")
+            f.write("#\n")
+            f.write("#     if ($redirect_target) {\n")
+            f.write("#         return 301 $redirect_target;\n")
+            f.write("#     }\n\n")
+            f.write(f"map_hash_max_size {max(2048, len(self.mappings) * 2)};\n")
+            f.write(f"map_hash_bucket_size {bucket_size};\n\n")
+            f.write("map $uri $redirect_target {\n")
+            f.write('    default "";\n')
+            
+            for mapping in self.mappings:
+                old_path = nginx_quote(mapping['old_path'])
+                new_path = nginx_quote(url_quote(mapping['new_path']))
+                f.write(f"    {old_path} {new_path};\n")
+            
+            f.write("}\n")
+        
+        print(f"✓ Nginx redirect map saved to: {output_file}")
+    
+    def save_apache_rewritemap(self, map_file: str = "redirects.map.txt",
+                               config_file: str = "redirects.rewritemap.conf"):
+        """
+        Generate an Apache RewriteMap lookup file and the rules that use it.
+        
+        The map is a plain text "old new" file, sorted and ready for
+        httxt2dbm. As a dbm map each request costs one lookup however many
+        files moved (unlike one RewriteRule regex per file). Keys are
+        percent-encoded, and the rules escape the request path with the
+        built-in int:escape map before looking it up.
+        
+        RewriteMap can't be declared in .htaccess, so the rules go in the
+        server or virtual host config.
+        
+        Args:
+            map_file: Output filename for the lookup map
+            config_file: Output filename for the Apache config snippet
+        """
+        if not self.mappings:
+            print("No mappings to save (no files were moved)")
+            return
+        
+        with open(map_file, 'w', encoding='utf-8') as f:
+            f.write("# Generated URL Redirects (RewriteMap txt: old_path new_path)\n")
+            f.write(f"# Generated: {datetime.now().isoformat()}\n")
+            f.write(f"# Total redirects: {len(self.mappings)}\n")
+            
+            for mapping in sorted(self.mappings, key=lambda m: url_quote(m['old_path'])):
+                f.write(f"{url_quote(mapping['old_path'])} {url_quote(mapping['new_path'])}\n")
+        
+        map_path = os.path.abspath(map_file)
+        dbm_path = os.path.splitext(map_path)[0] + '.dbm'
+        
+        with open(config_file, 'w', encoding='utf-8') as f:
+            f.write("# Generated URL Redirects (RewriteMap rules)\n")
+            f.write(f"# Generated: {datetime.now().isoformat()}\n")
+            f.write(f"# Total redirects: {len(self.mappings)}\n")
+            f.write("#\n")
+            f.write("# Add to the server or <VirtualHost> config (not .htaccess).\n")
+            f.write("# For large maps convert to dbm and use the dbm line instead:\n")
+            f.write(f"#     httxt2dbm -i {map_path} -o {dbm_path}\n\n")
+            f.write("RewriteEngine On\n")
+            f.write(f'RewriteMap redirects "txt:{map_path}"\n')
+            f.write(f'# RewriteMap redirects "dbm:{dbm_path}"\n')
+            f.write("RewriteMap escape int:escape\n\n")
+            f.write('RewriteCond "${redirects:${escape:%{REQUEST_URI}}}" "!^$"\n')
+            f.write('RewriteRule "^" "${redirects:${escape:%{REQUEST_URI}}}" [R=301,L,NE]\n')
+        
+        print(f"✓ Apache RewriteMap saved to: {map_file} (rules: {config_file})")
+    
     def print_summary(self):
         """Print a summary of mappings to console."""
         if not self.mappings:
@@ -274,8 +590,8 @@ def main():
     print("\nYou need two inventory files: BEFORE and AFTER the reorganization")
     print("These should be from the same directory (e.g., /uploaded-files/cropped-images)\n")
     
-    before_file = input("BEFORE inventory file (JSON or CSV): ").strip()
-    after_file = input("AFTER inventory file (JSON or CSV): ").strip()
+    before_file = input("BEFORE inventory file (JSON, JSON Lines or CSV): ").strip()
+    after_file = input("AFTER inventory file (JSON, JSON Lines or CSV): ").strip()
     
     if not (Path(before_file).exists() and Path(after_file).exists()):
         print("✗ One or both inventory files not found")
@@ -296,8 +612,21 @@ def main():
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     generator.save_csv(f"url_mappings_{timestamp}.csv")
     generator.save_json(f"url_mappings_{timestamp}.json")
-    generator.save_htaccess(f"redirects_{timestamp}.htaccess")
-    generator.save_nginx(f"redirects_{timestamp}.nginx.conf")
+    
+    # Lookup maps keep per-request cost flat; per-file rules are fine for a handful
+    use_maps = len(mappings) > MAP_THRESHOLD
+    answer = input(f"\nWrite redirects as lookup maps instead of per-file rules? "
+                   f"({'Y/n' if use_maps else 'y/N'}): ").strip().lower()
+    if answer:
+        use_maps = answer.startswith('y')
+    
+    if use_maps:
+        generator.save_nginx_map(f"redirects_{timestamp}.nginx.map.conf")
+        generator.save_apache_rewritemap(f"redirects_{timestamp}.map.txt",
+                                         f"redirects_{timestamp}.rewritemap.conf")
+    else:
+        generator.save_htaccess(f"redirects_{timestamp}.htaccess")
+        generator.save_nginx(f"redirects_{timestamp}.nginx.conf")
     
     # Print summary
     generator.print_summary()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Local Mirror Inventory Backend
+Generates the same inventory records as ftp_inventory.py from a local copy of
+the site (an rsync mirror or unpacked backup), hashing files on local disk.
+"""
+
+import hashlib
+import os
+import stat
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import List, Dict, Optional
+
+from ftp_inventory import Inventory, load_inventory, is_unchanged
+
+
+# Large sequential reads keep the disk streaming instead of seeking
+LOCAL_BLOCK_SIZE = 1024 * 1024
+
+
+def md5_local_file(filepath: str, block_size: int = LOCAL_BLOCK_SIZE) -> str:
+    """
+    Calculate the MD5 hash of a local file.
+    
+    Reads into one reusable buffer, so memory use stays at one block
+    regardless of file size. Runs in worker processes, so it must stay
+    a module-level function.
+    
+    Args:
+        filepath: Path to file on local disk
+        block_size: Bytes per read (default: 1 MB)
+    
+    Returns:
+        MD5 hash as hex string, or 'ERROR' if the file can't be read
+    """
+    md5_hash = hashlib.md5()
+    buffer = bytearray(block_size)
+    view = memoryview(buffer)
+    
+    try:
+        with open(filepath, 'rb', buffering=0) as f:
+            while True:
+                size = f.readinto(buffer)
+                if not size:
+                    break
+                md5_hash.update(view[:size])
+    except OSError as e:
+        print(f"  Warning: Could not hash {filepath}: {e}")
+        return "ERROR"
+    
+    return md5_hash.hexdigest()
+
+
+class LocalInventory(Inventory):
+    """Generate a file inventory with hashes from a local mirror of the site."""
+    
+    def __init__(self, mirror_root: str):
+        """
+        Initialize local mirror backend.
+        
+        Args:
+            mirror_root: Local directory that corresponds to the FTP root '/'
+        """
+        super().__init__()
+        self.mirror_root = os.path.abspath(mirror_root)
+    
+    def connect(self) -> bool:
+        """Check that the mirror directory exists."""
+        if not os.path.isdir(self.mirror_root):
+            print(f"✗ Local mirror not found: {self.mirror_root}")
+            return False
+        print(f"✓ Using local mirror {self.mirror_root}")
+        return True
+    
+    def local_path(self, path: str) -> str:
+        """Map an FTP-style path ('/media/a.jpg') to its location in the mirror."""
+        return os.path.join(self.mirror_root, path.lstrip('/'))
+    
+    def list_files_recursive(self, path: str = "/") -> List[Dict]:
+        """
+        Recursively list all files under a path in the mirror.
+        
+        Entries are visited in name order, depth-first, like the FTP walker.
+        Symlinked directories are not followed.
+        
+        Args:
+            path: Starting path, relative to the FTP root
+        
+        Returns:
+            List of file information dictionaries
+        """
+        files = []
+        
+        try:
+            entries = sorted(os.scandir(self.local_path(path)), key=lambda e: e.name)
+        except OSError as e:
+            print(f"  Warning: Cannot access {path}: {e}")
+            return files
+        
+        for entry in entries:
+            full_path = f"{path}/{entry.name}".replace('//', '/')
+            
+            if entry.is_dir(follow_symlinks=False):
+                print(f"  Scanning directory: {full_path}")
+                files.extend(self.list_files_recursive(full_path))
+            elif entry.is_file():
+                st = entry.stat()
+                files.append({
+                    'path': full_path,
+                    'name': entry.name,
+                    'size': str(st.st_size),
+                    'permissions': stat.filemode(st.st_mode),
+                    # Same UTC YYYYMMDDHHMMSS format as MDTM/MLSD
+                    'modified': datetime.fromtimestamp(st.st_mtime, timezone.utc).strftime('%Y%m%d%H%M%S'),
+                })
+        
+        return files
+    
+    def generate_inventory(self, start_path: str = "/", include_hashes: bool = True, workers: Optional[int] = None,
+                           previous_inventory: Optional[str] = None) -> List[Dict]:
+        """
+        Generate complete inventory with optional hash calculation.
+        
+        Args:
+            start_path: Starting directory path, relative to the FTP root
+            include_hashes: Whether to calculate MD5 hashes
+            workers: Number of hashing processes (default: one per CPU)
+            previous_inventory: Earlier inventory file (JSON or CSV); files whose path, size and
+                modification time are unchanged reuse its MD5 instead of being read
+        
+        Returns:
+            List of file information dictionaries
+        """
+        print(f"\n{'='*60}")
+        print(f"Starting inventory generation from: {start_path} (local mirror)")
+        print(f"{'='*60}\n")
+        
+        print("Phase 1: Scanning directory structure...")
+        files = self.list_files_recursive(start_path)
+        print(f"✓ Found {len(files)} files\n")
+        
+        if include_hashes:
+            previous = {}
+            if previous_inventory:
+                previous = {f['path']: f for f in load_inventory(previous_inventory)}
+                print(f"Incremental mode: loaded {len(previous)} files from {previous_inventory}")
+            
+            stats = {'reused': 0, 'rehashed': 0, 'errors': 0}
+            pending = []
+            for file_info in files:
+                old = previous.get(file_info['path'])
+                if is_unchanged(old, file_info):
+                    file_info['md5'] = old['md5']
+                    file_info['hash_method'] = old.get('hash_method') or 'local'
+                    file_info['timestamp'] = old.get('timestamp') or datetime.now().isoformat()
+                    self._emit(file_info)
+                    stats['reused'] += 1
+                else:
+                    pending.append(file_info)
+            
+            workers = workers or os.cpu_count() or 1
+            print("Phase 2: Calculating MD5 hashes...")
+            print(f"(Using {workers} process(es))\n")
+            
+            paths = [self.local_path(f['path']) for f in pending]
+            # Batch small files per task so process overhead doesn't dominate
+            chunksize = max(1, min(256, len(paths) // (workers * 4) or 1))
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                digests = pool.map(md5_local_file, paths, chunksize=chunksize)
+                for i, (file_info, digest) in enumerate(zip(pending, digests), 1):
+                    file_info['md5'] = digest
+                    file_info['hash_method'] = 'local'
+                    file_info['timestamp'] = datetime.now().isoformat()
+                    if digest == 'ERROR':
+                        stats['errors'] += 1
+                    else:
+                        stats['rehashed'] += 1
+                    self._emit(file_info)
+                    print(f"  [{i}/{len(pending)}] {file_info['path']}")
+            
+            self.hash_stats = stats
+            
+            print()
+            if previous:
+                print(f"Reused {stats['reused']} unchanged hashes, "
+                      f"rehashed {stats['rehashed']} new or changed files")
+            if stats['errors'] > 0:
+                print(f"⚠ Warning: {stats['errors']} files could not be hashed\n")
+        else:
+            for file_info in files:
+                self._emit(file_info)
+        
+        self.inventory = files
+        return files
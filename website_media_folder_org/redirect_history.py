@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Redirect History Store
+Accumulates the URL mappings of every reorganization in one SQLite file, so
+redirects from earlier moves keep working and never chain through later ones.
+
+Each time a generation is recorded the store:
+- collapses chains (A -> B, then B -> C becomes A -> C and B -> C)
+- drops redirects that would loop back on themselves
+- drops redirects whose final target was later deleted
+- drops redirects from paths where a file lives again
+
+Redirect files are then regenerated from the consolidated set with the
+URLMappingGenerator save methods.
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from generate_url_mappings import URLMappingGenerator
+
+
+DEFAULT_DB = "redirect_history.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS generations (
+    id INTEGER PRIMARY KEY,
+    recorded_at TEXT NOT NULL,
+    source TEXT,
+    base_url TEXT
+);
+CREATE TABLE IF NOT EXISTS redirects (
+    old_path TEXT PRIMARY KEY,
+    new_path TEXT NOT NULL,
+    md5 TEXT,
+    filename TEXT,
+    size TEXT,
+    status TEXT,
+    generation INTEGER REFERENCES generations(id)
+);
+CREATE INDEX IF NOT EXISTS redirects_new_path ON redirects(new_path);
+CREATE INDEX IF NOT EXISTS redirects_md5 ON redirects(md5);
+CREATE TABLE IF NOT EXISTS deleted (
+    path TEXT PRIMARY KEY,
+    generation INTEGER REFERENCES generations(id)
+);
+"""
+
+
+def resolve_chains(redirects: Dict[str, str]) -> Tuple[Dict[str, str], List[List[str]]]:
+    """
+    Follow every redirect to its final target.
+    
+    Runs in linear time: each path's target is worked out once and reused by
+    every chain that passes through it.
+    
+    Args:
+        redirects: old_path -> new_path for every stored redirect
+    
+    Returns:
+        (old_path -> final path for redirects that end somewhere,
+         list of cycles, each a list of the paths in the loop)
+    """
+    final: Dict[str, Optional[str]] = {}
+    cycles = []
+    
+    for start in redirects:
+        if start in final:
+            continue
+        
+        # Walk until we reach a path with no redirect, a resolved path, or a loop
+        chain = []
+        on_chain = {}
+        path = start
+        while path in redirects and path not in final and path not in on_chain:
+            on_chain[path] = len(chain)
+            chain.append(path)
+            path = redirects[path]
+        
+        if path in on_chain:
+            loop = chain[on_chain[path]:]
+            cycles.append(loop)
+            target = None
+        elif path in final:
+            target = final[path]
+        else:
+            target = path
+        
+        for p in chain:
+            final[p] = target
+    
+    return {p: t for p, t in final.items() if t is not None}, cycles
+
+
+class RedirectHistory:
+    """Persistent, consolidated set of redirects across reorganizations."""
+    
+    def __init__(self, db_path: str = DEFAULT_DB):
+        """
+        Open (or create) a redirect history database.
+        
+        Args:
+            db_path: SQLite file to store the history in
+        """
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript(SCHEMA)
+        self.cycles: List[List[str]] = []
+    
+    def close(self):
+        """Close the database."""
+        self.conn.close()
+    
+    def record(self, generator: URLMappingGenerator, source: str = "") -> int:
+        """
+        Add the mappings from one before/after comparison and consolidate.
+        
+        Paths in the generator's AFTER inventory are treated as live: stale
+        redirects from them are removed and they are no longer deleted.
+        
+        Args:
+            generator: URLMappingGenerator after generate_mappings has run
+            source: Description of where the mappings came from (e.g. file names)
+        
+        Returns:
+            Id of the new generation
+        """
+        with self.conn:
+            cur = self.conn.execute(
+                "INSERT INTO generations (recorded_at, source, base_url) VALUES (?, ?, ?)",
+                (datetime.now().isoformat(), source, generator.base_url))
+            generation = cur.lastrowid
+            
+            live = [(path,) for path in generator.after_inventory.by_path]
+            self.conn.executemany("DELETE FROM redirects WHERE old_path = ?", live)
+            self.conn.executemany("DELETE FROM deleted WHERE path = ?", live)
+            
+            self._add_mappings(generator.mappings, generation)
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO deleted (path, generation) VALUES (?, ?)",
+                ((path, generation) for path in generator.deleted_paths))
+            
+            self.consolidate()
+        
+        return generation
+    
+    def import_json(self, mappings_file: str) -> int:
+        """
+        Add mappings from an earlier url_mappings JSON file (from save_json).
+        
+        Older files carry no inventory, so only the redirects themselves are
+        added; nothing is marked live or deleted.
+        
+        Args:
+            mappings_file: Path to url_mappings_TIMESTAMP.json
+        
+        Returns:
+            Id of the new generation
+        """
+        with open(mappings_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        
+        with self.conn:
+            cur = self.conn.execute(
+                "INSERT INTO generations (recorded_at, source, base_url) VALUES (?, ?, ?)",
+                (data.get('generated_at') or datetime.now().isoformat(), mappings_file, data.get('base_url', '')))
+            generation = cur.lastrowid
+            
+            self._add_mappings(data.get('mappings', []), generation)
+            self.consolidate()
+        
+        return generation
+    
+    def _add_mappings(self, mappings: List[Dict], generation: int):
+        """Insert mappings, replacing any earlier redirect from the same path."""
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO redirects (old_path, new_path, md5, filename, size, status, generation) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            ((m['old_path'], m['new_path'], m.get('md5'), m.get('filename'), m.get('size'),
+              m.get('status', 'moved'), generation) for m in mappings if m['old_path'] != m['new_path']))
+    
+    def consolidate(self) -> Dict[str, int]:
+        """
+        Collapse chains, and drop looping redirects and redirects to deleted files.
+        
+        Returns:
+            Counts of collapsed, looping and dead redirects
+        """
+        rows = self.conn.execute("SELECT old_path, new_path, md5, filename, size FROM redirects").fetchall()
+        redirects = {old: new for old, new, *_ in rows}
+        details = {old: (md5, filename, size) for old, _, md5, filename, size in rows}
+        deleted = {path for (path,) in self.conn.execute("SELECT path FROM deleted")}
+        
+        final, self.cycles = resolve_chains(redirects)
+        # Includes redirects that lead into a loop without being part of it
+        looping = [path for path in redirects if path not in final]
+        
+        # The hop that lands on the final target carries that file's details
+        last_hop = {}
+        for old, new in redirects.items():
+            if new not in redirects:
+                last_hop[new] = details[old]
+        
+        collapsed = [(target, *last_hop[target], old) for old, target in final.items()
+                     if target != redirects[old] and target not in deleted]
+        dead = [(old,) for old, target in final.items() if target in deleted]
+        
+        self.conn.executemany(
+            "UPDATE redirects SET new_path = ?, md5 = ?, filename = ?, size = ? WHERE old_path = ?", collapsed)
+        self.conn.executemany("DELETE FROM redirects WHERE old_path = ?", [(p,) for p in looping] + dead)
+        
+        if self.cycles:
+            print(f"⚠ Dropped {len(looping)} redirects in {len(self.cycles)} loops, e.g. "
+                  f"{' -> '.join(self.cycles[0] + [self.cycles[0][0]])}")
+        
+        return {'collapsed': len(collapsed), 'looping': len(looping), 'dead': len(dead)}
+    
+    def mappings(self, generator: URLMappingGenerator) -> List[Dict]:
+        """
+        Load the consolidated redirects as mapping records.
+        
+        Args:
+            generator: Generator whose base URL is used for old_url/new_url
+        
+        Returns:
+            Mapping dictionaries in the same shape as generate_mappings produces
+        """
+        rows = self.conn.execute(
+            "SELECT old_path, new_path, md5, filename, size, status FROM redirects ORDER BY old_path")
+        return [{
+            'old_path': old_path,
+            'new_path': new_path,
+            'old_url': generator._path_to_url(old_path),
+            'new_url': generator._path_to_url(new_path),
+            'md5': md5,
+            'filename': filename,
+            'size': size,
+            'status': status
+        } for old_path, new_path, md5, filename, size, status in rows]
+    
+    def latest_base_url(self) -> str:
+        """Base URL of the most recent generation that had one."""
+        row = self.conn.execute(
+            "SELECT base_url FROM generations WHERE base_url != '' ORDER BY id DESC LIMIT 1").fetchone()
+        return row[0] if row else ""
+    
+    def export(self, timestamp: str, base_url: Optional[str] = None, use_maps: bool = True) -> URLMappingGenerator:
+        """
+        Regenerate every redirect output from the consolidated set.
+        
+        Args:
+            timestamp: Timestamp for the output file names, e.g. '20260301_120000'
+            base_url: Website base URL (default: from the latest generation)
+            use_maps: Write nginx map / Apache RewriteMap instead of per-file rules
+        
+        Returns:
+            Generator holding the consolidated mappings
+        """
+        generator = URLMappingGenerator(base_url=self.latest_base_url() if base_url is None else base_url)
+        generator.mappings = self.mappings(generator)
+        
+        generator.save_csv(f"url_mappings_{timestamp}.csv")
+        generator.save_json(f"url_mappings_{timestamp}.json")
+        if use_maps:
+            generator.save_nginx_map(f"redirects_{timestamp}.nginx.map.conf")
+            generator.save_apache_rewritemap(f"redirects_{timestamp}.map.txt",
+                                             f"redirects_{timestamp}.rewritemap.conf")
+        else:
+            generator.save_htaccess(f"redirects_{timestamp}.htaccess")
+            generator.save_nginx(f"redirects_{timestamp}.nginx.conf")
+        
+        return generator
+    
+    def print_summary(self):
+        """Print the size of the stored history."""
+        generations = self.conn.execute("SELECT COUNT(*) FROM generations").fetchone()[0]
+        redirects = self.conn.execute("SELECT COUNT(*) FROM redirects").fetchone()[0]
+        deleted = self.conn.execute("SELECT COUNT(*) FROM deleted").fetchone()[0]
+        print(f"\nRedirect history: {self.db_path}")
+        print(f"  Generations recorded: {generations}")
+        print(f"  Active redirects:     {redirects}")
+        print(f"  Deleted paths:        {deleted}")
+
+
+def parse_args():
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description="Accumulate redirects across reorganizations and regenerate outputs.")
+    parser.add_argument('--db', default=DEFAULT_DB, help=f"History database (default: {DEFAULT_DB})")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    record = subparsers.add_parser('record', help="Compare BEFORE/AFTER inventories and add the result")
+    record.add_argument('before', help="Inventory taken before the reorganization")
+    record.add_argument('after', help="Inventory taken after the reorganization")
+    
+    imported = subparsers.add_parser('import', help="Add earlier url_mappings JSON files, oldest first")
+    imported.add_argument('mappings_files', nargs='+', help="url_mappings_TIMESTAMP.json files")
+    
+    subparsers.add_parser('export', help="Only regenerate redirect files from the stored history")
+    
+    for sub in (record, imported, subparsers.choices['export']):
+        sub.add_argument('--base-url', help="Website base URL (default: the latest one recorded)")
+        sub.add_argument('--rules', action='store_true',
+                         help="Write per-file rules (.htaccess, location blocks) instead of lookup maps")
+    return parser.parse_args()
+
+
+def main():
+    """Main execution function."""
+    args = parse_args()
+    history = RedirectHistory(args.db)
+    
+    try:
+        if args.command == 'record':
+            for filepath in (args.before, args.after):
+                if not os.path.exists(filepath):
+                    print(f"✗ Inventory file not found: {filepath}")
+                    return
+            generator = URLMappingGenerator(base_url=args.base_url or history.latest_base_url())
+            generator.generate_mappings(args.before, args.after)
+            history.record(generator, source=f"{args.before} -> {args.after}")
+        elif args.command == 'import':
+            for filepath in args.mappings_files:
+                history.import_json(filepath)
+                print(f"✓ Imported {filepath}")
+        
+        history.print_summary()
+        
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        print()
+        history.export(timestamp, base_url=args.base_url, use_maps=not args.rules)
+    finally:
+        history.close()
+
+
+if __name__ == "__main__":
+    main()